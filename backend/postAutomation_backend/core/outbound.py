@@ -0,0 +1,72 @@
+"""
+Guard for requests to URLs supplied by users (media URLs, webhooks).
+
+The server fetches those URLs from inside the deployment's network, so a URL
+pointing at a private, loopback or link-local address (a database, the cloud
+metadata service at 169.254.169.254, ...) would let users reach services that
+are not meant to be public. check_public_url resolves the host and rejects
+the URL unless every address it resolves to is public. public_request
+follows redirects by hand, checking each hop, so a public URL can't redirect
+the request somewhere private. Media fetches (posts.media, posts.uploads) go
+through public_request; webhook deliveries check the URL before every
+attempt and don't follow redirects at all.
+
+Hosts in OUTBOUND_ALLOWED_HOSTS skip the check, e.g. a media server on the
+local network in development.
+"""
+import ipaddress
+import socket
+from urllib.parse import urljoin, urlsplit
+from django.conf import settings
+import requests
+
+
+class UnsafeURL(ValueError):
+    """A user-supplied URL that must not be requested"""
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_public_url(url: str) -> None:
+    """
+    Raise UnsafeURL unless url is http(s) and its host only resolves to
+    public addresses. Hosts that don't resolve are left to fail in the request.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise UnsafeURL(f"{url} is not an http(s) URL")
+    host = parts.hostname
+    if host in settings.OUTBOUND_ALLOWED_HOSTS:
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except ValueError:
+        raise UnsafeURL(f"{url} has an invalid port")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError):
+        return
+    for address in addresses:
+        if not is_public_address(address):
+            raise UnsafeURL(f"{host} resolves to the non-public address {address}")
+
+
+def public_request(method: str, url: str, max_redirects: int, **kwargs) -> requests.Response:
+    """
+    requests.request for a user-supplied URL, following up to max_redirects
+    redirects and checking every hop. Raises UnsafeURL for a non-public hop
+    and requests.TooManyRedirects past the limit.
+    """
+    for _ in range(max_redirects + 1):
+        check_public_url(url)
+        response = requests.request(method, url, allow_redirects=False, **kwargs)
+        if not response.is_redirect:
+            return response
+        response.close()
+        url = urljoin(url, response.headers['Location'])
+    raise requests.TooManyRedirects(f"{url} redirects more than {max_redirects} times")
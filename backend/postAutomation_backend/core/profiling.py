@@ -0,0 +1,108 @@
+"""
+Opt-in, sampled request profiler.
+
+For a sampled request it records SQL count and time, serializer time and total
+time, and flags queries that ran repeatedly with the same SQL (a sign of N+1).
+Results go to the Server-Timing response header and the 'core.profiling' log.
+Unsampled requests only pay for a random() call.
+"""
+import contextvars
+import logging
+import random
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.query_count += 1
+            self.statements[sql] += 1
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def duplicates(self):
+        threshold = settings.REQUEST_PROFILER_DUPLICATE_THRESHOLD
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.query_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'serialize;dur={self.serializer_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+class ProfiledSerializerMixin:
+    """Adds a serializer's to_representation time to the active request profile"""
+
+    def to_representation(self, instance):
+        profile = _current.get()
+        if profile is None:
+            return super().to_representation(instance)
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+
+
+class QueryProfilerMiddleware:
+    """
+    Enable with REQUEST_PROFILER_ENABLED=True; REQUEST_PROFILER_SAMPLE_RATE
+    controls the fraction of requests profiled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILER_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_PROFILER_SAMPLE_RATE
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with connections['default'].execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = profile.total_time
+        response['Server-Timing'] = profile.server_timing(total)
+
+        duplicates = profile.duplicates()
+        message = (
+            f"{request.method} {request.path} {response.status_code} "
+            f"total={total * 1000:.1f}ms sql={profile.query_count}/{profile.query_time * 1000:.1f}ms "
+            f"serialize={profile.serializer_time * 1000:.1f}ms"
+        )
+        if duplicates:
+            repeated = '; '.join(f"{count}x {sql[:200]}" for sql, count in duplicates[:3])
+            logger.warning(f"{message} possible N+1: {repeated}")
+        else:
+            logger.info(message)
+        return response
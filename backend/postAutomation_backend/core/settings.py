@@ -62,6 +62,14 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# Shared cache used for cross-worker coordination (fair share, rate limits)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default='redis://localhost:6379/1'),
+    }
+}
+
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
@@ -69,6 +77,215 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Outage catch-up: overdue pending posts whose ETA task was lost are
+# re-dispatched by posts.tasks.reconcile_overdue_posts
+CATCHUP_SCAN_INTERVAL = config('CATCHUP_SCAN_INTERVAL', default=60, cast=int)
+CATCHUP_GRACE_SECONDS = config('CATCHUP_GRACE_SECONDS', default=120, cast=int)
+CATCHUP_REDISPATCH_AFTER = config('CATCHUP_REDISPATCH_AFTER', default=600, cast=int)
+CATCHUP_RATE_PER_MINUTE = config('CATCHUP_RATE_PER_MINUTE', default=30, cast=int)
+
+# What to do with posts that are more than PUBLISH_MAX_LATENESS seconds late:
+# 'publish' anyway, 'skip' (cancel) them, or mark them 'stale' for the user to reschedule
+PUBLISH_LATENESS_POLICY = config('PUBLISH_LATENESS_POLICY', default='publish')
+PUBLISH_MAX_LATENESS = config('PUBLISH_MAX_LATENESS', default=3600, cast=int)
+# A publish is killed after PUBLISH_TASK_TIME_LIMIT seconds; its claim on the
+# post is renewed between phases and always outlasts that limit
+PUBLISH_TASK_TIME_LIMIT = config('PUBLISH_TASK_TIME_LIMIT', default=240, cast=int)
+PUBLISH_CLAIM_LEASE = max(config('PUBLISH_CLAIM_LEASE', default=300, cast=int), PUBLISH_TASK_TIME_LIMIT + 60)
+
+# Each platform publishes from its own queue (e.g. publish.twitter) so a slow
+# provider only ties up its own workers:
+#   celery -A core worker -Q publish.twitter,publish.linkedin
+#   celery -A core worker -Q publish.instagram,publish.youtube
+#   celery -A core worker -Q celery
+PUBLISH_QUEUE_PREFIX = config('PUBLISH_QUEUE_PREFIX', default='publish')
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_DEFAULT_PRIORITY = 3
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': [0, 3, 6, 9],
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
+# Per-user fair share: concurrent publishes per user per platform, scaled by
+# optional weights given as "user_id:weight,user_id:weight"
+FAIR_SHARE_MAX_INFLIGHT = config('FAIR_SHARE_MAX_INFLIGHT', default=2, cast=int)
+# Posts over the share are deferred FAIR_SHARE_DEFER_SECONDS, doubling each
+# time the same post is deferred again, up to FAIR_SHARE_MAX_DEFER_SECONDS
+FAIR_SHARE_DEFER_SECONDS = config('FAIR_SHARE_DEFER_SECONDS', default=5, cast=int)
+FAIR_SHARE_MAX_DEFER_SECONDS = config('FAIR_SHARE_MAX_DEFER_SECONDS', default=120, cast=int)
+PUBLISH_USER_WEIGHTS = {
+    user_id: int(weight)
+    for user_id, weight in (
+        item.split(':', 1) for item in config('PUBLISH_USER_WEIGHTS', default='', cast=Csv()) if ':' in item
+    )
+}
+
+# Per-platform circuit breaker: opens when, within a window of at least
+# MIN_CALLS calls, the error or slow-call rate crosses its threshold
+CIRCUIT_BREAKER_WINDOW = config('CIRCUIT_BREAKER_WINDOW', default=60, cast=int)
+CIRCUIT_BREAKER_MIN_CALLS = config('CIRCUIT_BREAKER_MIN_CALLS', default=10, cast=int)
+CIRCUIT_BREAKER_ERROR_RATE = config('CIRCUIT_BREAKER_ERROR_RATE', default=0.5, cast=float)
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = config('CIRCUIT_BREAKER_SLOW_CALL_SECONDS', default=10, cast=float)
+CIRCUIT_BREAKER_SLOW_RATE = config('CIRCUIT_BREAKER_SLOW_RATE', default=0.8, cast=float)
+CIRCUIT_BREAKER_OPEN_SECONDS = config('CIRCUIT_BREAKER_OPEN_SECONDS', default=60, cast=int)
+CIRCUIT_BREAKER_HALF_OPEN_CALLS = config('CIRCUIT_BREAKER_HALF_OPEN_CALLS', default=3, cast=int)
+
+# Publishing metrics are aggregated across workers in Redis and served at /metrics/
+METRICS_REDIS_URL = config('METRICS_REDIS_URL', default='redis://localhost:6379/2')
+
+# Sampled Celery task profiling; these are defaults, overridable at runtime
+# with `python manage.py task_profiler`
+TASK_PROFILER_SAMPLE_RATE = config('TASK_PROFILER_SAMPLE_RATE', default=0.0, cast=float)
+TASK_PROFILER_DUMP_DIR = config('TASK_PROFILER_DUMP_DIR', default='')
+TASK_PROFILER_DUMP_SLOWEST = config('TASK_PROFILER_DUMP_SLOWEST', default=10, cast=int)
+TASK_PROFILER_CONFIG_TTL = config('TASK_PROFILER_CONFIG_TTL', default=10, cast=int)
+
+# Post status changes are pushed to open dashboards as Server-Sent Events
+# (/api/events/, served by core/asgi.py) over Redis pub/sub
+EVENTS_REDIS_URL = config('EVENTS_REDIS_URL', default='redis://localhost:6379/3')
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+EVENTS_RETRY_MS = config('EVENTS_RETRY_MS', default=3000, cast=int)
+
+# Delta sync (/api/posts/changes/): changes are only handed out once they are
+# CHANGES_SETTLE_SECONDS old, so transactions still committing aren't skipped;
+# deletions are remembered for CHANGES_TOMBSTONE_TTL seconds
+CHANGES_SETTLE_SECONDS = config('CHANGES_SETTLE_SECONDS', default=2, cast=float)
+CHANGES_PAGE_SIZE = config('CHANGES_PAGE_SIZE', default=200, cast=int)
+CHANGES_TOMBSTONE_TTL = config('CHANGES_TOMBSTONE_TTL', default=30 * 86400, cast=int)
+
+# Engagement of posts published within ENGAGEMENT_WINDOW_SECONDS is collected
+# every ENGAGEMENT_INTERVAL seconds with the platforms' batch lookups. Each
+# account may make ENGAGEMENT_QUOTA lookups per ENGAGEMENT_QUOTA_WINDOW seconds,
+# given per platform as "platform:requests,platform:requests"
+ENGAGEMENT_INTERVAL = config('ENGAGEMENT_INTERVAL', default=3600, cast=int)
+ENGAGEMENT_WINDOW_SECONDS = config('ENGAGEMENT_WINDOW_SECONDS', default=7 * 86400, cast=int)
+ENGAGEMENT_QUOTA_WINDOW = config('ENGAGEMENT_QUOTA_WINDOW', default=900, cast=int)
+ENGAGEMENT_QUOTA = {
+    platform: int(limit)
+    for platform, limit in (
+        item.split(':', 1) for item in config(
+            'ENGAGEMENT_QUOTA', default='twitter:75,instagram:50,linkedin:25,youtube:25', cast=Csv()
+        ) if ':' in item
+    )
+}
+
+# Analytics rollups (hourly and daily, per user and platform) are brought up
+# to date every ROLLUP_INTERVAL seconds from their high-water marks, at most
+# ROLLUP_MAX_BATCHES batches of ROLLUP_BATCH source rows per run. Rows younger
+# than ROLLUP_SETTLE_SECONDS wait for the next run.
+ROLLUP_INTERVAL = config('ROLLUP_INTERVAL', default=60, cast=int)
+ROLLUP_BATCH = config('ROLLUP_BATCH', default=1000, cast=int)
+ROLLUP_MAX_BATCHES = config('ROLLUP_MAX_BATCHES', default=20, cast=int)
+ROLLUP_SETTLE_SECONDS = config('ROLLUP_SETTLE_SECONDS', default=5, cast=int)
+# Only one run folds at a time; a run that dies holds the lock this long
+ROLLUP_LOCK_TIMEOUT = config('ROLLUP_LOCK_TIMEOUT', default=600, cast=int)
+
+# Outbound webhooks are delivered by tasks on the WEBHOOK_QUEUE, in batches of
+# up to WEBHOOK_BATCH_SIZE events, with at most WEBHOOK_MAX_CONCURRENCY
+# requests in flight per destination host. Failed batches are retried after
+# WEBHOOK_RETRY_BASE * 2^n seconds (capped at WEBHOOK_RETRY_MAX), up to
+# WEBHOOK_MAX_ATTEMPTS times.
+#   celery -A core worker -Q webhooks
+WEBHOOK_QUEUE = config('WEBHOOK_QUEUE', default='webhooks')
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=50, cast=int)
+WEBHOOK_MAX_BATCHES_PER_RUN = config('WEBHOOK_MAX_BATCHES_PER_RUN', default=10, cast=int)
+WEBHOOK_MAX_CONCURRENCY = config('WEBHOOK_MAX_CONCURRENCY', default=2, cast=int)
+WEBHOOK_CONNECT_TIMEOUT = config('WEBHOOK_CONNECT_TIMEOUT', default=3, cast=float)
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=float)
+WEBHOOK_RETRY_BASE = config('WEBHOOK_RETRY_BASE', default=10, cast=int)
+WEBHOOK_RETRY_MAX = config('WEBHOOK_RETRY_MAX', default=3600, cast=int)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=10, cast=int)
+WEBHOOK_BUSY_RETRY = config('WEBHOOK_BUSY_RETRY', default=2, cast=int)
+WEBHOOK_LOCK_TIMEOUT = config('WEBHOOK_LOCK_TIMEOUT', default=300, cast=int)
+WEBHOOK_DELIVERY_RETENTION = config('WEBHOOK_DELIVERY_RETENTION', default=7 * 86400, cast=int)
+
+# Local trace export for the publish path: '' (off), 'stdout' or 'file'
+TRACING_EXPORTER = config('TRACING_EXPORTER', default='')
+TRACING_FILE = config('TRACING_FILE', default=str(BASE_DIR / 'logs' / 'traces.jsonl'))
+
+# User-supplied URLs are only fetched from public addresses (core.outbound),
+# except for these hosts, e.g. a local media server in development
+OUTBOUND_ALLOWED_HOSTS = config('OUTBOUND_ALLOWED_HOSTS', default='', cast=Csv())
+
+# Media is fetched and validated MEDIA_PREFETCH_LEAD_SECONDS before a post is
+# due into a content-addressed cache, by tasks on the MEDIA_QUEUE
+MEDIA_CACHE_DIR = config('MEDIA_CACHE_DIR', default=str(BASE_DIR / 'media_cache'))
+MEDIA_QUEUE = config('MEDIA_QUEUE', default='media')
+MEDIA_PREFETCH_LEAD_SECONDS = config('MEDIA_PREFETCH_LEAD_SECONDS', default=3600, cast=int)
+MEDIA_PREFETCH_SCAN_INTERVAL = config('MEDIA_PREFETCH_SCAN_INTERVAL', default=120, cast=int)
+MEDIA_PREFETCH_BATCH = config('MEDIA_PREFETCH_BATCH', default=500, cast=int)
+MEDIA_FETCH_TIMEOUT = config('MEDIA_FETCH_TIMEOUT', default=30, cast=int)
+MEDIA_MAX_REDIRECTS = config('MEDIA_MAX_REDIRECTS', default=5, cast=int)
+MEDIA_MAX_BYTES = config('MEDIA_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=7 * 86400, cast=int)
+# Images that break a platform's limits are normalized in a process pool of
+# this size. Instagram and LinkedIn fetch media by URL, so their variants are
+# only used if MEDIA_CACHE_DIR is served at MEDIA_PUBLIC_BASE_URL.
+MEDIA_TRANSFORM_WORKERS = config('MEDIA_TRANSFORM_WORKERS', default=2, cast=int)
+MEDIA_TRANSFORM_TIMEOUT = config('MEDIA_TRANSFORM_TIMEOUT', default=60, cast=int)
+MEDIA_PUBLIC_BASE_URL = config('MEDIA_PUBLIC_BASE_URL', default='')
+
+# Platforms that publish from media containers (Instagram) get them created
+# STAGING_LEAD_SECONDS ahead; processing is polled with exponential backoff
+STAGING_LEAD_SECONDS = config('STAGING_LEAD_SECONDS', default=1800, cast=int)
+STAGING_POLL_INITIAL = config('STAGING_POLL_INITIAL', default=5, cast=int)
+STAGING_POLL_MAX = config('STAGING_POLL_MAX', default=120, cast=int)
+STAGING_POLL_ATTEMPTS = config('STAGING_POLL_ATTEMPTS', default=12, cast=int)
+
+# Recurring posts are materialized as Post rows only RECURRENCE_HORIZON_SECONDS
+# ahead, by a scan that advances at most RECURRENCE_BATCH rules per run and
+# creates at most RECURRENCE_MAX_PER_RULE posts per rule each time
+RECURRENCE_HORIZON_SECONDS = config('RECURRENCE_HORIZON_SECONDS', default=86400, cast=int)
+RECURRENCE_SCAN_INTERVAL = config('RECURRENCE_SCAN_INTERVAL', default=600, cast=int)
+RECURRENCE_BATCH = config('RECURRENCE_BATCH', default=500, cast=int)
+RECURRENCE_MAX_PER_RULE = config('RECURRENCE_MAX_PER_RULE', default=48, cast=int)
+
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-overdue-posts': {
+        'task': 'posts.tasks.reconcile_overdue_posts',
+        'schedule': CATCHUP_SCAN_INTERVAL,
+    },
+    'prefetch-upcoming-media': {
+        'task': 'posts.tasks.prefetch_upcoming_media',
+        'schedule': MEDIA_PREFETCH_SCAN_INTERVAL,
+    },
+    'stage-upcoming-containers': {
+        'task': 'posts.tasks.stage_upcoming_containers',
+        'schedule': MEDIA_PREFETCH_SCAN_INTERVAL,
+    },
+    'materialize-recurring-posts': {
+        'task': 'posts.tasks.materialize_recurring_posts',
+        'schedule': RECURRENCE_SCAN_INTERVAL,
+    },
+    'collect-engagement': {
+        'task': 'posts.tasks.collect_engagement',
+        'schedule': ENGAGEMENT_INTERVAL,
+    },
+    'update-rollups': {
+        'task': 'posts.tasks.update_rollups',
+        'schedule': ROLLUP_INTERVAL,
+    },
+    'deliver-pending-webhooks': {
+        'task': 'posts.tasks.deliver_pending_webhooks',
+        'schedule': 60,
+    },
+    'purge-webhook-deliveries': {
+        'task': 'posts.tasks.purge_webhook_deliveries',
+        'schedule': 86400,
+    },
+    'purge-post-tombstones': {
+        'task': 'posts.tasks.purge_post_tombstones',
+        'schedule': 86400,
+    },
+    'purge-media-cache': {
+        'task': 'posts.tasks.purge_media_cache',
+        'schedule': 3600,
+    },
+}
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -82,6 +299,7 @@ SIMPLE_JWT = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.profiling.QueryProfilerMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -92,6 +310,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Sampled per-request SQL/serializer profiling (Server-Timing header + log)
+REQUEST_PROFILER_ENABLED = config('REQUEST_PROFILER_ENABLED', default=False, cast=bool)
+REQUEST_PROFILER_SAMPLE_RATE = config('REQUEST_PROFILER_SAMPLE_RATE', default=0.01, cast=float)
+REQUEST_PROFILER_DUPLICATE_THRESHOLD = config('REQUEST_PROFILER_DUPLICATE_THRESHOLD', default=3, cast=int)
+
 # CORS Settings
 # CORS_ALLOWED_ORIGINS = config(
 #     'CORS_ALLOWED_ORIGINS',
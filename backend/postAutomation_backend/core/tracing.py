@@ -0,0 +1,136 @@
+"""
+Minimal distributed tracing for the publish path.
+
+Spans carry W3C `traceparent` ids from PostViewSet.perform_create through the
+Celery task headers into publish_post and onto each outbound platform HTTP
+request. Finished spans are written as JSON lines to stdout or a file
+(TRACING_EXPORTER = 'stdout' | 'file'), so the latency of one post's whole
+path can be broken down without an external tracing service:
+
+    grep <trace_id> logs/traces.jsonl
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('current_span', default=None)
+_export_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return settings.TRACING_EXPORTER in ('stdout', 'file')
+
+
+class Span:
+    def __init__(self, name, trace_id=None, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self.error = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': round((self.end - self.start) * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+def parse_traceparent(value):
+    """(trace_id, parent_span_id) from a traceparent header, or (None, None)"""
+    try:
+        _, trace_id, span_id, _ = value.split('-')
+        if len(trace_id) == 32 and len(span_id) == 16:
+            return trace_id, span_id
+    except (AttributeError, ValueError):
+        pass
+    return None, None
+
+
+def current_span():
+    return _current.get()
+
+
+def current_traceparent():
+    span = _current.get()
+    return span.traceparent if span else None
+
+
+def export(span):
+    line = json.dumps(span.to_dict(), default=str)
+    try:
+        with _export_lock:
+            if settings.TRACING_EXPORTER == 'file':
+                with open(settings.TRACING_FILE, 'a') as fh:
+                    fh.write(line + '\n')
+            else:
+                sys.stdout.write(line + '\n')
+                sys.stdout.flush()
+    except OSError as e:
+        logger.warning(f"Could not export span {span.name}: {e}")
+
+
+def begin_span(name, traceparent=None, **attributes):
+    """
+    Start a span as a child of the current span, or of `traceparent` when the
+    parent lives in another process. Returns (span, token) for end_span, or
+    (None, None) when tracing is disabled.
+    """
+    if not enabled():
+        return None, None
+    parent = _current.get()
+    if traceparent:
+        trace_id, parent_id = parse_traceparent(traceparent)
+    elif parent:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = None, None
+    span = Span(name, trace_id, parent_id, attributes)
+    return span, _current.set(span)
+
+
+def end_span(span, token, error=None):
+    if span is None:
+        return
+    span.end = time.time()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    _current.reset(token)
+    export(span)
+
+
+@contextmanager
+def start_span(name, traceparent=None, **attributes):
+    """Context manager around begin_span/end_span; yields the span or None"""
+    span, token = begin_span(name, traceparent, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        end_span(span, token, error=e)
+        raise
+    else:
+        end_span(span, token)
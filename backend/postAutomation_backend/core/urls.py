@@ -2,7 +2,9 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenRefreshView
-from posts.views import PostViewSet, SocialAccountViewSet
+from posts.views import (
+    CampaignViewSet, PostViewSet, RecurrenceRuleViewSet, SocialAccountViewSet, WebhookViewSet, post_events,
+)
 from posts.oauth_views import OAuthInitiateView, OAuthCallbackView
 from users.views import UserRegistrationView, UserProfileView, CustomTokenObtainPairView
 from users.oauth_views import (
@@ -13,11 +15,14 @@ from users.oauth_views import (
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
-from .views import health_check
+from .views import health_check, metrics
 
 router = routers.DefaultRouter()
 router.register(r'posts', PostViewSet, basename='posts')
+router.register(r'campaigns', CampaignViewSet, basename='campaigns')
+router.register(r'recurrences', RecurrenceRuleViewSet, basename='recurrences')
 router.register(r'social-accounts', SocialAccountViewSet, basename='social-accounts')
+router.register(r'webhooks', WebhookViewSet, basename='webhooks')
 
 
 # Swagger/OpenAPI documentation 
@@ -39,9 +44,11 @@ urlpatterns = [
     
     # Health check
     path('health/', health_check, name='health_check'),
+    path('metrics/', metrics, name='metrics'),
     
     # API endpoints
     path('api/', include(router.urls)),
+    path('api/events/', post_events, name='post_events'),
     
     # Authentication endpoints
     path('api/auth/register/', UserRegistrationView.as_view(), name='register'),
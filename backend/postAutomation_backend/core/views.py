@@ -3,7 +3,11 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import connection
+from django.db.models import Count
 from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
 import redis
 
 @api_view(['GET'])
@@ -53,9 +57,62 @@ def health_check(request):
         health_status['services']['redis'] = f'unhealthy: {str(e)}'
         health_status['status'] = 'degraded'
     
+    # Platform circuit breakers (an open breaker means the provider is degraded, not us)
+    try:
+        from posts.circuit_breaker import get_breaker
+        from posts.models import Post
+        health_status['circuit_breakers'] = {
+            platform: get_breaker(platform).snapshot() for platform, _ in Post.PLATFORM_CHOICES
+        }
+    except Exception as e:
+        health_status['circuit_breakers'] = f'unavailable: {str(e)}'
+    
     http_status = status.HTTP_200_OK if health_status['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
     
     return Response(health_status, status=http_status)
 
 
+@require_GET
+def metrics(request):
+    """
+    Prometheus metrics for the publishing pipeline: schedule lag, platform API
+    latency, attempts and outcomes, plus queue depth and due-but-unclaimed posts
+    """
+    from django.conf import settings
+    from posts import metrics as post_metrics
+    from posts.models import Post
+    from posts.scheduling import publish_queue
+
+    lines = []
+    try:
+        lines += post_metrics.render_registry()
+    except Exception as e:
+        lines.append(f'# metrics store unavailable: {e}')
+
+    # Queue depth per platform queue and priority lane (kombu keeps one Redis list per lane)
+    try:
+        broker = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=2)
+        sep = settings.CELERY_BROKER_TRANSPORT_OPTIONS['sep']
+        queues = [settings.CELERY_TASK_DEFAULT_QUEUE] + [publish_queue(code) for code, _ in Post.PLATFORM_CHOICES]
+        depth = {}
+        for queue in queues:
+            for priority in settings.CELERY_BROKER_TRANSPORT_OPTIONS['priority_steps']:
+                key = queue if priority == 0 else f'{queue}{sep}{priority}'
+                depth[(('queue', queue), ('priority', priority))] = broker.llen(key)
+        lines += post_metrics.render_gauge(
+            'autopost_queue_depth', 'Tasks waiting in each broker queue and priority lane', depth
+        )
+    except Exception as e:
+        lines.append(f'# broker unavailable: {e}')
+
+    due = Post.objects.filter(
+        status='pending', scheduled_time__lte=timezone.now(), claimed_at__isnull=True
+    ).values('platform').annotate(count=Count('id'))
+    unclaimed = {(('platform', code),): 0 for code, _ in Post.PLATFORM_CHOICES}
+    for row in due:
+        unclaimed[(('platform', row['platform']),)] = row['count']
+    lines += post_metrics.render_gauge(
+        'autopost_due_unclaimed_posts', 'Pending posts past scheduled_time that no worker has claimed', unclaimed
+    )
 
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
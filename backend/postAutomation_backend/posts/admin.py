@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Post, SocialAccount
+from .models import (
+    Campaign, EngagementSnapshot, PlatformMedia, Post, PostRollup, RecurrenceRule, SocialAccount, Webhook, WebhookDelivery,
+)
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -9,9 +11,56 @@ class PostAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'scheduled_time'
 
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'scheduled_time', 'created_at')
+    search_fields = ('content', 'user__username', 'user__email')
+    readonly_fields = ('created_at', 'updated_at')
+    date_hierarchy = 'scheduled_time'
+
+@admin.register(RecurrenceRule)
+class RecurrenceRuleAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'platform', 'rrule', 'timezone', 'is_active', 'next_occurrence')
+    list_filter = ('platform', 'is_active')
+    search_fields = ('content', 'user__username', 'user__email')
+    readonly_fields = ('next_occurrence', 'created_at', 'updated_at')
+
+@admin.register(EngagementSnapshot)
+class EngagementSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('post', 'collected_at', 'likes', 'comments', 'shares', 'impressions')
+    list_filter = ('post__platform',)
+    raw_id_fields = ('post',)
+
+@admin.register(PostRollup)
+class PostRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'platform', 'granularity', 'bucket_start', 'posted', 'failed', 'likes', 'impressions')
+    list_filter = ('granularity', 'platform')
+    search_fields = ('user__username', 'user__email')
+
+@admin.register(Webhook)
+class WebhookAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'url', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('url', 'user__username', 'user__email')
+    readonly_fields = ('secret', 'created_at', 'updated_at')
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'webhook', 'event', 'status', 'attempts', 'next_attempt_at', 'delivered_at')
+    list_filter = ('status', 'event')
+    search_fields = ('webhook__url',)
+    readonly_fields = ('created_at', 'delivered_at')
+
 @admin.register(SocialAccount)
 class SocialAccountAdmin(admin.ModelAdmin):
     list_display = ('user', 'platform', 'platform_username', 'is_active', 'connected_at', 'last_used_at')
     list_filter = ('platform', 'is_active', 'connected_at')
     search_fields = ('user__username', 'platform_username', 'platform_user_id')
     readonly_fields = ('connected_at', 'last_used_at')
+
+@admin.register(PlatformMedia)
+class PlatformMediaAdmin(admin.ModelAdmin):
+    list_display = ('social_account', 'content_hash', 'media_id', 'use_count', 'expires_at', 'created_at')
+    list_filter = ('social_account__platform',)
+    search_fields = ('content_hash', 'media_id', 'social_account__user__username')
+    readonly_fields = ('created_at',)
@@ -0,0 +1,270 @@
+"""
+Incrementally maintained analytics rollups.
+
+Final post statuses are appended to PublishOutcome, and engagement arrives
+as EngagementSnapshot rows. update_rollups folds the rows added since each
+source's high-water mark (a RollupCursor) into hourly and daily PostRollup
+rows per user and platform. Rollups and cursor move in one transaction, so
+every source row is counted exactly once, and nothing is recomputed. Both
+sources rewrite the same rollup rows, so only one run folds at a time.
+
+Publish lag is kept as a histogram over metrics.LAG_BUCKETS. Histograms
+add up across buckets, so percentiles for any range are estimated from the
+summed histogram, the way Prometheus' histogram_quantile does. Engagement
+is stored as the gain since the post's previous snapshot, so summing a
+range gives the engagement gained in it.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from itertools import takewhile
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .metrics import LAG_BUCKETS
+from .models import EngagementSnapshot, PostRollup, PublishOutcome, RollupCursor
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_STATUSES = ('posted', 'failed', 'cancelled', 'stale')
+ENGAGEMENT_FIELDS = ('likes', 'comments', 'shares', 'impressions')
+GRANULARITIES = ('hour', 'day')
+SOURCES = ('engagement', 'outcomes')
+LOCK_KEY = 'analytics:rollups:lock'
+PERCENTILES = (50, 90, 99)
+
+
+def record_outcomes(posts, status=None, now=None) -> None:
+    """Append posts reaching a final status to the outcome log; never raises"""
+    now = now or timezone.now()
+    outcomes = []
+    for post in posts:
+        final = status or post.status
+        if final not in OUTCOME_STATUSES:
+            continue
+        lag = None
+        if final == 'posted' and post.scheduled_time:
+            lag = max((now - post.scheduled_time).total_seconds(), 0)
+        outcomes.append(PublishOutcome(
+            user_id=post.user_id, post_id=post.id, platform=post.platform, status=final, occurred_at=now, lag_seconds=lag,
+        ))
+    try:
+        PublishOutcome.objects.bulk_create(outcomes)
+    except Exception as e:
+        logger.exception(f"Could not record {len(outcomes)} publish outcomes: {e}")
+
+
+def bucket_start(moment, granularity):
+    """Start of the UTC hour or day a moment falls in"""
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if granularity == 'day' else moment
+
+
+def lag_bucket(seconds) -> int:
+    for index, bound in enumerate(LAG_BUCKETS):
+        if seconds <= bound:
+            return index
+    return len(LAG_BUCKETS)
+
+
+def _empty_delta():
+    return {
+        **{status: 0 for status in OUTCOME_STATUSES},
+        'lag_sum': 0.0,
+        'lag_histogram': [0] * (len(LAG_BUCKETS) + 1),
+        **{field: 0 for field in ENGAGEMENT_FIELDS},
+    }
+
+
+def outcome_deltas(outcomes):
+    """{(user_id, platform, granularity, bucket_start): delta} for a batch of outcome rows"""
+    deltas = defaultdict(_empty_delta)
+    for outcome in outcomes:
+        for granularity in GRANULARITIES:
+            delta = deltas[(outcome['user_id'], outcome['platform'], granularity, bucket_start(outcome['occurred_at'], granularity))]
+            delta[outcome['status']] += 1
+            if outcome['lag_seconds'] is not None:
+                delta['lag_sum'] += outcome['lag_seconds']
+                delta['lag_histogram'][lag_bucket(outcome['lag_seconds'])] += 1
+    return deltas
+
+
+def engagement_deltas(snapshots, after):
+    """
+    Deltas for a batch of snapshots: each counts what its post gained since
+    the post's previous snapshot, which may predate the batch (id <= after)
+    """
+    post_ids = {snapshot['post_id'] for snapshot in snapshots}
+    latest_before = (
+        EngagementSnapshot.objects.filter(post_id__in=post_ids, id__lte=after)
+        .values('post_id').annotate(last=Max('id')).values('last')
+    )
+    previous = {
+        row['post_id']: row
+        for row in EngagementSnapshot.objects.filter(id__in=latest_before).values('post_id', *ENGAGEMENT_FIELDS)
+    }
+
+    deltas = defaultdict(_empty_delta)
+    for snapshot in snapshots:
+        before = previous.get(snapshot['post_id'], {})
+        for granularity in GRANULARITIES:
+            key = (snapshot['post__user_id'], snapshot['post__platform'], granularity, bucket_start(snapshot['collected_at'], granularity))
+            delta = deltas[key]
+            for field in ENGAGEMENT_FIELDS:
+                # Counts the platform doesn't report stay out rather than reading as a drop to zero
+                if snapshot[field] is not None:
+                    delta[field] += snapshot[field] - (before.get(field) or 0)
+        previous[snapshot['post_id']] = {
+            field: snapshot[field] if snapshot[field] is not None else before.get(field) for field in ENGAGEMENT_FIELDS
+        }
+    return deltas
+
+
+def apply_deltas(deltas) -> None:
+    """Add deltas to their rollup rows, creating missing ones: one read, one insert, one update"""
+    if not deltas:
+        return
+    # A superset of the rows needed, picked out by key below, keeps the query small
+    candidates = PostRollup.objects.filter(
+        user_id__in={key[0] for key in deltas}, bucket_start__in={key[3] for key in deltas},
+    )
+    existing = {
+        key: row
+        for row in candidates
+        for key in [(row.user_id, row.platform, row.granularity, row.bucket_start)]
+        if key in deltas
+    }
+
+    created, updated = [], []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            user_id, platform, granularity, start = key
+            row = PostRollup(
+                user_id=user_id, platform=platform, granularity=granularity, bucket_start=start,
+                lag_histogram=[0] * (len(LAG_BUCKETS) + 1),
+            )
+            created.append(row)
+        else:
+            updated.append(row)
+        for field in (*OUTCOME_STATUSES, 'lag_sum', *ENGAGEMENT_FIELDS):
+            setattr(row, field, getattr(row, field) + delta[field])
+        histogram = row.lag_histogram or [0] * (len(LAG_BUCKETS) + 1)
+        row.lag_histogram = [count + added for count, added in zip(histogram, delta['lag_histogram'])]
+
+    PostRollup.objects.bulk_create(created)
+    PostRollup.objects.bulk_update(updated, [*OUTCOME_STATUSES, 'lag_sum', 'lag_histogram', *ENGAGEMENT_FIELDS])
+
+
+def _advance(name, rows_for, time_field, deltas_for) -> int:
+    """Fold one batch of a source past its cursor into the rollups; returns the rows folded"""
+    # Ids of rows younger than the settle window may be followed by lower ids
+    # of transactions still committing; stop short of them rather than skip those
+    cutoff = timezone.now() - timedelta(seconds=settings.ROLLUP_SETTLE_SECONDS)
+    with transaction.atomic():
+        # Lock every source's cursor, always in the same order: folds of either
+        # source read and rewrite the same rollup rows
+        cursors = {cursor.name: cursor for cursor in RollupCursor.objects.select_for_update().filter(name__in=SOURCES).order_by('name')}
+        cursor = cursors[name]
+        rows = list(takewhile(lambda row: row[time_field] <= cutoff, rows_for(cursor.position)[:settings.ROLLUP_BATCH]))
+        if not rows:
+            return 0
+        apply_deltas(deltas_for(rows, cursor.position))
+        cursor.position = rows[-1]['id']
+        cursor.save(update_fields=['position', 'updated_at'])
+    return len(rows)
+
+
+def _outcome_rows(after):
+    return (
+        PublishOutcome.objects.filter(id__gt=after).order_by('id')
+        .values('id', 'user_id', 'platform', 'status', 'occurred_at', 'lag_seconds')
+    )
+
+
+def _snapshot_rows(after):
+    return (
+        EngagementSnapshot.objects.filter(id__gt=after).order_by('id')
+        .values('id', 'post_id', 'post__user_id', 'post__platform', 'collected_at', *ENGAGEMENT_FIELDS)
+    )
+
+
+def update_rollups(max_batches=None) -> dict:
+    """
+    Fold new outcomes and snapshots into the rollups, up to max_batches
+    batches per source. Returns {source: rows folded}.
+    """
+    # A run started by the beat can overlap one the task queued itself; the
+    # cursor locks above serialize them in the database, this skips the
+    # overlapping run (and covers databases without SELECT ... FOR UPDATE)
+    try:
+        locked = cache.add(LOCK_KEY, 1, timeout=settings.ROLLUP_LOCK_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Rollup lock unavailable, relying on the cursor row locks: {e}")
+        locked = None
+    if locked is False:
+        logger.info("Rollups are already being updated, skipping this run")
+        return {}
+    try:
+        return _update_rollups(max_batches or settings.ROLLUP_MAX_BATCHES)
+    finally:
+        if locked:
+            cache.delete(LOCK_KEY)
+
+
+def _update_rollups(max_batches) -> dict:
+    for name in SOURCES:
+        RollupCursor.objects.get_or_create(name=name)
+    sources = {
+        'outcomes': (_outcome_rows, 'occurred_at', lambda rows, after: outcome_deltas(rows)),
+        'engagement': (_snapshot_rows, 'collected_at', engagement_deltas),
+    }
+    folded = {}
+    for name, (rows_for, time_field, deltas_for) in sources.items():
+        folded[name] = 0
+        for _ in range(max_batches):
+            count = _advance(name, rows_for, time_field, deltas_for)
+            folded[name] += count
+            if count < settings.ROLLUP_BATCH:
+                break
+    return folded
+
+
+def lag_percentile(histogram, percentile):
+    """Estimate a percentile of publish lag, interpolating linearly inside the bucket it falls in"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = total * percentile / 100
+    seen, lower = 0, 0
+    for bound, count in zip((*LAG_BUCKETS, None), histogram):
+        if count and seen + count >= rank:
+            if bound is None:
+                # Beyond the last bound all that's known is that it's at least that
+                return float(lower)
+            return round(lower + (bound - lower) * (rank - seen) / count, 3)
+        seen += count
+        if bound is not None:
+            lower = bound
+    return float(lower)
+
+
+def summarize(rows) -> dict:
+    """Totals of rollup rows: status counts, lag statistics and engagement"""
+    totals = _empty_delta()
+    for row in rows:
+        for field in (*OUTCOME_STATUSES, 'lag_sum', *ENGAGEMENT_FIELDS):
+            totals[field] += row[field]
+        for index, count in enumerate(row['lag_histogram'] or []):
+            totals['lag_histogram'][index] += count
+    histogram = totals.pop('lag_histogram')
+    lag_sum = totals.pop('lag_sum')
+    lag_count = sum(histogram)
+    totals['publish_lag'] = {
+        'count': lag_count,
+        'mean': round(lag_sum / lag_count, 3) if lag_count else None,
+        **{f'p{percentile}': lag_percentile(histogram, percentile) for percentile in PERCENTILES},
+    }
+    return totals
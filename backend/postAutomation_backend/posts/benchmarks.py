@@ -0,0 +1,76 @@
+"""
+Shared helpers for the benchmark management commands
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+from django.utils import timezone
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(max(int(round(pct / 100 * len(ordered))) - 1, 0), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(values, scale=1.0):
+    """p50/p90/p99/max/mean of a list of numbers, multiplied by scale"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values) * scale, 3),
+        'p50': round(percentile(values, 50) * scale, 3),
+        'p90': round(percentile(values, 90) * scale, 3),
+        'p99': round(percentile(values, 99) * scale, 3),
+        'max': round(max(values) * scale, 3),
+    }
+
+
+def rss_kb():
+    """Current resident set size of this process in KiB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return peak_rss_kb()
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, config, results, output=None):
+    """
+    Emit a machine-readable benchmark record so runs can be compared.
+    Returns the JSON text; also writes it to `output` when given.
+    """
+    record = {
+        'benchmark': name,
+        'timestamp': timezone.now().isoformat(),
+        'revision': git_revision(),
+        'config': config,
+        'results': results,
+    }
+    text = json.dumps(record, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as fh:
+            fh.write(text + '\n')
+    return text
@@ -0,0 +1,138 @@
+"""
+Per-platform circuit breaker shared by all workers through the cache
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Tracks provider health for one platform endpoint.
+
+    The breaker opens when, within the current window, enough calls were made
+    and either the error rate or the slow-call rate crosses its threshold.
+    While open, no calls are made. After CIRCUIT_BREAKER_OPEN_SECONDS it turns
+    half-open and lets a few probe calls through: if they all succeed the
+    breaker closes, if any fails it opens again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _key(self, suffix: str) -> str:
+        return f"breaker:{self.name}:{suffix}"
+
+    def _window_key(self, counter: str) -> str:
+        bucket = int(time.time() // settings.CIRCUIT_BREAKER_WINDOW)
+        return self._key(f"{counter}:{bucket}")
+
+    def _incr(self, key: str, timeout: int) -> int:
+        cache.add(key, 0, timeout=timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=timeout)
+            return 1
+
+    @property
+    def opened_at(self):
+        return cache.get(self._key('opened_at'))
+
+    @property
+    def state(self) -> str:
+        opened_at = self.opened_at
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at < settings.CIRCUIT_BREAKER_OPEN_SECONDS:
+            return OPEN
+        return HALF_OPEN
+
+    def remaining_open_seconds(self) -> float:
+        opened_at = self.opened_at
+        if opened_at is None:
+            return 0
+        return max(settings.CIRCUIT_BREAKER_OPEN_SECONDS - (time.time() - opened_at), 0)
+
+    def allow_request(self) -> bool:
+        """Whether a call to the platform may be made right now"""
+        try:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == OPEN:
+                return False
+            probes = self._incr(self._key('probes'), settings.CIRCUIT_BREAKER_OPEN_SECONDS)
+            return probes <= settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} unavailable, allowing request: {e}")
+            return True
+
+    def record_success(self, duration: float) -> None:
+        try:
+            if self.state == HALF_OPEN:
+                if duration >= settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS:
+                    self._open()
+                    return
+                successes = self._incr(self._key('probe_successes'), settings.CIRCUIT_BREAKER_OPEN_SECONDS)
+                if successes >= settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS:
+                    self._close()
+                return
+            self._record_call(failed=False, slow=duration >= settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} unavailable: {e}")
+
+    def record_failure(self, duration: float) -> None:
+        try:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._record_call(failed=True, slow=duration >= settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} unavailable: {e}")
+
+    def _record_call(self, failed: bool, slow: bool) -> None:
+        timeout = settings.CIRCUIT_BREAKER_WINDOW * 2
+        calls = self._incr(self._window_key('calls'), timeout)
+        failures = self._incr(self._window_key('failures'), timeout) if failed else cache.get(self._window_key('failures'), 0)
+        slow_calls = self._incr(self._window_key('slow'), timeout) if slow else cache.get(self._window_key('slow'), 0)
+
+        if calls < settings.CIRCUIT_BREAKER_MIN_CALLS or self.state != CLOSED:
+            return
+        if (failures / calls >= settings.CIRCUIT_BREAKER_ERROR_RATE
+                or slow_calls / calls >= settings.CIRCUIT_BREAKER_SLOW_RATE):
+            logger.warning(
+                f"Opening circuit breaker for {self.name}: "
+                f"{failures}/{calls} failed, {slow_calls}/{calls} slow"
+            )
+            self._open()
+
+    def _open(self) -> None:
+        cache.set(self._key('opened_at'), time.time(), timeout=None)
+        cache.delete_many([self._key('probes'), self._key('probe_successes')])
+
+    def _close(self) -> None:
+        logger.info(f"Closing circuit breaker for {self.name}")
+        cache.delete_many([
+            self._key('opened_at'), self._key('probes'), self._key('probe_successes'),
+            self._window_key('calls'), self._window_key('failures'), self._window_key('slow'),
+        ])
+
+    def snapshot(self) -> dict:
+        """State summary for the health endpoint"""
+        state = self.state
+        data = {'state': state}
+        if state != CLOSED:
+            data['retry_in_seconds'] = round(self.remaining_open_seconds())
+        return data
+
+
+def get_breaker(platform: str) -> CircuitBreaker:
+    return CircuitBreaker(platform.lower())
@@ -0,0 +1,144 @@
+"""
+Engagement ingestion for published posts.
+
+Every ENGAGEMENT_INTERVAL a beat task finds the posts published within
+ENGAGEMENT_WINDOW_SECONDS and gives each connected account one
+collect_account_engagement task with its posts. That task looks posts up
+with the platform's batch endpoint, METRICS_BATCH_SIZE at a time (100 tweets
+per GET /2/tweets), and stores one EngagementSnapshot per post and batch
+insert, so a run costs a few API calls and queries per batch, not per post.
+
+Each lookup first takes a unit of the account's quota for the current
+window (ENGAGEMENT_QUOTA, per platform). An account that is out of quota, or
+that the platform rate limits, keeps its remaining posts for the next run.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .metrics import classify_error
+from .models import EngagementSnapshot, Post, SocialAccount
+from .social_integrations import get_platform_integration
+
+logger = logging.getLogger(__name__)
+
+
+def _quota_key(social_account) -> str:
+    window = int(time.time()) // settings.ENGAGEMENT_QUOTA_WINDOW
+    return f"engagement:quota:{social_account.id}:{window}"
+
+
+def take_quota(social_account) -> bool:
+    """Use one engagement lookup of the account's allowance for the current window"""
+    limit = settings.ENGAGEMENT_QUOTA.get(social_account.platform)
+    if not limit:
+        return True
+    key = _quota_key(social_account)
+    try:
+        cache.add(key, 0, timeout=settings.ENGAGEMENT_QUOTA_WINDOW)
+        used = cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=settings.ENGAGEMENT_QUOTA_WINDOW)
+        return True
+    except Exception as e:
+        logger.warning(f"Engagement quota tracking unavailable: {e}")
+        return True
+    return used <= limit
+
+
+def exhaust_quota(social_account) -> None:
+    """Stop lookups for the account until the window ends, e.g. after a 429"""
+    limit = settings.ENGAGEMENT_QUOTA.get(social_account.platform) or 1
+    try:
+        cache.set(_quota_key(social_account), limit, timeout=settings.ENGAGEMENT_QUOTA_WINDOW)
+    except Exception as e:
+        logger.warning(f"Engagement quota tracking unavailable: {e}")
+
+
+def due_posts(now=None):
+    """Published posts inside the engagement window that weren't collected this interval"""
+    now = now or timezone.now()
+    # A little under the interval, so posts collected late in the last run are still due
+    fresh_after = now - timedelta(seconds=settings.ENGAGEMENT_INTERVAL * 0.9)
+    return Post.objects.filter(
+        status='posted',
+        scheduled_time__gte=now - timedelta(seconds=settings.ENGAGEMENT_WINDOW_SECONDS),
+        external_post_id__isnull=False,
+    ).filter(Q(engagement_updated_at__isnull=True) | Q(engagement_updated_at__lt=fresh_after))
+
+
+def plan(now=None):
+    """{social_account_id: [post_id, ...]} for the posts that are due, in two queries"""
+    by_owner = defaultdict(list)
+    for post_id, user_id, platform in due_posts(now).values_list('id', 'user_id', 'platform').order_by():
+        by_owner[(user_id, platform)].append(post_id)
+    if not by_owner:
+        return {}
+    accounts = SocialAccount.objects.filter(
+        user_id__in={user_id for user_id, _ in by_owner}, is_active=True,
+    ).values_list('id', 'user_id', 'platform')
+    return {
+        account_id: by_owner[(user_id, platform)]
+        for account_id, user_id, platform in accounts
+        if (user_id, platform) in by_owner
+    }
+
+
+def store(posts, counts, now) -> int:
+    """
+    Record a batch's counts; posts the platform didn't return are only marked
+    as collected. Posts whose counts changed get a new updated_at (bulk_update
+    skips auto_now), so the changes feed picks them up; a collection that
+    changes nothing doesn't send every published post to every client again.
+    """
+    snapshots = []
+    for post in posts:
+        values = counts.get(post.external_post_id)
+        if values is not None:
+            snapshots.append(EngagementSnapshot(post=post, collected_at=now, **values))
+            if values != post.engagement:
+                post.updated_at = now
+            post.engagement = values
+        post.engagement_updated_at = now
+    EngagementSnapshot.objects.bulk_create(snapshots)
+    Post.objects.bulk_update(posts, ['engagement', 'engagement_updated_at', 'updated_at'])
+    return len(snapshots)
+
+
+def collect_account(social_account, post_ids) -> int:
+    """Collect engagement of an account's posts batch by batch; returns the snapshots stored"""
+    integration = get_platform_integration(social_account.platform, social_account)
+    if not integration or not integration.METRICS_BATCH_SIZE:
+        return 0
+    if not integration.breaker.allow_request():
+        logger.info(f"Skipping engagement for account {social_account.id}, {social_account.platform} circuit breaker is open")
+        return 0
+    posts = list(
+        Post.objects.filter(id__in=post_ids, user_id=social_account.user_id, platform=social_account.platform)
+        .exclude(external_post_id=None).only('id', 'external_post_id', 'engagement', 'updated_at').order_by('id')
+    )
+    if not posts:
+        return 0
+
+    integration.refresh_token_if_needed()
+    size = integration.METRICS_BATCH_SIZE
+    stored = 0
+    for start in range(0, len(posts), size):
+        batch = posts[start:start + size]
+        if not take_quota(social_account):
+            logger.info(f"Engagement quota of account {social_account.id} used up, {len(posts) - start} posts left for the next run")
+            break
+        counts, error = integration.fetch_metrics([post.external_post_id for post in batch])
+        if error:
+            if classify_error(error) == 'rate_limited':
+                exhaust_quota(social_account)
+                logger.info(f"Engagement lookups of account {social_account.id} rate limited: {error}")
+                break
+            logger.warning(f"Engagement lookup for account {social_account.id} failed: {error}")
+            continue
+        stored += store(batch, counts, timezone.now())
+    return stored
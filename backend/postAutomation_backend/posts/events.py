@@ -0,0 +1,169 @@
+"""
+Per-user Server-Sent Events for post status changes.
+
+Workers publish each status transition to the Redis channel
+events:user:<user_id>. Every ASGI process keeps one pattern subscription,
+shared by all of its open streams, and fans each message out to the
+in-memory queues of that user's connections. An open dashboard therefore
+costs a queue and a coroutine rather than a Redis connection or a poll:
+
+    const events = new EventSource(`/api/events/?token=${accessToken}`);
+    events.addEventListener('post.status', (e) => update(JSON.parse(e.data)));
+
+Events aren't stored. A client that reconnects (or gets an 'overflow'
+event for falling behind) should re-read what it shows once.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import defaultdict
+from django.conf import settings
+from django.utils import timezone
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'events:user:'
+
+# Put on a connection's queue when it has fallen too far behind
+OVERFLOW = object()
+
+_client = None
+_retry_at = 0.0
+
+# After a failed publish, stop trying to reach Redis for this long
+RETRY_AFTER_SECONDS = 30
+
+
+def channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.EVENTS_REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def publish(user_id: int, event_type: str, data: dict) -> None:
+    """Send an event to the user's open streams; never raises"""
+    global _retry_at
+    if time.monotonic() < _retry_at:
+        return
+    try:
+        get_redis().publish(channel(user_id), json.dumps({'type': event_type, 'data': data}, default=str))
+    except redis.RedisError as e:
+        _retry_at = time.monotonic() + RETRY_AFTER_SECONDS
+        logger.warning(f"Event stream unavailable, dropping events for {RETRY_AFTER_SECONDS}s: {e}")
+
+
+def publish_post_status(post, status=None) -> None:
+    publish(post.user_id, 'post.status', {
+        'id': post.id,
+        'platform': post.platform,
+        'status': status or post.status,
+        'external_post_id': post.external_post_id,
+        'campaign': post.campaign_id,
+        'at': timezone.now().isoformat(),
+    })
+
+
+def format_event(event_type: str, data: str) -> str:
+    """One SSE frame; `data` is already JSON and so has no newlines"""
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+class EventHub:
+    """Fan-out of the process's Redis subscription to its open streams"""
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self._listener = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.subscribers[user_id].add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+        if not self.subscribers and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    def dispatch(self, user_id: int, payload) -> None:
+        for queue in list(self.subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Don't buffer without limit for a stalled client; make it resync instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(OVERFLOW)
+
+    async def _listen(self):
+        while self.subscribers:
+            client = aioredis.Redis.from_url(settings.EVENTS_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+                    user_id = int(message['channel'].decode().rsplit(':', 1)[1])
+                    self.dispatch(user_id, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event subscription lost, reconnecting: {e}")
+            finally:
+                # A reconnect starts from a new client; don't leave this one's connections open
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(1)
+
+
+# One hub per event loop: ASGI servers run one loop per process, but the
+# development server runs each async view in a loop of its own
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub() -> EventHub:
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = EventHub()
+    return hub
+
+
+async def stream(user_id: int):
+    """SSE frames for a user's connection until the client goes away"""
+    hub = get_hub()
+    queue = hub.subscribe(user_id)
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+        yield format_event('ready', json.dumps({'user_id': user_id}))
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            if payload is OVERFLOW:
+                yield format_event('overflow', '{}')
+                return
+            event = json.loads(payload)
+            yield format_event(event['type'], json.dumps(event['data']))
+    finally:
+        hub.unsubscribe(user_id, queue)
@@ -0,0 +1,327 @@
+"""
+Local stand-in for the Twitter, LinkedIn, Instagram and YouTube upload
+endpoints used in social_integrations.py, for benchmarks and tests. It can
+also host media files (server.add_media) for the media pipeline.
+
+    with fake_platform_apis(latency=0.05, error_rate=0.01, rate_limit=50) as server:
+        ...  # integrations now talk to http://127.0.0.1:<port>
+        print(server.stats)
+"""
+import email
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from django.conf import settings
+from django.test import override_settings
+from .social_integrations import InstagramIntegration, LinkedInIntegration, TwitterIntegration, YouTubeIntegration
+
+ROUTES = [
+    ('twitter', re.compile(r'^/twitter/tweets$')),
+    ('twitter', re.compile(r'^/twitter/oauth2/token$')),
+    ('twitter', re.compile(r'^/twitter/media/upload$')),
+    ('linkedin', re.compile(r'^/linkedin/ugcPosts$')),
+    ('instagram', re.compile(r'^/instagram/[^/]+/media$')),
+    ('instagram', re.compile(r'^/instagram/[^/]+/media_publish$')),
+    ('youtube', re.compile(r'^/youtube-upload/videos(\?.*)?$')),
+    ('youtube', re.compile(r'^/youtube-upload/sessions/\d+$')),
+]
+
+
+class FakePlatformServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None):
+        super().__init__(('127.0.0.1', 0), FakePlatformHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.stats = {}
+        self.media = {}
+        # Chunked uploads by media id, and APPEND segments that should fail
+        self.uploads = {}
+        self.failing_segments = {}
+        # Resumable video upload sessions by id, and chunk offsets whose PUT should fail
+        self.video_sessions = {}
+        self.failing_video_offsets = {}
+        self.tweets = []
+        # Instagram containers by id; video containers report IN_PROGRESS for this many status checks
+        self.containers = {}
+        self.video_processing_checks = 2
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def add_media(self, name, body, content_type='image/jpeg'):
+        """Serve `body` at /media/<name> and return its URL"""
+        self.media[name] = (content_type, body)
+        return f"{self.base_url}/media/{name}"
+
+    def count(self, platform, outcome):
+        with self.lock:
+            key = f"{platform}:{outcome}"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def over_rate_limit(self, platform):
+        """Fixed one-second window per platform, like a provider's per-app limit"""
+        if not self.rate_limit:
+            return False
+        second = int(time.time())
+        with self.lock:
+            window, used = self.windows.get(platform, (second, 0))
+            if window != second:
+                window, used = second, 0
+            used += 1
+            self.windows[platform] = (window, used)
+        return used > self.rate_limit
+
+
+class FakePlatformHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _form(self, body):
+        """Fields of a urlencoded or multipart form body"""
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+            return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                    for part in message.get_payload()}
+        return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+    def _twitter_upload(self, form):
+        """INIT/APPEND/FINALIZE/STATUS like the Twitter media upload endpoint"""
+        server = self.server
+        command = form.get('command')
+        if isinstance(command, bytes):
+            command = command.decode()
+        media_id = form.get('media_id')
+        if isinstance(media_id, bytes):
+            media_id = media_id.decode()
+
+        if command == 'INIT':
+            media_id = str(next(server.ids))
+            server.uploads[media_id] = {
+                'total_bytes': int(form['total_bytes']), 'media_type': form.get('media_type'),
+                'segments': {}, 'appends': 0, 'state': None,
+            }
+            self._send(202, {'data': {'id': media_id, 'expires_after_secs': 86400}})
+            return
+        upload = server.uploads.get(media_id)
+        if upload is None:
+            self._send(400, {'detail': f'Unknown media_id {media_id}'})
+        elif command == 'APPEND':
+            segment = int(form['segment_index'])
+            if server.failing_segments.get(segment, 0) > 0:
+                server.failing_segments[segment] -= 1
+                self._send(503, {'detail': 'Service Unavailable'})
+                return
+            upload['appends'] += 1
+            upload['segments'][segment] = len(form['media'])
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif command == 'FINALIZE':
+            received = sum(upload['segments'].values())
+            if received != upload['total_bytes']:
+                self._send(400, {'detail': f"Expected {upload['total_bytes']} bytes, got {received}"})
+                return
+            data = {'id': media_id}
+            if upload['media_type'].startswith('video/'):
+                upload['state'] = 'in_progress'
+                data['processing_info'] = {'state': 'pending', 'check_after_secs': 0}
+            self._send(200, {'data': data})
+        elif command == 'STATUS':
+            upload['state'] = 'succeeded'
+            self._send(200, {'data': {'id': media_id, 'processing_info': {'state': 'succeeded'}}})
+        else:
+            self._send(400, {'detail': f'Unknown command {command}'})
+
+    def _youtube_upload(self, body):
+        """Resumable upload sessions like the YouTube Data API upload endpoint"""
+        server = self.server
+        if self.command == 'POST':
+            session_id = str(next(server.ids))
+            server.video_sessions[session_id] = {
+                'total': int(self.headers['X-Upload-Content-Length']),
+                'received': 0, 'bytes_sent': 0, 'metadata': json.loads(body or b'{}'), 'video_id': None,
+            }
+            self._send(200, {}, {'Location': f"{server.base_url}/youtube-upload/sessions/{session_id}"})
+            return
+
+        session = server.video_sessions.get(self.path.rsplit('/', 1)[1])
+        if session is None:
+            self._send(404, {'error': {'message': 'Upload session not found'}})
+            return
+        match = re.match(r'bytes (\*|(\d+)-(\d+))/(\d+)$', self.headers.get('Content-Range', ''))
+        if match and match.group(2) is not None:
+            start = int(match.group(2))
+            if server.failing_video_offsets.get(start, 0) > 0:
+                server.failing_video_offsets[start] -= 1
+                self._send(503, {'error': {'message': 'Backend Error'}})
+                return
+            session['bytes_sent'] += len(body)
+            if start == session['received']:
+                session['received'] += len(body)
+        if session['received'] >= session['total']:
+            session['video_id'] = session['video_id'] or f"video-{next(server.ids)}"
+            self._send(201, {'id': session['video_id'], 'snippet': session['metadata'].get('snippet')})
+            return
+        headers = {'Range': f"bytes=0-{session['received'] - 1}"} if session['received'] else {}
+        self._send(308, {}, headers)
+
+    def _instagram_container(self, form):
+        server = self.server
+        if self.path.endswith('/media'):
+            container_id = str(next(server.ids))
+            is_video = 'video_url' in form
+            server.containers[container_id] = {
+                'form': form,
+                'status_code': 'IN_PROGRESS' if is_video else 'FINISHED',
+                'checks_left': server.video_processing_checks if is_video else 0,
+            }
+            self._send(200, {'id': container_id})
+            return
+        container = server.containers.get(form.get('creation_id'))
+        if container is None or container['status_code'] != 'FINISHED':
+            self._send(400, {'error': {'message': 'Media ID is not available', 'code': 9007}})
+            return
+        container['status_code'] = 'PUBLISHED'
+        self._send(200, {'id': str(next(server.ids))})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == '/twitter/media/upload':
+            self._twitter_upload({key: values[0] for key, values in parse_qs(parts.query).items()})
+            return
+        if parts.path.startswith('/instagram/'):
+            container = self.server.containers.get(parts.path.rsplit('/', 1)[1])
+            if container is None:
+                self._send(404, {'error': {'message': 'Unknown container'}})
+                return
+            if container['status_code'] == 'IN_PROGRESS':
+                container['checks_left'] -= 1
+                if container['checks_left'] < 0:
+                    container['status_code'] = 'FINISHED'
+            self._send(200, {'status_code': container['status_code'], 'status': container['status_code']})
+            return
+        self._serve_media()
+
+    def do_HEAD(self):
+        self._serve_media(head=True)
+
+    def _serve_media(self, head=False):
+        name = self.path[len('/media/'):] if self.path.startswith('/media/') else None
+        if name not in self.server.media:
+            self._send(404, {'detail': 'Not found'})
+            return
+        content_type, body = self.server.media[name]
+        status = 200
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if match and not head:
+            status, body = 206, body[int(match.group(1)):]
+        self.server.count('media', 'head' if head else 'ok')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        server = self.server
+        platform = next((name for name, pattern in ROUTES if pattern.match(self.path)), None)
+        if platform is None:
+            self._send(404, {'detail': 'Not found', 'message': 'Not found'})
+            return
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if server.over_rate_limit(platform):
+            server.count(platform, '429')
+            self._send(429, {'detail': 'Too Many Requests', 'message': 'Too Many Requests'}, {'Retry-After': '1'})
+            return
+        if random.random() < server.error_rate:
+            server.count(platform, '503')
+            self._send(503, {'detail': 'Service Unavailable', 'message': 'Service Unavailable'})
+            return
+
+        server.count(platform, 'ok')
+        if self.path.endswith('/media/upload'):
+            self._twitter_upload(self._form(body))
+            return
+        if platform == 'youtube':
+            self._youtube_upload(body)
+            return
+        if platform == 'instagram':
+            self._instagram_container(self._form(body))
+            return
+        object_id = str(next(server.ids))
+        if self.path.endswith('/tweets'):
+            server.tweets.append(json.loads(body or b'{}'))
+            self._send(201, {'data': {'id': object_id, 'text': ''}})
+        elif self.path.endswith('/oauth2/token'):
+            self._send(200, {'access_token': f'token-{object_id}', 'expires_in': 7200})
+        elif self.path.endswith('/ugcPosts'):
+            self._send(201, {}, {'Location': f'/ugcPosts/urn:li:share:{object_id}'})
+        else:
+            self._send(200, {'id': object_id})
+
+    do_PUT = do_POST
+
+
+@contextmanager
+def fake_platform_apis(**options):
+    """Run a FakePlatformServer and point the integrations at it"""
+    server = FakePlatformServer(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    originals = {}
+    for platform, cls in (('twitter', TwitterIntegration), ('linkedin', LinkedInIntegration),
+                          ('instagram', InstagramIntegration)):
+        originals[cls] = cls.API_BASE
+        cls.API_BASE = f"{server.base_url}/{platform}"
+    originals[YouTubeIntegration] = YouTubeIntegration.API_BASE
+    upload_base = YouTubeIntegration.UPLOAD_BASE
+    YouTubeIntegration.API_BASE = f"{server.base_url}/youtube"
+    YouTubeIntegration.UPLOAD_BASE = f"{server.base_url}/youtube-upload"
+    # Media hosted here is served from a loopback address
+    allowed_hosts = override_settings(OUTBOUND_ALLOWED_HOSTS=[*settings.OUTBOUND_ALLOWED_HOSTS, server.server_address[0]])
+    allowed_hosts.enable()
+    try:
+        yield server
+    finally:
+        allowed_hosts.disable()
+        YouTubeIntegration.UPLOAD_BASE = upload_base
+        for cls, api_base in originals.items():
+            cls.API_BASE = api_base
+        server.shutdown()
+        server.server_close()
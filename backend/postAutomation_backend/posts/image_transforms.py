@@ -0,0 +1,92 @@
+"""
+CPU-bound image normalization, run in the media process pool.
+
+Deliberately free of Django imports so it can be imported cheaply by
+spawned pool processes; everything it needs comes in as arguments.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from PIL import Image, ImageOps
+
+# JPEG qualities tried in turn until the encoded image fits max_bytes
+QUALITY_STEPS = (90, 85, 80, 70, 60, 50)
+
+
+def _fit_aspect_ratio(image, aspect_ratio):
+    """Center-crop to the nearest allowed width / height ratio, rounding inwards"""
+    if not aspect_ratio:
+        return image
+    low, high = aspect_ratio
+    width, height = image.size
+    ratio = width / height
+    if ratio < low:
+        new_height = int(width / low)
+        top = (height - new_height) // 2
+        return image.crop((0, top, width, top + new_height))
+    if ratio > high:
+        new_width = int(height * high)
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    return image
+
+
+def _fit_dimensions(image, min_size, max_size):
+    width, height = image.size
+    if max_size and (width > max_size[0] or height > max_size[1]):
+        image = image.copy()
+        image.thumbnail(max_size, Image.LANCZOS)
+    elif min_size and (width < min_size[0] or height < min_size[1]):
+        scale = max(min_size[0] / width, min_size[1] / height)
+        image = image.resize((round(width * scale), round(height * scale)), Image.LANCZOS)
+    return image
+
+
+def _flatten(image):
+    """JPEG has no alpha channel or palette; composite onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+def normalize_image(source_path, cache_dir, profile):
+    """
+    Produce a variant of the image at `source_path` that satisfies `profile`
+    (aspect_ratio, min_size, max_size, max_bytes) as a JPEG in the
+    content-addressed cache under `cache_dir`.
+    Returns the variant's {'sha256', 'content_type', 'size', 'width', 'height'}.
+    """
+    with Image.open(source_path) as original:
+        if getattr(original, 'is_animated', False):
+            raise ValueError("animated images can't be normalized without losing the animation")
+        image = ImageOps.exif_transpose(original)
+        image = _fit_aspect_ratio(image, profile.get('aspect_ratio'))
+        image = _fit_dimensions(image, profile.get('min_size'), profile.get('max_size'))
+        image = _flatten(image)
+
+    max_bytes = profile.get('max_bytes')
+    for quality in QUALITY_STEPS:
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        if not max_bytes or buffer.tell() <= max_bytes:
+            break
+    data = buffer.getvalue()
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = os.path.join(cache_dir, sha256[:2], sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.fetch-')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+    return {
+        'sha256': sha256,
+        'content_type': 'image/jpeg',
+        'size': len(data),
+        'width': image.size[0],
+        'height': image.size[1],
+    }
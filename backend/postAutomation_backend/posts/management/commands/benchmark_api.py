@@ -0,0 +1,119 @@
+"""
+API load benchmark over data created by seed_benchmark_data.
+
+    python manage.py benchmark_api --requests 50 --output api.json
+
+Runs each scenario in-process through the full middleware and DRF stack as
+the seeded user with the most posts (and a typical user) and reports latency
+percentiles and queries per request. The create scenario does not enqueue
+publish tasks; the posts it creates are deleted afterwards.
+"""
+import time
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from posts.benchmarks import summarize, write_results
+from posts.models import Post, SocialAccount
+from .seed_benchmark_data import SEED_USER_PREFIX
+
+User = get_user_model()
+
+
+def scenarios(post_count):
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    last_page = max((post_count + page_size - 1) // page_size, 1)
+    return [
+        ('list', 'get', '/api/posts/'),
+        ('search', 'get', '/api/posts/?search=launch'),
+        ('filter', 'get', '/api/posts/?platform=twitter&status=posted'),
+        ('ordering', 'get', '/api/posts/?ordering=created_at'),
+        ('deep_page', 'get', f'/api/posts/?page={last_page}'),
+        ('mid_page', 'get', f'/api/posts/?page={max(last_page // 2, 1)}'),
+        ('stats', 'get', '/api/posts/stats/'),
+        ('social_status', 'get', '/api/social-accounts/status/'),
+        ('create', 'post', '/api/posts/'),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the posts API against seeded data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help='Requests per scenario per user')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', help='Comma-separated scenario names to run')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+
+    def handle(self, *args, **options):
+        seeded = (
+            User.objects.filter(username__startswith=SEED_USER_PREFIX)
+            .annotate(post_count=Count('post'))
+            .order_by('-post_count')
+        )
+        heaviest = seeded.first()
+        if heaviest is None:
+            raise CommandError('No seeded data found. Run seed_benchmark_data first.')
+        typical = seeded[seeded.count() // 2]
+
+        only = set(options['only'].split(',')) if options['only'] else None
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+
+        results = {}
+        for label, user in (('heavy_user', heaviest), ('typical_user', typical)):
+            client = APIClient(HTTP_HOST=host)
+            client.force_authenticate(user=user)
+            results[label] = {'posts': user.post_count}
+            for name, method, path in scenarios(user.post_count):
+                if only and name not in only:
+                    continue
+                results[label][name] = self.run_scenario(client, user, method, path, options)
+
+        config = {
+            'requests': options['requests'],
+            'database': connection.vendor,
+            'total_posts': Post.objects.count(),
+            'seeded_users': seeded.count(),
+        }
+        self.stdout.write(write_results('api', config, results, options['output']))
+
+    def run_scenario(self, client, user, method, path, options):
+        platform = SocialAccount.objects.filter(user=user, is_active=True).values_list('platform', flat=True).first()
+        created_before = timezone.now()
+        latencies, queries, statuses = [], [], {}
+
+        # Keep the create path off the broker; we're measuring the API
+        with mock.patch('posts.views.dispatch_publish'):
+            for index in range(options['warmup'] + options['requests']):
+                kwargs = {}
+                if method == 'post':
+                    kwargs = {'format': 'json', 'data': {
+                        'platform': platform or 'twitter',
+                        'content': f'Benchmark create {index}',
+                        'media_url': 'https://example.com/media.jpg',
+                        'scheduled_time': (timezone.now() + timedelta(days=1)).isoformat(),
+                    }}
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(path, **kwargs)
+                    elapsed = time.perf_counter() - started
+                if index < options['warmup']:
+                    continue
+                latencies.append(elapsed)
+                queries.append(len(captured.captured_queries))
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        if method == 'post':
+            Post.objects.filter(user=user, created_at__gte=created_before, content__startswith='Benchmark create').delete()
+
+        return {
+            'latency_ms': summarize(latencies, scale=1000),
+            'queries': summarize(queries),
+            'status_codes': statuses,
+        }
@@ -0,0 +1,239 @@
+"""
+End-to-end publish pipeline benchmark against local fake platform APIs.
+
+    python manage.py benchmark_publish --posts 2000 --workers 8 --latency-ms 80 --output publish.json
+
+Creates throwaway users, accounts and posts, releases each post at its
+scheduled_time into a pool of worker threads running publish_post (the pool
+stands in for the broker, so deferrals and retries come back through it too),
+and reports throughput, schedule lag, memory and outcome counts as JSON.
+The posts' image is served by the fake APIs and prefetched before the run,
+as the media pipeline would have done ahead of time.
+"""
+import heapq
+import io
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from PIL import Image
+from posts import media, tasks
+from posts.benchmarks import peak_rss_kb, rss_kb, summarize, write_results
+from posts.fake_platforms import fake_platform_apis
+from posts.models import Post, SocialAccount
+
+User = get_user_model()
+
+BENCH_USER_PREFIX = 'bench-publish-'
+BENCH_PLATFORMS = ('twitter', 'linkedin', 'instagram')
+
+
+class LocalBroker:
+    """Releases post ids to a thread pool when they become due"""
+
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bench-worker')
+        self.heap = []
+        self.lock = threading.Condition()
+        self.finished = {}
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def submit(self, post_id, due):
+        with self.lock:
+            heapq.heappush(self.heap, (due, post_id))
+            self.lock.notify()
+
+    def dispatch_publish(self, post, eta=None, countdown=None, priority=None):
+        """Drop-in replacement for posts.tasks.dispatch_publish"""
+        due = time.time() + (countdown or 0)
+        if eta:
+            due = eta.timestamp()
+        self.submit(post.id, due)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.stopped and (not self.heap or self.heap[0][0] > time.time()):
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.lock.wait(timeout)
+                if self.stopped:
+                    return
+                _, post_id = heapq.heappop(self.heap)
+            self.executor.submit(self._work, post_id)
+
+    def _work(self, post_id):
+        try:
+            tasks.publish_post.apply(args=(post_id,))
+        finally:
+            self.finished[post_id] = time.time()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            self.lock.notify()
+        self.executor.shutdown(wait=True)
+
+
+def measure_eta_memory(count):
+    """
+    Bytes a worker holds per ETA task: build `count` publish_post messages
+    scheduled in the future, the way they sit in a worker until they are due
+    """
+    app = tasks.publish_post.app
+    eta = timezone.now() + timedelta(days=1)
+    rss_before = rss_kb()
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    messages = [
+        app.amqp.as_task_v2(str(uuid.uuid4()), tasks.publish_post.name, args=(index,), eta=eta)
+        for index in range(count)
+    ]
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+    result = {
+        'tasks': len(messages),
+        'bytes_per_task': round(allocated / max(count, 1)),
+        'rss_delta_kb': rss_kb() - rss_before,
+    }
+    del messages
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Benchmark publish_post end to end against local fake platform APIs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent publish workers')
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--platforms', default=','.join(BENCH_PLATFORMS))
+        parser.add_argument('--spread', type=float, default=5.0,
+                            help='Seconds over which scheduled_time is spread (0 = all due at once)')
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Fake API base latency')
+        parser.add_argument('--jitter-ms', type=float, default=20.0, help='Extra random fake API latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake API calls returning 503')
+        parser.add_argument('--rate-limit', type=int, default=0, help='Fake API requests/second per platform before 429')
+        parser.add_argument('--timeout', type=float, default=600.0)
+        parser.add_argument('--eta-tasks', type=int, default=10000, help='ETA messages to build for the memory estimate')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users and posts')
+
+    def handle(self, *args, **options):
+        platforms = [p.strip() for p in options['platforms'].split(',') if p.strip() in BENCH_PLATFORMS]
+        users = self.create_accounts(options['users'], platforms)
+        try:
+            results = self.run(users, platforms, options)
+        finally:
+            if not options['keep']:
+                User.objects.filter(username__startswith=BENCH_USER_PREFIX).delete()
+
+        config = {key: options[key] for key in (
+            'posts', 'workers', 'users', 'spread', 'latency_ms', 'jitter_ms', 'error_rate', 'rate_limit',
+        )}
+        config['platforms'] = platforms
+        config['database'] = connection.vendor
+        self.stdout.write(write_results('publish', config, results, options['output']))
+
+    def create_accounts(self, count, platforms):
+        users = []
+        for index in range(count):
+            user, _ = User.objects.get_or_create(
+                username=f'{BENCH_USER_PREFIX}{index}',
+                defaults={'email': f'{BENCH_USER_PREFIX}{index}@bench.invalid'},
+            )
+            for platform in platforms:
+                SocialAccount.objects.update_or_create(
+                    user=user, platform=platform,
+                    defaults={
+                        'access_token': 'bench-token',
+                        'is_active': True,
+                        'metadata': {'instagram_account_id': f'ig-{index}', 'person_urn': f'urn:li:person:{index}'},
+                    },
+                )
+            users.append(user)
+        return users
+
+    def run(self, users, platforms, options):
+        total = options['posts']
+        start = timezone.now() + timedelta(seconds=1)
+        step = options['spread'] / total if total else 0
+        posts = Post.objects.bulk_create([
+            Post(
+                user=users[index % len(users)],
+                platform=platforms[index % len(platforms)],
+                content=f'Benchmark post {index}',
+                media_url='https://example.com/bench.jpg',
+                scheduled_time=start + timedelta(seconds=index * step),
+            )
+            for index in range(total)
+        ])
+        scheduled = {post.id: post.scheduled_time.timestamp() for post in posts}
+
+        broker = LocalBroker(options['workers'])
+        rss_before = rss_kb()
+        with fake_platform_apis(
+            latency=options['latency_ms'] / 1000,
+            jitter=options['jitter_ms'] / 1000,
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'] or None,
+        ) as server, mock.patch.object(tasks, 'dispatch_publish', broker.dispatch_publish):
+            self.prefetch_media(server, scheduled)
+            broker.start()
+            began = time.time()
+            for post_id, due in scheduled.items():
+                broker.submit(post_id, due)
+
+            deadline = began + options['timeout']
+            pending = Post.objects.filter(id__in=scheduled, status='pending')
+            while time.time() < deadline and pending.exists():
+                time.sleep(0.25)
+            duration = time.time() - began
+            broker.stop()
+            api_calls = dict(server.stats)
+
+        outcomes = dict(
+            Post.objects.filter(id__in=scheduled).values_list('status').annotate(count=Count('id'))
+        )
+        posted_ids = set(Post.objects.filter(id__in=scheduled, status='posted').values_list('id', flat=True))
+        lag = [broker.finished[post_id] - scheduled[post_id] for post_id in posted_ids if post_id in broker.finished]
+        completed = sum(count for status, count in outcomes.items() if status != 'pending')
+
+        return {
+            'duration_s': round(duration, 3),
+            'completed': completed,
+            'throughput_posts_per_s': round(completed / duration, 2) if duration else None,
+            'throughput_per_worker': round(completed / duration / options['workers'], 2) if duration else None,
+            'schedule_lag_s': summarize(lag),
+            'outcomes': outcomes,
+            'fake_api_calls': api_calls,
+            'rss_kb': rss_kb(),
+            'rss_growth_kb': rss_kb() - rss_before,
+            'peak_rss_kb': peak_rss_kb(),
+            'eta_memory': measure_eta_memory(options['eta_tasks']),
+        }
+
+    def prefetch_media(self, server, post_ids):
+        """Host the benchmark image and mark every post's media as already prefetched"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (1080, 1080), (30, 120, 200)).save(buffer, format='JPEG')
+        url = server.add_media('bench.jpg', buffer.getvalue())
+        info = media.fetch_and_inspect(url, 'instagram')
+        Post.objects.filter(id__in=post_ids).update(
+            media_url=url,
+            media_status='ready',
+            media_hash=info['sha256'],
+            media_info={key: info[key] for key in ('content_type', 'size', 'width', 'height')},
+        )
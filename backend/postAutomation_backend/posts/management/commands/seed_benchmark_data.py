@@ -0,0 +1,125 @@
+"""
+Seed synthetic users, social accounts and posts for API benchmarks.
+
+    python manage.py seed_benchmark_data --users 1000 --posts 2000000
+
+Posts per user follow a heavy-tailed (Zipf-like) distribution, so a few
+users own very large lists, like real agencies. Past posts are mostly
+posted with some failures and cancellations; future posts are pending.
+All seeded users share a username prefix and can be removed with --clear.
+"""
+import itertools
+import random
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from posts.models import Post, SocialAccount
+
+User = get_user_model()
+
+SEED_USER_PREFIX = 'bench-api-'
+
+PLATFORM_WEIGHTS = {'twitter': 40, 'linkedin': 25, 'instagram': 25, 'youtube': 10}
+PAST_STATUS_WEIGHTS = {'posted': 85, 'failed': 8, 'cancelled': 5, 'stale': 2}
+FUTURE_STATUS_WEIGHTS = {'pending': 95, 'cancelled': 5}
+
+WORDS = (
+    'launch update product team webinar hiring release sale event report growth '
+    'customer story tips weekly roadmap community feature beta partner announcement'
+).split()
+
+
+def weighted(weights):
+    return list(weights), list(itertools.accumulate(weights.values()))
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic users, social accounts and posts for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--past-days', type=int, default=365)
+        parser.add_argument('--future-days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded data first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=SEED_USER_PREFIX).delete()
+            self.stdout.write(f"Deleted {deleted} seeded rows")
+
+        users = self.seed_users(options['users'], rng)
+        self.seed_posts(users, options, rng)
+
+    def seed_users(self, count, rng):
+        existing = User.objects.filter(username__startswith=SEED_USER_PREFIX).count()
+        new_users = []
+        for index in range(existing, count):
+            user = User(username=f'{SEED_USER_PREFIX}{index}', email=f'{SEED_USER_PREFIX}{index}@bench.invalid')
+            user.set_unusable_password()
+            new_users.append(user)
+        User.objects.bulk_create(new_users, batch_size=1000)
+
+        users = list(User.objects.filter(username__startswith=SEED_USER_PREFIX).order_by('id')[:count])
+        platforms, cum_weights = weighted(PLATFORM_WEIGHTS)
+        accounts = []
+        for user in users:
+            connected = set(rng.choices(platforms, cum_weights=cum_weights, k=rng.randint(1, len(platforms))))
+            for platform in connected:
+                accounts.append(SocialAccount(
+                    user=user,
+                    platform=platform,
+                    access_token='bench-token',
+                    platform_username=f'{user.username}-{platform}',
+                    metadata={'instagram_account_id': f'ig-{user.id}', 'person_urn': f'urn:li:person:{user.id}'},
+                ))
+        SocialAccount.objects.bulk_create(accounts, batch_size=1000, ignore_conflicts=True)
+        self.stdout.write(f"Seeded {len(new_users)} users ({len(users)} total), {len(accounts)} social accounts")
+        return users
+
+    def seed_posts(self, users, options, rng):
+        total = options['posts']
+        batch_size = options['batch_size']
+        now = timezone.now()
+        past = options['past_days'] * 86400
+        future = options['future_days'] * 86400
+
+        # Zipf-like share of posts per user
+        user_cum_weights = list(itertools.accumulate(1 / (rank ** 1.1) for rank in range(1, len(users) + 1)))
+        platforms, platform_cum = weighted(PLATFORM_WEIGHTS)
+        past_statuses, past_cum = weighted(PAST_STATUS_WEIGHTS)
+        future_statuses, future_cum = weighted(FUTURE_STATUS_WEIGHTS)
+
+        created = 0
+        while created < total:
+            size = min(batch_size, total - created)
+            owners = rng.choices(users, cum_weights=user_cum_weights, k=size)
+            batch = []
+            for owner in owners:
+                offset = rng.uniform(-past, future)
+                scheduled_time = now + timedelta(seconds=offset)
+                if offset < 0:
+                    status = rng.choices(past_statuses, cum_weights=past_cum)[0]
+                else:
+                    status = rng.choices(future_statuses, cum_weights=future_cum)[0]
+                platform = rng.choices(platforms, cum_weights=platform_cum)[0]
+                content = ' '.join(rng.choices(WORDS, k=rng.randint(5, 40)))
+                batch.append(Post(
+                    user=owner,
+                    platform=platform,
+                    content=content,
+                    media_url='https://example.com/media.jpg' if platform in ('instagram', 'youtube') else None,
+                    scheduled_time=scheduled_time,
+                    status=status,
+                    external_post_id=str(rng.getrandbits(48)) if status == 'posted' else None,
+                ))
+            with transaction.atomic():
+                Post.objects.bulk_create(batch, batch_size=batch_size)
+            created += size
+            self.stdout.write(f"Seeded {created}/{total} posts")
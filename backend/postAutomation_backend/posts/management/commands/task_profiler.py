@@ -0,0 +1,49 @@
+"""
+Switch Celery task profiling on or off at runtime.
+
+    python manage.py task_profiler --sample-rate 0.05
+    python manage.py task_profiler --sample-rate 1 --dump-dir /tmp/task-profiles --dump-slowest 20
+    python manage.py task_profiler --off
+    python manage.py task_profiler --status
+
+Workers pick up changes within TASK_PROFILER_CONFIG_TTL seconds.
+"""
+import json
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from posts.task_profiling import CONFIG_CACHE_KEY, clear_config, default_config, set_config
+
+
+class Command(BaseCommand):
+    help = 'Configure sampled Celery task profiling at runtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample-rate', type=float, help='Fraction of tasks to profile (0-1)')
+        parser.add_argument('--dump-dir', help='Directory for cProfile dumps of the slowest tasks ("" to disable)')
+        parser.add_argument('--dump-slowest', type=int, help='How many of the slowest tasks to keep dumps for')
+        parser.add_argument('--off', action='store_true', help='Stop profiling (sample rate 0)')
+        parser.add_argument('--reset', action='store_true', help='Drop runtime overrides and use settings')
+        parser.add_argument('--status', action='store_true', help='Show the effective configuration')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            clear_config()
+        elif options['off']:
+            set_config(sample_rate=0.0)
+        else:
+            values = {}
+            if options['sample_rate'] is not None:
+                if not 0 <= options['sample_rate'] <= 1:
+                    raise CommandError('--sample-rate must be between 0 and 1')
+                values['sample_rate'] = options['sample_rate']
+            if options['dump_dir'] is not None:
+                values['dump_dir'] = options['dump_dir']
+            if options['dump_slowest'] is not None:
+                values['dump_slowest'] = options['dump_slowest']
+            if values:
+                set_config(**values)
+            elif not options['status']:
+                raise CommandError('Nothing to change; pass --sample-rate, --dump-dir, --dump-slowest, --off or --reset')
+
+        effective = {**default_config(), **(cache.get(CONFIG_CACHE_KEY) or {})}
+        self.stdout.write(json.dumps(effective, indent=2))
@@ -0,0 +1,444 @@
+"""
+Ahead-of-time media fetching and validation.
+
+Some time before a post is due, its media_url is downloaded once into a
+content-addressed cache (MEDIA_CACHE_DIR/<sha256[:2]>/<sha256>) and checked
+against the target platform's limits: reachability, content type, size and,
+for images, dimensions. Dead links, oversized files and wrong formats are
+reported on the post while there's still time to fix them, and at publish
+time only a local file has to be read.
+
+Images that break a platform's limits are normalized (cropped, resized,
+re-encoded) into a per-platform variant in a bounded process pool, so the
+CPU work stays off the I/O-bound fetch threads. Variants are cached by
+source hash and profile and produced once per source image.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+import requests
+from core.outbound import UnsafeURL, public_request
+from .image_transforms import normalize_image
+from .models import PlatformMedia, Post
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+
+# Accepted content types and their size limits per platform
+PLATFORM_MEDIA_LIMITS = {
+    'twitter': {
+        'types': {
+            'image/jpeg': 5 * MB, 'image/png': 5 * MB, 'image/webp': 5 * MB, 'image/gif': 15 * MB,
+            'video/mp4': 512 * MB, 'video/quicktime': 512 * MB,
+        },
+        'min_dimensions': (4, 4),
+        'max_dimensions': (8192, 8192),
+    },
+    'instagram': {
+        'types': {'image/jpeg': 8 * MB, 'video/mp4': 1024 * MB, 'video/quicktime': 1024 * MB},
+        'min_dimensions': (320, 320),
+        'max_dimensions': (1440, 1800),
+        # width / height, from 4:5 portrait to 1.91:1 landscape
+        'aspect_ratio': (0.8, 1.91),
+    },
+    'linkedin': {
+        'types': {
+            'image/jpeg': 10 * MB, 'image/png': 10 * MB, 'image/gif': 10 * MB,
+            'video/mp4': 200 * MB,
+        },
+        'max_dimensions': (6012, 6012),
+    },
+    'youtube': {
+        'types': {
+            'video/mp4': 256 * 1024 * MB, 'video/quicktime': 256 * 1024 * MB,
+            'video/webm': 256 * 1024 * MB, 'video/x-msvideo': 256 * 1024 * MB,
+        },
+    },
+}
+
+# Platforms whose integrations upload the media bytes. The others hand the
+# platform a URL, so a normalized variant is only usable there when the media
+# cache is published at MEDIA_PUBLIC_BASE_URL.
+BYTE_UPLOAD_PLATFORMS = ('twitter', 'youtube')
+
+# Bump to regenerate every cached variant after changing the transforms
+TRANSFORM_VERSION = 1
+
+_pool = None
+
+
+class MediaError(Exception):
+    """
+    Media can't be used for a post. Permanent errors (bad URL, wrong type,
+    too large) need the user to change the post; others may go away on retry.
+    """
+
+    def __init__(self, message, permanent=True):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def cache_path(digest: str) -> str:
+    return os.path.join(settings.MEDIA_CACHE_DIR, digest[:2], digest)
+
+
+def cached_path(digest: str):
+    """Local path of cached media, or None if it has been evicted"""
+    if not digest:
+        return None
+    path = cache_path(digest)
+    return path if os.path.exists(path) else None
+
+
+def _url_key(url: str) -> str:
+    return f"media:url:{hashlib.sha1(url.encode()).hexdigest()}"
+
+
+def _normalize_content_type(value) -> str:
+    return (value or '').split(';', 1)[0].strip().lower()
+
+
+def _get(url: str):
+    """GET a media URL, following redirects only to public addresses"""
+    try:
+        return public_request('get', url, settings.MEDIA_MAX_REDIRECTS, stream=True, timeout=settings.MEDIA_FETCH_TIMEOUT)
+    except UnsafeURL as e:
+        raise MediaError(f"Media URL is not allowed: {e}")
+    except requests.TooManyRedirects:
+        raise MediaError(f"Media URL redirects more than {settings.MEDIA_MAX_REDIRECTS} times")
+    except requests.RequestException as e:
+        raise MediaError(f"Media URL is unreachable: {e}", permanent=False)
+
+
+def fetch(url: str, max_bytes: int):
+    """
+    Stream `url` into the cache, hashing as it goes, and return
+    (sha256, content_type). Downloads stop as soon as they exceed max_bytes.
+    """
+    cache_dir = settings.MEDIA_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    response = _get(url)
+
+    with response:
+        if response.status_code >= 500 or response.status_code == 429:
+            raise MediaError(f"Media URL returned HTTP {response.status_code}", permanent=False)
+        if response.status_code != 200:
+            raise MediaError(f"Media URL returned HTTP {response.status_code}")
+
+        content_type = _normalize_content_type(response.headers.get('Content-Type'))
+        if content_type.startswith('text/'):
+            # Typically an HTML error or login page instead of the file
+            raise MediaError(f"Media URL serves {content_type}, not an image or video")
+        declared = int(response.headers.get('Content-Length') or 0)
+        if declared > max_bytes:
+            raise MediaError(f"Media is {declared // MB} MB, the limit is {max_bytes // MB} MB")
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.fetch-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise MediaError(f"Media is larger than the {max_bytes // MB} MB limit")
+                    digest.update(chunk)
+                    fh.write(chunk)
+            sha256 = digest.hexdigest()
+            os.makedirs(os.path.dirname(cache_path(sha256)), exist_ok=True)
+            os.replace(tmp_path, cache_path(sha256))
+        except requests.RequestException as e:
+            os.remove(tmp_path)
+            raise MediaError(f"Media download failed: {e}", permanent=False)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    return sha256, content_type
+
+
+def inspect(path: str, content_type: str = '') -> dict:
+    """Describe a cached file; images are identified by Pillow rather than trusted headers"""
+    info = {'content_type': content_type, 'size': os.path.getsize(path), 'width': None, 'height': None}
+    try:
+        with Image.open(path) as image:
+            info['content_type'] = Image.MIME.get(image.format, content_type)
+            info['width'], info['height'] = image.size
+    except (UnidentifiedImageError, OSError):
+        if info['content_type'].startswith('image/'):
+            raise MediaError(f"Media claims to be {info['content_type']} but isn't a readable image")
+    return info
+
+
+def validate(info: dict, platform: str):
+    """Raise MediaError if the media breaks one of the platform's limits"""
+    limits = PLATFORM_MEDIA_LIMITS.get(platform)
+    if not limits:
+        return
+    content_type = info['content_type']
+    max_bytes = limits['types'].get(content_type)
+    if max_bytes is None:
+        allowed = ', '.join(sorted(limits['types']))
+        raise MediaError(f"{platform} doesn't accept {content_type or 'unknown media'} (allowed: {allowed})")
+    if info['size'] > max_bytes:
+        raise MediaError(f"{content_type} media is {info['size'] // MB} MB, {platform} allows {max_bytes // MB} MB")
+
+    width, height = info['width'], info['height']
+    if not width or not height:
+        return
+    min_width, min_height = limits.get('min_dimensions', (1, 1))
+    max_width, max_height = limits.get('max_dimensions', (width, height))
+    if width < min_width or height < min_height:
+        raise MediaError(f"Image is {width}x{height}, {platform} needs at least {min_width}x{min_height}")
+    if width > max_width or height > max_height:
+        raise MediaError(f"Image is {width}x{height}, {platform} allows at most {max_width}x{max_height}")
+    if 'aspect_ratio' in limits:
+        low, high = limits['aspect_ratio']
+        if not low <= width / height <= high:
+            raise MediaError(f"Image aspect ratio {width / height:.2f} is outside {platform}'s {low}-{high} range")
+
+
+def transform_profile(platform: str):
+    """Target limits a normalized image variant for the platform has to meet, or None"""
+    limits = PLATFORM_MEDIA_LIMITS.get(platform)
+    if not limits or 'image/jpeg' not in limits['types']:
+        return None
+    if platform not in BYTE_UPLOAD_PLATFORMS and not settings.MEDIA_PUBLIC_BASE_URL:
+        return None
+    return {
+        'name': f"{platform}-v{TRANSFORM_VERSION}",
+        'aspect_ratio': limits.get('aspect_ratio'),
+        'min_size': limits.get('min_dimensions'),
+        'max_size': limits.get('max_dimensions'),
+        'max_bytes': limits['types']['image/jpeg'],
+    }
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: the parent is a threaded worker
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.MEDIA_TRANSFORM_WORKERS, mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pool
+
+
+def run_transform(source_path: str, profile: dict) -> dict:
+    global _pool
+    if multiprocessing.current_process().daemon:
+        # Celery prefork children can't start processes; run the media queue
+        # with --pool threads to get the process pool
+        return normalize_image(source_path, settings.MEDIA_CACHE_DIR, profile)
+    future = get_pool().submit(normalize_image, source_path, settings.MEDIA_CACHE_DIR, profile)
+    try:
+        return future.result(timeout=settings.MEDIA_TRANSFORM_TIMEOUT)
+    except BrokenProcessPool:
+        _pool = None
+        raise
+
+
+def _variant_index(source_sha256: str, profile_name: str) -> str:
+    return f"{cache_path(source_sha256)}.{profile_name}"
+
+
+def normalized_variant(info: dict, platform: str):
+    """
+    The platform variant of a cached image, generated on first use.
+    Returns its info dict, or None if the media can't be normalized for the platform.
+    """
+    profile = transform_profile(platform)
+    if not profile or not info['content_type'].startswith('image/'):
+        return None
+
+    index = _variant_index(info['sha256'], profile['name'])
+    try:
+        with open(index) as fh:
+            variant_sha256 = fh.read().strip()
+        if cached_path(variant_sha256):
+            return {'sha256': variant_sha256, **inspect(cache_path(variant_sha256), 'image/jpeg')}
+    except OSError:
+        pass
+
+    started = time.monotonic()
+    try:
+        variant = run_transform(cache_path(info['sha256']), profile)
+    except ValueError as e:
+        logger.info(f"Not normalizing {info['sha256'][:12]} for {platform}: {e}")
+        return None
+    except (OSError, TimeoutError, BrokenProcessPool) as e:
+        raise MediaError(f"Image normalization failed: {e!r}", permanent=False)
+    with open(index, 'w') as fh:
+        fh.write(variant['sha256'])
+    logger.info(
+        f"Normalized {info['sha256'][:12]} for {platform} in {time.monotonic() - started:.2f}s: "
+        f"{info['width']}x{info['height']} {info['size']} bytes -> "
+        f"{variant['width']}x{variant['height']} {variant['size']} bytes"
+    )
+    return variant
+
+
+def fetch_and_inspect(url: str, platform: str) -> dict:
+    """
+    Cached media info for a URL, downloading it only if no earlier fetch of
+    the same URL is still in the cache (campaigns reuse one asset a lot).
+    """
+    limits = PLATFORM_MEDIA_LIMITS.get(platform, {})
+    max_bytes = max(limits.get('types', {}).values(), default=settings.MEDIA_MAX_BYTES)
+
+    try:
+        known = cache.get(_url_key(url))
+    except Exception as e:
+        logger.debug(f"Media URL cache unavailable: {e}")
+        known = None
+    if known and cached_path(known['sha256']):
+        # Keep recently used files out of purge_cache's reach
+        os.utime(cache_path(known['sha256']))
+        return known
+
+    sha256, content_type = fetch(url, max_bytes)
+    info = {'sha256': sha256, **inspect(cache_path(sha256), content_type)}
+    try:
+        cache.set(_url_key(url), info, timeout=settings.MEDIA_PREFETCH_LEAD_SECONDS)
+    except Exception as e:
+        logger.debug(f"Media URL cache unavailable: {e}")
+    return info
+
+
+def prepare_post_media(post) -> bool:
+    """
+    Fetch and validate a post's media and record the result on the post.
+    Returns True when the media is ready. Transient failures leave the post
+    'unchecked' so the next prefetch scan (or publish_post) tries again.
+    """
+    started = time.monotonic()
+    try:
+        info = fetch_and_inspect(post.media_url, post.platform)
+        try:
+            validate(info, post.platform)
+        except MediaError:
+            variant = normalized_variant(info, post.platform)
+            if variant is None:
+                raise
+            validate(variant, post.platform)
+            info = {**variant, 'source_sha256': info['sha256']}
+    except MediaError as e:
+        post.media_status = 'invalid' if e.permanent else 'unchecked'
+        post.media_error = str(e)
+        Post.objects.filter(id=post.id).update(
+            media_status=post.media_status, media_error=post.media_error, updated_at=timezone.now(),
+        )
+        log = logger.warning if e.permanent else logger.info
+        log(f"Media for post {post.id} is not usable yet: {e}")
+        return False
+
+    post.media_status = 'ready'
+    post.media_hash = info['sha256']
+    post.media_info = {key: info[key] for key in ('content_type', 'size', 'width', 'height', 'source_sha256') if key in info}
+    post.media_error = None
+    Post.objects.filter(id=post.id).update(
+        media_status='ready', media_hash=post.media_hash, media_info=post.media_info, media_error=None,
+        updated_at=timezone.now(),
+    )
+    logger.info(
+        f"Media for post {post.id} ready in {time.monotonic() - started:.2f}s: "
+        f"{post.media_info['content_type']} {post.media_info['size']} bytes"
+    )
+    return True
+
+
+def local_media(post):
+    """
+    The post's prefetched media as {'path', 'sha256', 'content_type', 'size'},
+    or None when it isn't ready or has been evicted from the cache
+    """
+    if post.media_status != 'ready':
+        return None
+    path = cached_path(post.media_hash)
+    if not path:
+        return None
+    info = post.media_info or {}
+    local = {
+        'path': path,
+        'sha256': post.media_hash,
+        'content_type': info.get('content_type', ''),
+        'size': info.get('size') or os.path.getsize(path),
+    }
+    if 'source_sha256' in info and settings.MEDIA_PUBLIC_BASE_URL:
+        # Normalized variant; platforms that fetch by URL need it published
+        local['public_url'] = public_url(post.media_hash)
+    return local
+
+
+def public_url(digest: str) -> str:
+    """Where a cached file is served from when MEDIA_CACHE_DIR is published"""
+    return f"{settings.MEDIA_PUBLIC_BASE_URL.rstrip('/')}/{digest[:2]}/{digest}"
+
+
+def find_platform_media(social_account, content_hash: str, valid_for: int = 0):
+    """
+    Media ID from an earlier upload of the same bytes to this account that
+    stays valid for at least `valid_for` more seconds, or None
+    """
+    if not content_hash:
+        return None
+    valid_until = timezone.now() + timezone.timedelta(seconds=valid_for)
+    known = PlatformMedia.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=valid_until),
+        social_account=social_account,
+        content_hash=content_hash,
+    ).values_list('id', 'media_id').first()
+    if known is None:
+        return None
+    PlatformMedia.objects.filter(id=known[0]).update(use_count=F('use_count') + 1)
+    return known[1]
+
+
+def remember_platform_media(social_account, content_hash: str, media_id: str, expires_at=None):
+    """Record an upload so later posts of the same bytes can reuse its media ID"""
+    if not content_hash or not media_id:
+        return
+    PlatformMedia.objects.update_or_create(
+        social_account=social_account,
+        content_hash=content_hash,
+        defaults={'media_id': media_id, 'expires_at': expires_at, 'use_count': 1},
+    )
+
+
+def purge_expired_platform_media() -> int:
+    deleted, _ = PlatformMedia.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
+
+
+def purge_cache(max_age: int) -> int:
+    """Delete cached files not used for max_age seconds; returns how many were removed"""
+    cutoff = timezone.now().timestamp() - max_age
+    removed = 0
+    if not os.path.isdir(settings.MEDIA_CACHE_DIR):
+        return 0
+    for shard in os.scandir(settings.MEDIA_CACHE_DIR):
+        if not shard.is_dir():
+            # Leftover partial downloads
+            if shard.name.startswith('.fetch-') and shard.stat().st_mtime < cutoff:
+                os.remove(shard.path)
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
@@ -0,0 +1,170 @@
+"""
+Lightweight Prometheus-style metrics for the publishing pipeline.
+
+Observations are accumulated in process memory (a dict update per call) and
+flushed to Redis in a single pipelined round trip after each task, so workers
+on any host feed the same totals. core.views.metrics renders them together
+with queue depth and due-but-unclaimed gauges computed at scrape time.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+import redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'metrics:'
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5)
+
+_lock = threading.Lock()
+_pending = defaultdict(float)
+_registry = {}
+_client = None
+_retry_at = 0.0
+
+# After a failed flush, stop trying to reach Redis for this long
+RETRY_AFTER_SECONDS = 30
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.METRICS_REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def _labels(**labels) -> str:
+    return ','.join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        _registry[name] = self
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        with _lock:
+            _pending[(self.name, _labels(**labels))] += amount
+
+    def describe(self):
+        return [(self.name, 'counter', self.documentation, [self.name])]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        _registry[name] = self
+
+    def observe(self, value: float, **labels) -> None:
+        label_str = _labels(**labels)
+        prefix = f'{label_str},' if label_str else ''
+        with _lock:
+            for bound in self.buckets:
+                if value <= bound:
+                    _pending[(f'{self.name}_bucket', f'{prefix}le="{bound}"')] += 1
+            _pending[(f'{self.name}_bucket', f'{prefix}le="+Inf"')] += 1
+            _pending[(f'{self.name}_sum', label_str)] += value
+            _pending[(f'{self.name}_count', label_str)] += 1
+
+    def describe(self):
+        series = [f'{self.name}_bucket', f'{self.name}_sum', f'{self.name}_count']
+        return [(self.name, 'histogram', self.documentation, series)]
+
+
+schedule_lag = Histogram(
+    'autopost_publish_schedule_lag_seconds',
+    'Seconds between scheduled_time and the post going live',
+    LAG_BUCKETS,
+)
+api_latency = Histogram(
+    'autopost_platform_api_latency_seconds',
+    'Latency of HTTP calls to platform APIs',
+    LATENCY_BUCKETS,
+)
+publish_attempts = Histogram(
+    'autopost_publish_attempts',
+    'Attempts needed per post before it reached a final state',
+    ATTEMPT_BUCKETS,
+)
+publish_outcomes = Counter(
+    'autopost_publish_outcomes_total',
+    'Publish task outcomes by platform and error class',
+)
+
+
+def classify_error(message) -> str:
+    """Bucket a free-form integration error message into a small set of classes"""
+    if not message:
+        return 'none'
+    text = message.lower()
+    if 'timeout' in text or 'timed out' in text:
+        return 'timeout'
+    if '429' in text or 'rate limit' in text or 'too many requests' in text:
+        return 'rate_limited'
+    if 'network' in text or 'connection' in text:
+        return 'network'
+    if 'token' in text or 'unauthorized' in text or '401' in text or '403' in text:
+        return 'auth'
+    if 'http 5' in text or 'server error' in text:
+        return 'server'
+    if 'requires' in text or 'not found' in text or 'unsupported' in text or 'no active' in text:
+        return 'validation'
+    return 'other'
+
+
+def flush() -> None:
+    """Push pending observations to Redis in one pipelined round trip"""
+    global _retry_at
+    with _lock:
+        if not _pending or time.monotonic() < _retry_at:
+            return
+        pending = dict(_pending)
+        _pending.clear()
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for (series, labels), value in pending.items():
+            pipe.hincrbyfloat(f'{KEY_PREFIX}{series}', labels, value)
+        pipe.execute()
+    except Exception as e:
+        _retry_at = time.monotonic() + RETRY_AFTER_SECONDS
+        logger.debug(f"Dropping {len(pending)} metric samples, Redis unavailable: {e}")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_registry() -> list:
+    """Prometheus text lines for every counter and histogram"""
+    flush()
+    lines = []
+    client = get_redis()
+    for metric in _registry.values():
+        for name, kind, documentation, series_names in metric.describe():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for series in series_names:
+                values = client.hgetall(f'{KEY_PREFIX}{series}')
+                for labels, value in sorted(values.items()):
+                    labels = labels.decode()
+                    label_part = f'{{{labels}}}' if labels else ''
+                    lines.append(f'{series}{label_part} {_format_value(float(value))}')
+    return lines
+
+
+def render_gauge(name: str, documentation: str, samples: dict) -> list:
+    """Prometheus text lines for a gauge computed at scrape time"""
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} gauge']
+    for labels, value in samples.items():
+        label_part = f'{{{_labels(**dict(labels))}}}' if labels else ''
+        lines.append(f'{name}{label_part} {_format_value(value)}')
+    return lines
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_socialaccount_alter_post_options_post_celery_task_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker claimed the post for publishing', null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, help_text='When a publish task was last enqueued', null=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('posted', 'Posted'), ('failed', 'Failed'), ('cancelled', 'Cancelled'), ('stale', 'Stale')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', 'scheduled_time'], name='posts_post_status_5c5aa3_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_dispatch_claim_stale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='traceparent',
+            field=models.CharField(blank=True, help_text='W3C trace context of the request that scheduled the post', max_length=55, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_traceparent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='media_error',
+            field=models.TextField(blank=True, help_text="Why the media can't be published", null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the prefetched media', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_info',
+            field=models.JSONField(blank=True, help_text='Content type, size and dimensions of the prefetched media', null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='media_status',
+            field=models.CharField(choices=[('unchecked', 'Unchecked'), ('ready', 'Ready'), ('invalid', 'Invalid')], default='unchecked', max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_media_prefetch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='container_id',
+            field=models.CharField(blank=True, help_text='Media container created ahead of publishing (Instagram)', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='container_status',
+            field=models.CharField(blank=True, choices=[('', 'Not staged'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='staged_at',
+            field=models.DateTimeField(blank=True, help_text='When the media container was created', null=True),
+        ),
+    ]
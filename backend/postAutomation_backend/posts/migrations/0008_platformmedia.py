@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_staged_container'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 of the uploaded bytes', max_length=64)),
+                ('media_id', models.CharField(help_text='ID the platform assigned to the upload', max_length=255)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='When the platform stops accepting the ID', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('use_count', models.PositiveIntegerField(default=1)),
+                ('social_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploaded_media', to='posts.socialaccount')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='posts_platf_expires_f3c0e5_idx')],
+                'unique_together': {('social_account', 'content_hash')},
+            },
+        ),
+    ]
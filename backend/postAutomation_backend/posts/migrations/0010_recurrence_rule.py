@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_campaign'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurrenceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('instagram', 'Instagram'), ('twitter', 'Twitter'), ('linkedin', 'LinkedIn'), ('youtube', 'YouTube')], max_length=50)),
+                ('content', models.TextField()),
+                ('media_url', models.URLField(blank=True, null=True)),
+                ('rrule', models.CharField(help_text='RRULE, e.g. FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0', max_length=500)),
+                ('dtstart', models.DateTimeField(help_text='First occurrence the rule counts from')),
+                ('timezone', models.CharField(default='UTC', help_text="IANA zone the rule's wall-clock times are in", max_length=64)),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_occurrence', models.DateTimeField(blank=True, help_text='First occurrence without a post yet; null once the rule has ended', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posts', to='posts.recurrencerule'),
+        ),
+        migrations.AddConstraint(
+            model_name='post',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurrence__isnull', False)), fields=('recurrence', 'scheduled_time'), name='unique_recurrence_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='recurrencerule',
+            index=models.Index(fields=['is_active', 'next_occurrence'], name='posts_recur_is_acti_744d85_idx'),
+        ),
+    ]
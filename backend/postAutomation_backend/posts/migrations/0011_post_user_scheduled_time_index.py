@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_recurrence_rule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', 'scheduled_time'], name='posts_post_user_id_d4039b_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_webhooks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='engagement',
+            field=models.JSONField(blank=True, help_text='Latest likes, comments, shares and impressions', null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='engagement_updated_at',
+            field=models.DateTimeField(blank=True, help_text='When engagement was last collected', null=True),
+        ),
+        migrations.CreateModel(
+            name='EngagementSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collected_at', models.DateTimeField()),
+                ('likes', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('comments', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('shares', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('impressions', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_snapshots', to='posts.post')),
+            ],
+            options={
+                'ordering': ['post', 'collected_at'],
+                'indexes': [models.Index(fields=['post', 'collected_at'], name='posts_engag_post_id_bcedd7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_outcomes(apps, schema_editor):
+    """Seed the outcome log from posts that already reached a final status; their lag is unknown"""
+    Post = apps.get_model('posts', 'Post')
+    PublishOutcome = apps.get_model('posts', 'PublishOutcome')
+    posts = Post.objects.filter(status__in=('posted', 'failed', 'cancelled', 'stale')).order_by('updated_at', 'id')
+    PublishOutcome.objects.bulk_create(
+        (
+            PublishOutcome(user_id=user_id, post_id=post_id, platform=platform, status=status, occurred_at=updated_at)
+            for post_id, user_id, platform, status, updated_at in posts.values_list(
+                'id', 'user_id', 'platform', 'status', 'updated_at'
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_engagement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PublishOutcome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField()),
+                ('platform', models.CharField(choices=[('instagram', 'Instagram'), ('twitter', 'Twitter'), ('linkedin', 'LinkedIn'), ('youtube', 'YouTube')], max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('posted', 'Posted'), ('failed', 'Failed'), ('cancelled', 'Cancelled'), ('stale', 'Stale')], max_length=20)),
+                ('occurred_at', models.DateTimeField()),
+                ('lag_seconds', models.FloatField(blank=True, help_text='How long after scheduled_time a post went live', null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='publish_outcomes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('instagram', 'Instagram'), ('twitter', 'Twitter'), ('linkedin', 'LinkedIn'), ('youtube', 'YouTube')], max_length=50)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('posted', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('stale', models.PositiveIntegerField(default=0)),
+                ('lag_sum', models.FloatField(default=0)),
+                ('lag_histogram', models.JSONField(default=list, help_text='Posted counts per metrics.LAG_BUCKETS bound, then +Inf')),
+                ('likes', models.BigIntegerField(default=0)),
+                ('comments', models.BigIntegerField(default=0)),
+                ('shares', models.BigIntegerField(default=0)),
+                ('impressions', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'granularity', 'bucket_start', 'platform'), name='unique_post_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_outcomes, migrations.RunPython.noop),
+    ]
@@ -15,6 +15,20 @@ class Post(models.Model):
         ('posted', 'Posted'),
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
+        ('stale', 'Stale'),
+    ]
+
+    CONTAINER_STATUS_CHOICES = [
+        ('', 'Not staged'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    MEDIA_STATUS_CHOICES = [
+        ('unchecked', 'Unchecked'),
+        ('ready', 'Ready'),
+        ('invalid', 'Invalid'),
     ]
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -27,6 +41,20 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     celery_task_id = models.CharField(max_length=255, blank=True, null=True)
     external_post_id = models.CharField(max_length=255, blank=True, null=True, help_text="ID returned by the platform API")
+    dispatched_at = models.DateTimeField(blank=True, null=True, help_text="When a publish task was last enqueued")
+    claimed_at = models.DateTimeField(blank=True, null=True, help_text="When a worker claimed the post for publishing")
+    traceparent = models.CharField(max_length=55, blank=True, null=True, help_text="W3C trace context of the request that scheduled the post")
+    media_status = models.CharField(max_length=20, choices=MEDIA_STATUS_CHOICES, default='unchecked')
+    media_hash = models.CharField(max_length=64, blank=True, null=True, help_text="SHA-256 of the prefetched media")
+    media_info = models.JSONField(blank=True, null=True, help_text="Content type, size and dimensions of the prefetched media")
+    media_error = models.TextField(blank=True, null=True, help_text="Why the media can't be published")
+    container_id = models.CharField(max_length=255, blank=True, null=True, help_text="Media container created ahead of publishing (Instagram)")
+    container_status = models.CharField(max_length=20, choices=CONTAINER_STATUS_CHOICES, blank=True, default='')
+    staged_at = models.DateTimeField(blank=True, null=True, help_text="When the media container was created")
+    campaign = models.ForeignKey('Campaign', on_delete=models.SET_NULL, blank=True, null=True, related_name='posts')
+    recurrence = models.ForeignKey('RecurrenceRule', on_delete=models.SET_NULL, blank=True, null=True, related_name='posts')
+    engagement = models.JSONField(blank=True, null=True, help_text="Latest likes, comments, shares and impressions")
+    engagement_updated_at = models.DateTimeField(blank=True, null=True, help_text="When engagement was last collected")
 
     class Meta:
         ordering = ['-scheduled_time']
@@ -34,12 +62,274 @@ class Post(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['platform', 'status']),
             models.Index(fields=['scheduled_time']),
+            models.Index(fields=['status', 'scheduled_time']),
+            models.Index(fields=['user', 'scheduled_time']),
+            models.Index(fields=['user', 'updated_at', 'id']),
+        ]
+        constraints = [
+            # One post per occurrence, however often a rule is materialized
+            models.UniqueConstraint(
+                fields=['recurrence', 'scheduled_time'],
+                condition=models.Q(recurrence__isnull=False),
+                name='unique_recurrence_occurrence',
+            ),
         ]
 
     def __str__(self):
         return f"{self.user.username} - {self.platform} - {self.status}"
 
 
+class EngagementSnapshot(models.Model):
+    """
+    A published post's engagement counts at one point in time, collected by
+    posts.engagement. Counts the platform doesn't report are null.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='engagement_snapshots')
+    collected_at = models.DateTimeField()
+    likes = models.PositiveBigIntegerField(blank=True, null=True)
+    comments = models.PositiveBigIntegerField(blank=True, null=True)
+    shares = models.PositiveBigIntegerField(blank=True, null=True)
+    impressions = models.PositiveBigIntegerField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['post', 'collected_at']
+        indexes = [
+            models.Index(fields=['post', 'collected_at']),
+        ]
+
+    def __str__(self):
+        return f"post {self.post_id} at {self.collected_at}"
+
+
+class PublishOutcome(models.Model):
+    """
+    Append-only log of posts reaching a final status, the source of the
+    publish figures in PostRollup. Keeps the post's id rather than a foreign
+    key, so analytics survive deleting the post.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='publish_outcomes')
+    post_id = models.BigIntegerField()
+    platform = models.CharField(max_length=50, choices=Post.PLATFORM_CHOICES)
+    status = models.CharField(max_length=20, choices=Post.STATUS_CHOICES)
+    occurred_at = models.DateTimeField()
+    lag_seconds = models.FloatField(blank=True, null=True, help_text="How long after scheduled_time a post went live")
+
+    def __str__(self):
+        return f"post {self.post_id} {self.status} at {self.occurred_at}"
+
+
+class PostRollup(models.Model):
+    """
+    Publish and engagement totals of one user on one platform for an hour or
+    a (UTC) day, maintained incrementally by posts.analytics
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='post_rollups')
+    platform = models.CharField(max_length=50, choices=Post.PLATFORM_CHOICES)
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    posted = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    stale = models.PositiveIntegerField(default=0)
+    lag_sum = models.FloatField(default=0)
+    lag_histogram = models.JSONField(default=list, help_text="Posted counts per metrics.LAG_BUCKETS bound, then +Inf")
+    # Engagement gained in the bucket, by collection time
+    likes = models.BigIntegerField(default=0)
+    comments = models.BigIntegerField(default=0)
+    shares = models.BigIntegerField(default=0)
+    impressions = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'granularity', 'bucket_start', 'platform'], name='unique_post_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.platform} - {self.granularity} {self.bucket_start}"
+
+
+class RollupCursor(models.Model):
+    """High-water mark: the last source row id folded into PostRollup"""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at {self.position}"
+
+
+class PostTombstone(models.Model):
+    """
+    Record of a deleted post, so delta-sync clients (the posts changes feed)
+    learn about deletions. Pruned after CHANGES_TOMBSTONE_TTL.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='post_tombstones')
+    post_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - post {self.post_id} deleted {self.deleted_at}"
+
+
+class Campaign(models.Model):
+    """
+    One piece of content published to several platforms at the same time,
+    as one child Post per platform
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('publishing', 'Publishing'),
+        ('posted', 'Posted'),
+        ('partial', 'Partially posted'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='campaigns')
+    content = models.TextField()
+    media_url = models.URLField(blank=True, null=True)
+    scheduled_time = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-scheduled_time']
+        indexes = [
+            models.Index(fields=['user', 'scheduled_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - campaign {self.id} - {self.scheduled_time}"
+
+    @property
+    def platforms(self):
+        return [post.platform for post in self.posts.all()]
+
+    @property
+    def status_counts(self):
+        counts = {}
+        for post in self.posts.all():
+            counts[post.status] = counts.get(post.status, 0) + 1
+        return counts
+
+    @property
+    def status(self):
+        """Aggregate status of the child posts"""
+        statuses = set(self.status_counts)
+        if not statuses or statuses == {'cancelled'}:
+            return 'cancelled'
+        if statuses == {'pending'}:
+            return 'pending'
+        if 'pending' in statuses:
+            return 'publishing'
+        if statuses <= {'posted', 'cancelled'}:
+            return 'posted'
+        if 'posted' in statuses:
+            return 'partial'
+        return 'failed'
+
+
+class RecurrenceRule(models.Model):
+    """
+    Content posted on an RFC 5545 RRULE schedule. Posts are only created for
+    occurrences inside a rolling horizon (see posts.recurrence), so edits
+    apply to every later occurrence without touching any rows.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recurrence_rules')
+    platform = models.CharField(max_length=50, choices=Post.PLATFORM_CHOICES)
+    content = models.TextField()
+    media_url = models.URLField(blank=True, null=True)
+    rrule = models.CharField(max_length=500, help_text="RRULE, e.g. FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0")
+    dtstart = models.DateTimeField(help_text="First occurrence the rule counts from")
+    timezone = models.CharField(max_length=64, default='UTC', help_text="IANA zone the rule's wall-clock times are in")
+    is_active = models.BooleanField(default=True)
+    next_occurrence = models.DateTimeField(blank=True, null=True, help_text="First occurrence without a post yet; null once the rule has ended")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'next_occurrence']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.platform} - {self.rrule}"
+
+
+class Webhook(models.Model):
+    """
+    An integrator's HTTPS endpoint notified of post status changes. Events
+    are queued as WebhookDelivery rows and POSTed in batches by
+    posts.webhooks, signed with `secret`.
+    """
+    EVENT_CHOICES = [
+        ('post.posted', 'Post posted'),
+        ('post.failed', 'Post failed'),
+        ('post.cancelled', 'Post cancelled'),
+        ('post.stale', 'Post stale'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='webhooks')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64)
+    events = models.JSONField(default=list, blank=True, help_text="Event types to send; empty means all")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_active']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.url}"
+
+    def wants(self, event_type: str) -> bool:
+        return not self.events or event_type in self.events
+
+
+class WebhookDelivery(models.Model):
+    """One event waiting for, or done with, delivery to a webhook"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['webhook', 'status', 'next_attempt_at']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.webhook_id} - {self.event} - {self.status}"
+
+
 class SocialAccount(models.Model):
     """
     Store OAuth tokens and credentials for each user's social media accounts
@@ -84,3 +374,25 @@ class SocialAccount(models.Model):
     def is_connected(self):
         """Check if account has valid credentials"""
         return bool(self.access_token and self.is_active)
+
+
+class PlatformMedia(models.Model):
+    """
+    Media already uploaded to a platform for an account, by content hash, so
+    repeated assets can be attached again without re-uploading them
+    """
+    social_account = models.ForeignKey(SocialAccount, on_delete=models.CASCADE, related_name='uploaded_media')
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the uploaded bytes")
+    media_id = models.CharField(max_length=255, help_text="ID the platform assigned to the upload")
+    expires_at = models.DateTimeField(blank=True, null=True, help_text="When the platform stops accepting the ID")
+    created_at = models.DateTimeField(auto_now_add=True)
+    use_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ['social_account', 'content_hash']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.social_account} - {self.content_hash[:12]} - {self.media_id}"
@@ -0,0 +1,124 @@
+"""
+Lazy materialization of recurring posts.
+
+A RecurrenceRule is expanded with dateutil's rrule in the rule's own time
+zone, so "every Monday at 9" stays at 9 local time across DST changes.
+Post rows are only created for occurrences within RECURRENCE_HORIZON_SECONDS,
+and rule.next_occurrence records where the next expansion starts, so the
+periodic scan only touches rules that have something due. Editing a rule
+replaces its pending materialized posts; later occurrences don't exist yet
+and need no changes.
+
+Occurrences missed while the scan wasn't running are skipped, not published late.
+"""
+import logging
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil.rrule import rrulestr
+from django.conf import settings
+from django.utils import timezone
+from .models import Post, RecurrenceRule
+
+logger = logging.getLogger(__name__)
+
+# Anything more frequent than hourly is a mistake, not a posting schedule
+DISALLOWED_FREQUENCIES = ('SECONDLY', 'MINUTELY')
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+def parse_rule(rule_text: str, dtstart, tz_name: str):
+    """Parse an RRULE anchored at dtstart in tz_name, raising RecurrenceError if it's unusable"""
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise RecurrenceError(f"Unknown time zone {tz_name!r}")
+
+    text = rule_text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    parts = dict(part.split('=', 1) for part in text.upper().split(';') if '=' in part)
+    if '\n' in text or 'DTSTART' in text.upper():
+        raise RecurrenceError("Give a single RRULE; the start goes in dtstart")
+    if parts.get('FREQ') in DISALLOWED_FREQUENCIES:
+        raise RecurrenceError("Rules can repeat at most hourly")
+    try:
+        return rrulestr(text, dtstart=dtstart.astimezone(tz))
+    except (ValueError, TypeError) as e:
+        raise RecurrenceError(f"Invalid RRULE: {e}")
+
+
+def upcoming(rule: RecurrenceRule, after=None, count=5):
+    """The next `count` occurrence times after `after` (default now)"""
+    parsed = parse_rule(rule.rrule, rule.dtstart, rule.timezone)
+    return list(parsed.xafter(after or timezone.now(), count=count))
+
+
+def materialize(rule: RecurrenceRule, now=None):
+    """
+    Create and dispatch posts for the rule's occurrences up to the horizon and
+    advance rule.next_occurrence past them. Returns the posts created.
+    """
+    from .tasks import dispatch_publish
+
+    now = now or timezone.now()
+    if not rule.is_active or rule.next_occurrence is None:
+        return []
+    horizon = now + timedelta(seconds=settings.RECURRENCE_HORIZON_SECONDS)
+    parsed = parse_rule(rule.rrule, rule.dtstart, rule.timezone)
+
+    times = []
+    following = None
+    for occurrence in parsed.xafter(max(rule.next_occurrence, now), inc=True):
+        if occurrence > horizon or len(times) >= settings.RECURRENCE_MAX_PER_RULE:
+            following = occurrence
+            break
+        times.append(occurrence)
+
+    posts = []
+    if times:
+        Post.objects.bulk_create([
+            Post(
+                user_id=rule.user_id,
+                recurrence=rule,
+                platform=rule.platform,
+                content=rule.content,
+                media_url=rule.media_url,
+                scheduled_time=occurrence,
+            )
+            for occurrence in times
+        ], ignore_conflicts=True)
+        # ignore_conflicts doesn't return ids; a concurrent run may already have dispatched some
+        posts = list(
+            Post.objects.filter(recurrence=rule, scheduled_time__in=times, celery_task_id__isnull=True)
+            .only('id', 'platform', 'scheduled_time', 'traceparent')
+        )
+        for post in posts:
+            dispatch_publish(post, eta=post.scheduled_time)
+
+    rule.next_occurrence = following
+    RecurrenceRule.objects.filter(id=rule.id).update(next_occurrence=following)
+    return posts
+
+
+def reset(rule: RecurrenceRule, now=None):
+    """
+    Drop the rule's pending posts that haven't been claimed yet and start
+    expanding again from now, after the rule was edited, paused or deleted.
+    Returns the removed posts.
+    """
+    now = now or timezone.now()
+    pending = list(
+        Post.objects.filter(recurrence=rule, status='pending', claimed_at__isnull=True, scheduled_time__gt=now)
+        .only('id', 'celery_task_id')
+    )
+    Post.objects.filter(id__in=[post.id for post in pending], status='pending', claimed_at__isnull=True).delete()
+
+    following = None
+    if rule.is_active:
+        following = next(iter(parse_rule(rule.rrule, rule.dtstart, rule.timezone).xafter(now)), None)
+    rule.next_occurrence = following
+    RecurrenceRule.objects.filter(id=rule.id).update(next_occurrence=following)
+    return pending
@@ -0,0 +1,94 @@
+"""
+Queue routing, priority lanes and per-user fair share for publish tasks
+"""
+import logging
+import random
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Redis transport priorities: lower number is served first. These match the
+# default kombu priority_steps so each lane maps onto its own Redis list.
+PRIORITY_ON_TIME = 0
+PRIORITY_NORMAL = 3
+PRIORITY_CATCHUP = 6
+PRIORITY_DEFERRED = 9
+# Background work ahead of the scheduled time, e.g. staging media containers
+PRIORITY_STAGING = PRIORITY_CATCHUP
+
+
+def publish_queue(platform: str) -> str:
+    """Name of the dedicated Celery queue for a platform"""
+    return f"{settings.PUBLISH_QUEUE_PREFIX}.{platform.lower()}"
+
+
+def get_user_weight(user_id: int) -> int:
+    """Relative share of publish slots a user gets on each platform"""
+    return max(settings.PUBLISH_USER_WEIGHTS.get(str(user_id), 1), 1)
+
+
+def _inflight_key(platform: str, user_id: int) -> str:
+    return f"publish:inflight:{platform}:{user_id}"
+
+
+def acquire_publish_slot(platform: str, user_id: int) -> bool:
+    """
+    Take one of the user's concurrent publish slots on a platform.
+    Users over their weighted share have to wait, so one tenant's bulk
+    schedule can't occupy every worker serving that platform.
+    """
+    key = _inflight_key(platform, user_id)
+    limit = settings.FAIR_SHARE_MAX_INFLIGHT * get_user_weight(user_id)
+    try:
+        cache.add(key, 0, timeout=settings.PUBLISH_CLAIM_LEASE)
+        inflight = cache.incr(key)
+        # The counter lives while the user keeps publishing, and only expires
+        # (dropping slots leaked by dead workers) once they have been idle a lease
+        cache.touch(key, settings.PUBLISH_CLAIM_LEASE)
+    except ValueError:
+        # Key expired between add and incr; start a fresh window
+        cache.set(key, 1, timeout=settings.PUBLISH_CLAIM_LEASE)
+        return True
+    except Exception as e:
+        # Never block publishing because the cache is unavailable
+        logger.warning(f"Fair-share slot tracking unavailable: {e}")
+        return True
+
+    if inflight > limit:
+        release_publish_slot(platform, user_id)
+        return False
+    return True
+
+
+def release_publish_slot(platform: str, user_id: int) -> None:
+    """Return a slot taken by acquire_publish_slot"""
+    key = _inflight_key(platform, user_id)
+    try:
+        # A slot taken before the counter expired must not turn into a spare one
+        if cache.decr(key) < 0:
+            cache.incr(key)
+    except ValueError:
+        pass
+    except Exception as e:
+        logger.warning(f"Fair-share slot tracking unavailable: {e}")
+
+
+def fair_share_backoff(post_id: int) -> float:
+    """
+    Countdown before a post deferred for its user's fair share is tried
+    again. It doubles with each deferral of the post in a row, up to
+    FAIR_SHARE_MAX_DEFER_SECONDS, and is jittered so a user's waiting posts
+    don't all come back at once.
+    """
+    key = f"publish:deferrals:{post_id}"
+    timeout = settings.FAIR_SHARE_MAX_DEFER_SECONDS * 2
+    try:
+        cache.add(key, 0, timeout=timeout)
+        deferrals = cache.incr(key)
+        cache.touch(key, timeout)
+    except Exception as e:
+        logger.warning(f"Fair-share backoff tracking unavailable: {e}")
+        deferrals = 1
+    delay = min(settings.FAIR_SHARE_DEFER_SECONDS * 2 ** min(deferrals - 1, 16), settings.FAIR_SHARE_MAX_DEFER_SECONDS)
+    return delay / 2 + random.uniform(0, delay / 2)
@@ -1,8 +1,13 @@
 from rest_framework import serializers
-from .models import Post, SocialAccount
+from .models import Campaign, Post, RecurrenceRule, SocialAccount, Webhook, WebhookDelivery
+from .recurrence import RecurrenceError, parse_rule, upcoming
+from .social_integrations import preflight_post
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
+from core.outbound import UnsafeURL, check_public_url
+from core.profiling import ProfiledSerializerMixin
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     user_id = serializers.IntegerField(read_only=True)
     can_edit = serializers.SerializerMethodField()
@@ -11,7 +16,13 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = '__all__'
-        read_only_fields = ('user', 'user_id', 'status', 'created_at', 'external_post_id')
+        read_only_fields = (
+            'user', 'user_id', 'status', 'created_at', 'external_post_id',
+            'dispatched_at', 'claimed_at', 'traceparent',
+            'media_status', 'media_hash', 'media_info', 'media_error',
+            'container_id', 'container_status', 'staged_at', 'campaign', 'recurrence',
+            'engagement', 'engagement_updated_at',
+        )
 
     def get_can_edit(self, obj):
         """Check if post can still be edited (before scheduled time)"""
@@ -27,6 +38,30 @@ class PostSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Scheduled time must be in the future.")
         return value
 
+    def validate(self, attrs):
+        """Reject posts the platform would refuse before they take up a worker"""
+        def value(field):
+            return attrs[field] if field in attrs else getattr(self.instance, field, None)
+
+        errors = preflight_post(value('platform'), value('content') or '', value('media_url'))
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def update(self, instance, validated_data):
+        """
+        Re-check media when the media URL or the target platform changes, and
+        drop a staged container once what it was created from has changed
+        """
+        def changed(*fields):
+            return any(field in validated_data and validated_data[field] != getattr(instance, field) for field in fields)
+
+        if changed('media_url', 'platform'):
+            validated_data.update(media_status='unchecked', media_hash=None, media_info=None, media_error=None)
+        if changed('media_url', 'platform', 'content'):
+            validated_data.update(container_id=None, container_status='', staged_at=None)
+        return super().update(instance, validated_data)
+
     def validate_platform(self, value):
         """Validate platform choice"""
         valid_platforms = [choice[0] for choice in Post.PLATFORM_CHOICES]
@@ -35,7 +70,140 @@ class PostSerializer(serializers.ModelSerializer):
         return value
 
 
-class SocialAccountSerializer(serializers.ModelSerializer):
+class CampaignPostSerializer(serializers.ModelSerializer):
+    """A campaign's child post, as listed inside the campaign"""
+
+    class Meta:
+        model = Post
+        fields = ['id', 'platform', 'status', 'external_post_id', 'media_status', 'media_error']
+        read_only_fields = fields
+
+
+class CampaignSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    platforms = serializers.ListField(
+        child=serializers.ChoiceField(choices=Post.PLATFORM_CHOICES), allow_empty=False
+    )
+    status = serializers.CharField(read_only=True)
+    status_counts = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    posts = CampaignPostSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Campaign
+        fields = [
+            'id', 'content', 'media_url', 'scheduled_time', 'platforms',
+            'status', 'status_counts', 'posts', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ('id', 'created_at', 'updated_at')
+
+    def validate_scheduled_time(self, value):
+        """Ensure scheduled time is in the future"""
+        if value <= timezone.now():
+            raise serializers.ValidationError("Scheduled time must be in the future.")
+        return value
+
+    def validate_platforms(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Each platform can only be targeted once.")
+        return value
+
+    def validate(self, attrs):
+        """Run every target platform's preflight checks on the shared content"""
+        errors = {}
+        for platform in attrs['platforms']:
+            platform_errors = preflight_post(platform, attrs['content'], attrs.get('media_url'))
+            if platform_errors:
+                errors[platform] = platform_errors
+        if errors:
+            raise serializers.ValidationError({'platforms': errors})
+        return attrs
+
+    def create(self, validated_data):
+        """Create the campaign and one pending post per platform; call inside a transaction"""
+        platforms = validated_data.pop('platforms')
+        campaign = Campaign.objects.create(**validated_data)
+        Post.objects.bulk_create([
+            Post(
+                user=campaign.user,
+                campaign=campaign,
+                platform=platform,
+                content=campaign.content,
+                media_url=campaign.media_url,
+                scheduled_time=campaign.scheduled_time,
+            )
+            for platform in platforms
+        ])
+        # One query for the posts, shared by platforms, status and posts in the response
+        prefetch_related_objects([campaign], 'posts')
+        return campaign
+
+
+class RecurrenceRuleSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    upcoming = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecurrenceRule
+        fields = [
+            'id', 'platform', 'content', 'media_url', 'rrule', 'dtstart', 'timezone',
+            'is_active', 'next_occurrence', 'upcoming', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ('id', 'next_occurrence', 'created_at', 'updated_at')
+
+    def get_upcoming(self, obj):
+        """The next few occurrence times, computed from the rule rather than stored"""
+        if not obj.is_active:
+            return []
+        try:
+            return [occurrence.isoformat() for occurrence in upcoming(obj)]
+        except RecurrenceError:
+            return []
+
+    def validate(self, attrs):
+        def value(field):
+            return attrs[field] if field in attrs else getattr(self.instance, field, None)
+
+        try:
+            parse_rule(value('rrule') or '', value('dtstart'), value('timezone') or 'UTC')
+        except RecurrenceError as e:
+            raise serializers.ValidationError({'rrule': str(e)})
+        errors = preflight_post(value('platform'), value('content') or '', value('media_url'))
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class WebhookSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Webhook
+        fields = ['id', 'url', 'events', 'is_active', 'secret', 'created_at', 'updated_at']
+        read_only_fields = ('id', 'secret', 'created_at', 'updated_at')
+
+    def validate_url(self, value):
+        if not value.startswith('https://'):
+            raise serializers.ValidationError("Webhook URLs must use https.")
+        try:
+            check_public_url(value)
+        except UnsafeURL:
+            raise serializers.ValidationError("Webhook URLs must point to a public address.")
+        return value
+
+    def validate_events(self, value):
+        known = {code for code, _ in Webhook.EVENT_CHOICES}
+        if not isinstance(value, list) or not all(isinstance(event, str) for event in value):
+            raise serializers.ValidationError("events must be a list of event types.")
+        unknown = sorted(set(value) - known)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown events: {', '.join(unknown)}")
+        return value
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = ['id', 'event', 'payload', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at', 'delivered_at']
+        read_only_fields = fields
+
+
+class SocialAccountSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     platform_display = serializers.CharField(source='get_platform_display', read_only=True)
     is_connected = serializers.SerializerMethodField()
     
@@ -0,0 +1,29 @@
+"""
+Model signal handlers for the posts app
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Post, PostTombstone
+
+
+def _deleting_users(origin) -> bool:
+    """Whether a deletion started from deleting user accounts"""
+    User = get_user_model()
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, User)
+    return isinstance(origin, User)
+
+
+@receiver(post_delete, sender=Post)
+def record_post_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for the changes feed, whichever way the post was
+    deleted, unless its owner is being deleted too: nobody is left to sync,
+    and the tombstone would reference the user being removed
+    """
+    if _deleting_users(origin):
+        return
+    PostTombstone.objects.create(user_id=instance.user_id, post_id=instance.id, deleted_at=timezone.now())
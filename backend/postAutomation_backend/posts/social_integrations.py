@@ -2,24 +2,91 @@
 Social media platform integrations for posting content
 """
 import requests
+import hashlib
+import json
 import logging
-from typing import Dict, Optional, Tuple
+import mimetypes
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse
 from django.utils import timezone
 from .models import SocialAccount
+from . import media as media_pipeline
+from . import uploads
+from .circuit_breaker import get_breaker
+from . import metrics
+from .task_profiling import task_phase
+from core.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
 
+def _count(value) -> Optional[int]:
+    """An engagement count from an API response (YouTube sends strings), or None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ContainerProcessing(Exception):
+    """A staged media container the platform hasn't finished processing yet"""
+
+    def __init__(self, container_id: str):
+        super().__init__(container_id)
+        self.container_id = container_id
+
+
 class BaseSocialPlatform:
     """Base class for social media platform integrations"""
     
     def __init__(self, social_account: SocialAccount):
         self.social_account = social_account
         self.access_token = social_account.access_token
+        self.breaker = get_breaker(social_account.platform)
     
-    def post(self, content: str, media_url: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Make an HTTP call to the platform and report the outcome to the
+        platform's circuit breaker (connection errors, 429 and 5xx count as failures)
         """
-        Post content to the platform
+        if 'json' in kwargs:
+            # Encode up front so serialization shows up separately in task profiles
+            with task_phase('serialization'):
+                kwargs['data'] = json.dumps(kwargs.pop('json'), allow_nan=False)
+            headers = kwargs.setdefault('headers', {})
+            headers.setdefault('Content-Type', 'application/json')
+        
+        platform = self.social_account.platform
+        started = time.monotonic()
+        try:
+            with start_span(f"{method.upper()} {platform}", platform=platform, url=url.split('?')[0]) as span, \
+                    task_phase(f"http:{platform}"):
+                if span:
+                    kwargs.setdefault('headers', {})['traceparent'] = span.traceparent
+                response = requests.request(method, url, **kwargs)
+                if span:
+                    span.set(status_code=response.status_code)
+        except requests.RequestException:
+            duration = time.monotonic() - started
+            metrics.api_latency.observe(duration, platform=self.social_account.platform)
+            self.breaker.record_failure(duration)
+            raise
+        
+        duration = time.monotonic() - started
+        metrics.api_latency.observe(duration, platform=self.social_account.platform)
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure(duration)
+        else:
+            self.breaker.record_success(duration)
+        return response
+    
+    def post(self, content: str, media_url: Optional[str] = None,
+             media: Optional[Dict] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Post content to the platform. `media` describes the prefetched copy of
+        media_url in the local media cache, when there is one.
         Returns: (success, post_id, error_message)
         """
         raise NotImplementedError("Subclasses must implement post method")
@@ -27,6 +94,67 @@ class BaseSocialPlatform:
     def refresh_token_if_needed(self) -> bool:
         """Refresh access token if expired"""
         return False
+    
+    # Longest post text the platform accepts
+    MAX_CONTENT_LENGTH = None
+    
+    @classmethod
+    def preflight(cls, content: str, media_url: Optional[str] = None) -> List[str]:
+        """
+        Problems with a post that would make publishing it fail whatever the
+        platform's state, found without calling the platform
+        Returns: list of error messages, empty if the post can be published
+        """
+        errors = []
+        if cls.MAX_CONTENT_LENGTH and len(content or '') > cls.MAX_CONTENT_LENGTH:
+            errors.append(f"Content is {len(content)} characters long, the limit is {cls.MAX_CONTENT_LENGTH}.")
+        return errors
+    
+    @classmethod
+    def preflight_account(cls, social_account: SocialAccount) -> List[str]:
+        """Problems with the connected account that would make publishing fail"""
+        return []
+    
+    # Platforms that publish from a media container can create it ahead of
+    # time (stage), let the provider process it, and only publish at the
+    # scheduled time. Containers older than CONTAINER_TTL seconds are unusable.
+    supports_staging = False
+    CONTAINER_TTL = None
+    
+    def stage(self, content: str, media_url: Optional[str] = None,
+              media: Optional[Dict] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Create the post's media container on the platform
+        Returns: (container_id, error_message)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support staging")
+    
+    def container_status(self, container_id: str) -> Tuple[str, Optional[str]]:
+        """
+        Processing state of a staged container
+        Returns: ('processing' | 'ready' | 'failed', error_message)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support staging")
+    
+    def publish_staged(self, container_id: str, ready: bool = False) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Publish a staged container, first checking it unless it's known to be
+        ready. Raises ContainerProcessing if it's still being processed.
+        Returns: (success, post_id, error_message)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support staging")
+    
+    # Most published posts one engagement lookup can ask for; None if the
+    # integration can't read engagement
+    METRICS_BATCH_SIZE = None
+    
+    def fetch_metrics(self, post_ids: List[str]) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """
+        Engagement of up to METRICS_BATCH_SIZE published posts in one request.
+        Posts the platform no longer knows are left out.
+        Returns: ({post_id: {'likes', 'comments', 'shares', 'impressions'}}, error_message)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not report engagement")
 
 
 class TwitterIntegration(BaseSocialPlatform):
@@ -34,28 +162,41 @@ class TwitterIntegration(BaseSocialPlatform):
     
     API_BASE = "https://api.twitter.com/2"
     
-    def post(self, content: str, media_url: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    # APPEND accepts at most 5 MB per segment
+    UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+    APPEND_ATTEMPTS = 3
+    MAX_PROCESSING_WAIT = 300
+    # Only reuse an earlier upload if its media ID stays valid this much longer
+    MEDIA_REUSE_MARGIN = 600
+    # Counted in plain characters; Twitter's weighted count is never higher for
+    # Latin text but counts every URL as 23
+    MAX_CONTENT_LENGTH = 280
+    
+    def post(self, content: str, media_url: Optional[str] = None,
+             media: Optional[Dict] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
-        Post a tweet using Twitter API v2
-        Note: Media upload requires additional steps
+        Post a tweet using Twitter API v2, uploading media_url first if given
         """
         try:
             url = f"{self.API_BASE}/tweets"
             
             payload = {
-                "text": content[:280] 
+                "text": content[:self.MAX_CONTENT_LENGTH]
             }
             
 
             if media_url:
-                logger.warning("Media upload for Twitter requires additional implementation")
+                media_id, error = self.upload_media(media_url, media)
+                if not media_id:
+                    return False, None, error
+                payload["media"] = {"media_ids": [media_id]}
             
             headers = {
                 "Authorization": f"Bearer {self.access_token}",
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = self._request('post', url, json=payload, headers=headers, timeout=30)
             
             if response.status_code == 201:
                 data = response.json()
@@ -69,20 +210,173 @@ class TwitterIntegration(BaseSocialPlatform):
             logger.error(f"Twitter API error: {e}")
             return False, None, str(e)
     
+    # GET /2/tweets looks up to 100 tweets at once
+    METRICS_BATCH_SIZE = 100
+    
+    def fetch_metrics(self, post_ids: List[str]) -> Tuple[Dict[str, Dict], Optional[str]]:
+        try:
+            response = self._request('get', f"{self.API_BASE}/tweets", timeout=30, params={
+                "ids": ",".join(post_ids),
+                "tweet.fields": "public_metrics",
+            }, headers={"Authorization": f"Bearer {self.access_token}"})
+        except requests.RequestException as e:
+            return {}, str(e)
+        if response.status_code != 200:
+            return {}, f"HTTP {response.status_code}: {response.text[:200]}"
+        metrics = {}
+        for tweet in response.json().get('data', []):
+            counts = tweet.get('public_metrics', {})
+            metrics[tweet['id']] = {
+                'likes': _count(counts.get('like_count')),
+                'comments': _count(counts.get('reply_count')),
+                'shares': (_count(counts.get('retweet_count')) or 0) + (_count(counts.get('quote_count')) or 0),
+                'impressions': _count(counts.get('impression_count')),
+            }
+        return metrics, None
+    
+    @staticmethod
+    def media_category(content_type: str) -> str:
+        if content_type == 'image/gif':
+            return 'tweet_gif'
+        if content_type.startswith('video/'):
+            return 'tweet_video'
+        return 'tweet_image'
+    
+    def upload_media(self, media_url: str, media: Optional[Dict] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Chunked INIT/APPEND/FINALIZE upload streamed from the media cache or
+        media_url. Progress is saved after every acknowledged segment, so a
+        retried task resumes where the last attempt stopped. Bytes this
+        account has uploaded before are not uploaded again while their
+        media ID is still valid.
+        Returns: (media_id, error_message)
+        """
+        url = f"{self.API_BASE}/media/upload"
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        try:
+            source = uploads.open_source(media_url, media, platform='twitter')
+            media_id = media_pipeline.find_platform_media(self.social_account, source.sha256, self.MEDIA_REUSE_MARGIN)
+            if media_id:
+                logger.info(f"Reusing Twitter media {media_id} for {source.sha256[:12]}")
+                return media_id, None
+            session_name = f"twitter:{self.social_account.id}:{source.key}"
+            state = uploads.load_session(session_name)
+            
+            if state and state['expires_at'] > time.time() + 60:
+                logger.info(f"Resuming Twitter upload {state['media_id']} at segment {state['segment']}")
+            else:
+                response = self._request('post', url, headers=headers, timeout=30, data={
+                    "command": "INIT",
+                    "total_bytes": source.size,
+                    "media_type": source.content_type,
+                    "media_category": self.media_category(source.content_type),
+                })
+                if response.status_code not in (200, 201, 202):
+                    return None, f"Twitter media INIT failed: HTTP {response.status_code} {response.text}"
+                data = response.json().get('data', response.json())
+                state = {
+                    'media_id': str(data.get('id') or data.get('media_id_string') or data.get('media_id')),
+                    'segment': 0,
+                    'offset': 0,
+                    'expires_at': time.time() + data.get('expires_after_secs', 86400),
+                }
+                uploads.save_session(session_name, state, timeout=int(state['expires_at'] - time.time()))
+            
+            # Hash media streamed from its URL so later uploads of the same bytes can be skipped
+            digest = hashlib.sha256() if not source.sha256 and not state['offset'] else None
+            chunks = source.chunks(self.UPLOAD_CHUNK_SIZE, offset=state['offset'])
+            for chunk in uploads.read_ahead(chunks):
+                if digest:
+                    digest.update(chunk)
+                error, resumable = self._append_segment(url, headers, state, chunk)
+                if error:
+                    if not resumable:
+                        uploads.clear_session(session_name)
+                    return None, error
+                state['segment'] += 1
+                state['offset'] += len(chunk)
+                uploads.save_session(session_name, state, timeout=int(state['expires_at'] - time.time()))
+            
+            response = self._request('post', url, headers=headers, timeout=30, data={
+                "command": "FINALIZE",
+                "media_id": state['media_id'],
+            })
+            if response.status_code not in (200, 201):
+                return None, f"Twitter media FINALIZE failed: HTTP {response.status_code} {response.text}"
+            error = self._wait_for_processing(url, headers, state['media_id'], response.json())
+            uploads.clear_session(session_name)
+            if error:
+                return None, error
+            media_pipeline.remember_platform_media(
+                self.social_account,
+                source.sha256 or (digest.hexdigest() if digest else None),
+                state['media_id'],
+                expires_at=datetime.fromtimestamp(state['expires_at'], tz=dt_timezone.utc),
+            )
+            return state['media_id'], None
+        
+        except media_pipeline.MediaError as e:
+            return None, f"Twitter media unavailable: {e}"
+        except requests.RequestException as e:
+            logger.error(f"Twitter media upload interrupted: {e}")
+            return None, f"Twitter media upload interrupted (network error): {e}"
+    
+    def _append_segment(self, url, headers, state, chunk) -> Tuple[Optional[str], bool]:
+        """
+        Upload one segment, retrying it in place a few times on 429/5xx.
+        Returns: (error_message, whether the upload can be resumed later)
+        """
+        for attempt in range(1, self.APPEND_ATTEMPTS + 1):
+            response = self._request(
+                'post', url, headers=headers, timeout=60,
+                data={"command": "APPEND", "media_id": state['media_id'], "segment_index": state['segment']},
+                files={"media": chunk},
+            )
+            if response.status_code in (200, 204):
+                return None, True
+            if response.status_code < 500 and response.status_code != 429:
+                return f"Twitter media APPEND failed: HTTP {response.status_code} {response.text}", False
+            if attempt < self.APPEND_ATTEMPTS:
+                time.sleep(min(2 ** attempt, 10))
+        return (
+            f"Twitter media APPEND failed at segment {state['segment']} "
+            f"(network error, HTTP {response.status_code})"
+        ), True
+    
+    def _wait_for_processing(self, url, headers, media_id, data) -> Optional[str]:
+        """Poll STATUS until asynchronous (video/GIF) processing finishes"""
+        waited = 0
+        info = data.get('data', data).get('processing_info')
+        while info and info.get('state') in ('pending', 'in_progress'):
+            delay = info.get('check_after_secs', 1)
+            if waited + delay > self.MAX_PROCESSING_WAIT:
+                return f"Twitter media {media_id} still processing after {waited}s (timeout)"
+            time.sleep(delay)
+            waited += delay
+            response = self._request(
+                'get', url, headers=headers, timeout=30, params={"command": "STATUS", "media_id": media_id}
+            )
+            if response.status_code != 200:
+                return f"Twitter media STATUS failed: HTTP {response.status_code}"
+            info = response.json().get('data', response.json()).get('processing_info')
+        if info and info.get('state') == 'failed':
+            return f"Twitter rejected media {media_id}: {info.get('error', {}).get('message', 'processing failed')}"
+        return None
+    
     def refresh_token_if_needed(self) -> bool:
         """Twitter OAuth 2.0 token refresh"""
         if not self.social_account.refresh_token:
             return False
         
         try:
-            url = "https://api.twitter.com/2/oauth2/token"
+            url = f"{self.API_BASE}/oauth2/token"
             data = {
                 "refresh_token": self.social_account.refresh_token,
                 "grant_type": "refresh_token",
                 "client_id": self.social_account.metadata.get('client_id', ''),
             }
             
-            response = requests.post(url, data=data, timeout=30)
+            response = self._request('post', url, data=data, timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 self.social_account.access_token = data['access_token']
@@ -102,46 +396,136 @@ class InstagramIntegration(BaseSocialPlatform):
     
     API_BASE = "https://graph.facebook.com/v18.0"
     
-    def post(self, content: str, media_url: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    supports_staging = True
+    # Unpublished containers expire after 24 hours
+    CONTAINER_TTL = 24 * 3600
+    # How long past the scheduled (or staging) time publishing keeps coming
+    # back for a container that is still processing
+    MAX_PROCESSING_WAIT = 10 * 60
+    
+    CONTAINER_STATES = {
+        'FINISHED': 'ready',
+        'IN_PROGRESS': 'processing',
+        'ERROR': 'failed',
+        'EXPIRED': 'failed',
+        'PUBLISHED': 'failed',
+    }
+    MAX_CONTENT_LENGTH = 2200
+    
+    @classmethod
+    def preflight(cls, content: str, media_url: Optional[str] = None) -> List[str]:
+        errors = super().preflight(content, media_url)
+        if not media_url:
+            errors.append("Instagram requires media. Please provide a media URL.")
+        return errors
+    
+    def post(self, content: str, media_url: Optional[str] = None,
+             media: Optional[Dict] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Post to Instagram using Graph API
         Note: Requires Instagram Business or Creator account
         """
+        if not media_url:
+            return False, None, "Instagram requires media. Please provide a media URL."
+        
+        creation_id, error = self.stage(content, media_url, media)
+        if not creation_id:
+            return False, None, error
+        # Image containers are usable right away; videos have to be processed first
+        is_video = (media or {}).get('content_type', '').startswith('video/')
+        return self.publish_staged(creation_id, ready=not is_video)
+    
+    def stage(self, content: str, media_url: Optional[str] = None,
+              media: Optional[Dict] = None) -> Tuple[Optional[str], Optional[str]]:
+        """Create an image or reel container; videos are processed asynchronously by Instagram"""
         try:
-
             ig_account_id = self.social_account.metadata.get('instagram_account_id')
             if not ig_account_id:
-                return False, None, "Instagram account ID not found. Please reconnect your account."
+                return None, "Instagram account ID not found. Please reconnect your account."
             
-            if media_url:
-
-                create_url = f"{self.API_BASE}/{ig_account_id}/media"
-                create_payload = {
-                    "image_url": media_url,
-                    "caption": content,
-                    "access_token": self.access_token
-                }
-                
-                create_response = requests.post(create_url, data=create_payload, timeout=30)
-                if create_response.status_code != 200:
-                    return False, None, f"Failed to create media container: {create_response.text}"
-                
-                creation_id = create_response.json().get('id')
-                publish_url = f"{self.API_BASE}/{ig_account_id}/media_publish"
-                publish_payload = {
-                    "creation_id": creation_id,
-                    "access_token": self.access_token
-                }
-                
-                publish_response = requests.post(publish_url, data=publish_payload, timeout=30)
-                if publish_response.status_code == 200:
-                    post_id = publish_response.json().get('id')
-                    return True, post_id, None
-                else:
-                    return False, None, f"Failed to publish: {publish_response.text}"
+            create_url = f"{self.API_BASE}/{ig_account_id}/media"
+            create_payload = {
+                "caption": content,
+                "access_token": self.access_token
+            }
+            if (media or {}).get('content_type', '').startswith('video/'):
+                create_payload.update(media_type="REELS", video_url=media_url)
             else:
-                
-                return False, None, "Instagram requires media. Please provide a media URL."
+                # A normalized variant, when the media cache is published
+                create_payload["image_url"] = (media or {}).get('public_url') or media_url
+            
+            create_response = self._request('post', create_url, data=create_payload, timeout=30)
+            if create_response.status_code != 200:
+                return None, f"Failed to create media container: {create_response.text}"
+            return create_response.json().get('id'), None
+        
+        except requests.RequestException as e:
+            logger.error(f"Instagram API error: {e}")
+            return None, str(e)
+    
+    # Graph API multi-ID lookups (GET /?ids=...) take up to 50 IDs
+    METRICS_BATCH_SIZE = 50
+    
+    def fetch_metrics(self, post_ids: List[str]) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """Likes and comments; impressions need a per-media insights call and are left out"""
+        try:
+            response = self._request('get', f"{self.API_BASE}/", timeout=30, params={
+                "ids": ",".join(post_ids),
+                "fields": "like_count,comments_count",
+                "access_token": self.access_token,
+            })
+        except requests.RequestException as e:
+            return {}, str(e)
+        if response.status_code != 200:
+            return {}, f"HTTP {response.status_code}: {response.text[:200]}"
+        return {
+            media_id: {
+                'likes': _count(data.get('like_count')),
+                'comments': _count(data.get('comments_count')),
+                'shares': None,
+                'impressions': None,
+            }
+            for media_id, data in response.json().items()
+        }, None
+    
+    def container_status(self, container_id: str) -> Tuple[str, Optional[str]]:
+        try:
+            response = self._request('get', f"{self.API_BASE}/{container_id}", timeout=30, params={
+                "fields": "status_code,status",
+                "access_token": self.access_token,
+            })
+        except requests.RequestException as e:
+            return 'processing', str(e)
+        if response.status_code != 200:
+            if response.status_code == 429 or response.status_code >= 500:
+                return 'processing', f"HTTP {response.status_code}"
+            return 'failed', f"Container lookup failed: {response.text}"
+        data = response.json()
+        state = self.CONTAINER_STATES.get(data.get('status_code'), 'processing')
+        return state, data.get('status') if state == 'failed' else None
+    
+    def publish_staged(self, container_id: str, ready: bool = False) -> Tuple[bool, Optional[str], Optional[str]]:
+        try:
+            if not ready:
+                state, error = self.container_status(container_id)
+                if state == 'failed':
+                    return False, None, f"Instagram could not process the media: {error}"
+                if state == 'processing':
+                    raise ContainerProcessing(container_id)
+            
+            ig_account_id = self.social_account.metadata.get('instagram_account_id')
+            publish_url = f"{self.API_BASE}/{ig_account_id}/media_publish"
+            publish_payload = {
+                "creation_id": container_id,
+                "access_token": self.access_token
+            }
+            
+            publish_response = self._request('post', publish_url, data=publish_payload, timeout=30)
+            if publish_response.status_code == 200:
+                post_id = publish_response.json().get('id')
+                return True, post_id, None
+            else:
+                return False, None, f"Failed to publish: {publish_response.text}"
                 
         except requests.RequestException as e:
             logger.error(f"Instagram API error: {e}")
@@ -152,8 +536,44 @@ class LinkedInIntegration(BaseSocialPlatform):
     """LinkedIn API integration"""
     
     API_BASE = "https://api.linkedin.com/v2"
+    MAX_CONTENT_LENGTH = 3000
     
-    def post(self, content: str, media_url: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    @classmethod
+    def preflight_account(cls, social_account: SocialAccount) -> List[str]:
+        if not (social_account.metadata or {}).get('person_urn'):
+            return ["LinkedIn person URN not found. Please reconnect your account."]
+        return []
+
+    # socialActions batch get
+    METRICS_BATCH_SIZE = 50
+
+    def fetch_metrics(self, post_ids: List[str]) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """Likes and comments of shares; post IDs are URNs, possibly still URL-encoded from the Location header"""
+        urns = {unquote(post_id): post_id for post_id in post_ids}
+        ids = ",".join(quote(urn, safe='') for urn in urns)
+        try:
+            response = self._request('get', f"{self.API_BASE}/socialActions?ids=List({ids})", timeout=30, headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "X-Restli-Protocol-Version": "2.0.0",
+            })
+        except requests.RequestException as e:
+            return {}, str(e)
+        if response.status_code != 200:
+            return {}, f"HTTP {response.status_code}: {response.text[:200]}"
+        metrics = {}
+        for urn, data in response.json().get('results', {}).items():
+            if unquote(urn) not in urns:
+                continue
+            metrics[urns[unquote(urn)]] = {
+                'likes': _count(data.get('likesSummary', {}).get('totalLikes')),
+                'comments': _count(data.get('commentsSummary', {}).get('aggregatedTotalComments')),
+                'shares': None,
+                'impressions': None,
+            }
+        return metrics, None
+
+    def post(self, content: str, media_url: Optional[str] = None,
+             media: Optional[Dict] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Post to LinkedIn using LinkedIn API v2
         """
@@ -182,7 +602,7 @@ class LinkedInIntegration(BaseSocialPlatform):
                     "description": {
                         "text": content[:200]  # Truncate for description
                     },
-                    "originalUrl": media_url
+                    "originalUrl": (media or {}).get('public_url') or media_url
                 }]
             
             payload = {
@@ -200,7 +620,7 @@ class LinkedInIntegration(BaseSocialPlatform):
                 "X-Restli-Protocol-Version": "2.0.0"
             }
             
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = self._request('post', url, json=payload, headers=headers, timeout=30)
             
             if response.status_code == 201:
             
@@ -220,43 +640,223 @@ class YouTubeIntegration(BaseSocialPlatform):
     """YouTube Data API v3 integration"""
     
     API_BASE = "https://www.googleapis.com/youtube/v3"
+    UPLOAD_BASE = "https://www.googleapis.com/upload/youtube/v3"
+    
+    # Resumable upload chunks must be multiples of 256 KB
+    UPLOAD_CHUNK_SIZE = 32 * 256 * 1024
+    # Upload session URIs stay valid for about a week
+    SESSION_TTL = 6 * 86400
+    # The content becomes the video description
+    MAX_CONTENT_LENGTH = 5000
+    
+    @classmethod
+    def preflight(cls, content: str, media_url: Optional[str] = None) -> List[str]:
+        errors = super().preflight(content, media_url)
+        if not media_url:
+            errors.append("YouTube requires video content. Please provide a video URL.")
+        else:
+            # Only what the URL gives away; the media pipeline checks the actual bytes
+            guessed, _ = mimetypes.guess_type(urlparse(media_url).path)
+            if guessed and not guessed.startswith('video/'):
+                errors.append(f"YouTube requires video content, {media_url} looks like {guessed}.")
+        return errors
     
-    def post(self, content: str, media_url: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    def post(self, content: str, media_url: Optional[str] = None,
+             media: Optional[Dict] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
-        Post to YouTube
-        Note: YouTube posts are actually video uploads, which is more complex
-        This is a simplified version for community posts (if available)
+        Post to YouTube by uploading media_url as a video, with the post
+        content as its title and description
         """
         try:
             # YouTube doesn't have a simple "post text" API
-            # This would typically require video upload or community post
-            # For now, we'll return an error suggesting video upload
-            
             if not media_url:
                 return False, None, "YouTube requires video content. Please provide a video URL or use YouTube Studio for text posts."
             
-            # If media_url is a video, you'd need to:
-            # 1. Download the video
-            # 2. Upload it to YouTube using the upload API
-            # This is complex and requires additional libraries
-            
-            return False, None, "YouTube video upload requires additional implementation. Please use YouTube Studio for now."
+            video_id, error = self.upload_video(content, media_url, media)
+            if not video_id:
+                return False, None, error
+            return True, video_id, None
             
         except Exception as e:
             logger.error(f"YouTube API error: {e}")
             return False, None, str(e)
+    
+    # videos.list takes up to 50 IDs
+    METRICS_BATCH_SIZE = 50
+    
+    def fetch_metrics(self, post_ids: List[str]) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """Views are reported as impressions"""
+        try:
+            response = self._request('get', f"{self.API_BASE}/videos", timeout=30, params={
+                "part": "statistics",
+                "id": ",".join(post_ids),
+                "maxResults": self.METRICS_BATCH_SIZE,
+            }, headers={"Authorization": f"Bearer {self.access_token}"})
+        except requests.RequestException as e:
+            return {}, str(e)
+        if response.status_code != 200:
+            return {}, f"HTTP {response.status_code}: {response.text[:200]}"
+        metrics = {}
+        for video in response.json().get('items', []):
+            statistics = video.get('statistics', {})
+            metrics[video['id']] = {
+                'likes': _count(statistics.get('likeCount')),
+                'comments': _count(statistics.get('commentCount')),
+                'shares': None,
+                'impressions': _count(statistics.get('viewCount')),
+            }
+        return metrics, None
+    
+    def video_metadata(self, content: str) -> Dict:
+        title = content.strip().splitlines()[0] if content.strip() else 'Untitled'
+        return {
+            "snippet": {
+                "title": title[:100],
+                "description": content[:5000],
+                "categoryId": self.social_account.metadata.get('category_id', '22'),
+            },
+            "status": {
+                "privacyStatus": self.social_account.metadata.get('privacy_status', 'public'),
+            },
+        }
+    
+    def upload_video(self, content: str, media_url: str, media: Optional[Dict] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Resumable upload streamed in chunks from the media cache or media_url.
+        The session URI is kept in the upload session store, so after a
+        worker restart or a retried task the upload continues from the last
+        byte YouTube acknowledged instead of starting over.
+        Returns: (video_id, error_message)
+        """
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        try:
+            source = uploads.open_source(media_url, media, platform='youtube')
+            if not source.content_type.startswith('video/'):
+                return None, f"YouTube requires a video, media_url is {source.content_type or 'unknown media'}"
+            session_name = f"youtube:{self.social_account.id}:{source.key}"
+            
+            offset, upload_url = 0, None
+            state = uploads.load_session(session_name)
+            if state:
+                offset, video_id = self._acknowledged_offset(state['upload_url'], source.size, headers)
+                if video_id:
+                    uploads.clear_session(session_name)
+                    return video_id, None
+                if offset is not None:
+                    upload_url = state['upload_url']
+                    logger.info(f"Resuming YouTube upload at byte {offset} of {source.size}")
+            
+            if upload_url is None:
+                offset = 0
+                response = self._request(
+                    'post', f"{self.UPLOAD_BASE}/videos", timeout=30,
+                    params={"uploadType": "resumable", "part": "snippet,status"},
+                    json=self.video_metadata(content),
+                    headers={
+                        **headers,
+                        "X-Upload-Content-Length": str(source.size),
+                        "X-Upload-Content-Type": source.content_type,
+                    },
+                )
+                if response.status_code != 200 or 'Location' not in response.headers:
+                    return None, f"YouTube upload session failed: HTTP {response.status_code} {response.text}"
+                upload_url = response.headers['Location']
+                uploads.save_session(session_name, {'upload_url': upload_url}, timeout=self.SESSION_TTL)
+            
+            while True:
+                for chunk in uploads.read_ahead(source.chunks(self.UPLOAD_CHUNK_SIZE, offset=offset)):
+                    end = offset + len(chunk) - 1
+                    response = self._request(
+                        'put', upload_url, data=chunk, timeout=120, allow_redirects=False,
+                        headers={**headers, "Content-Range": f"bytes {offset}-{end}/{source.size}"},
+                    )
+                    if response.status_code in (200, 201):
+                        uploads.clear_session(session_name)
+                        return response.json().get('id'), None
+                    if response.status_code == 429 or response.status_code >= 500:
+                        return None, f"YouTube upload interrupted at byte {offset} (network error, HTTP {response.status_code})"
+                    if response.status_code != 308:
+                        uploads.clear_session(session_name)
+                        return None, f"YouTube upload failed: HTTP {response.status_code} {response.text}"
+                    
+                    acknowledged = self._parse_range(response)
+                    if acknowledged != end + 1:
+                        # YouTube kept only part of the chunk; re-read from what it has
+                        offset = acknowledged
+                        break
+                    offset = acknowledged
+                else:
+                    return None, f"YouTube upload ended at byte {offset} of {source.size} without a video id"
+        
+        except media_pipeline.MediaError as e:
+            return None, f"YouTube video unavailable: {e}"
+        except requests.RequestException as e:
+            logger.error(f"YouTube upload interrupted: {e}")
+            return None, f"YouTube upload interrupted (network error): {e}"
+    
+    @staticmethod
+    def _parse_range(response) -> int:
+        """Bytes YouTube has stored, from a 308 response's Range header (bytes=0-N)"""
+        value = response.headers.get('Range')
+        if not value:
+            return 0
+        return int(value.rsplit('-', 1)[1]) + 1
+    
+    def _acknowledged_offset(self, upload_url, total, headers) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Ask YouTube how much of an earlier upload it has.
+        Returns: (offset, None), (None, video_id) if it already completed,
+        or (None, None) if the session is gone and the upload has to restart.
+        """
+        response = self._request(
+            'put', upload_url, data=b'', timeout=30, allow_redirects=False,
+            headers={**headers, "Content-Range": f"bytes */{total}"},
+        )
+        if response.status_code == 308:
+            return self._parse_range(response), None
+        if response.status_code in (200, 201):
+            return None, response.json().get('id')
+        if response.status_code == 429 or response.status_code >= 500:
+            raise requests.HTTPError(f"HTTP {response.status_code} checking upload status", response=response)
+        logger.info(f"YouTube upload session expired (HTTP {response.status_code}), starting over")
+        return None, None
+
+
+INTEGRATIONS = {
+    'twitter': TwitterIntegration,
+    'instagram': InstagramIntegration,
+    'linkedin': LinkedInIntegration,
+    'youtube': YouTubeIntegration,
+}
+
+# Platforms whose media containers are created ahead of the scheduled time
+STAGED_PLATFORMS = [platform for platform, cls in INTEGRATIONS.items() if cls.supports_staging]
+
+
+def preflight_post(platform: str, content: str, media_url: Optional[str] = None,
+                   social_account: Optional[SocialAccount] = None) -> List[str]:
+    """
+    Run the platform's preflight checks on a post, and on the account it will
+    be published with when given. Returns the error messages.
+    """
+    integration_class = INTEGRATIONS.get((platform or '').lower())
+    if not integration_class:
+        return []
+    errors = integration_class.preflight(content, media_url)
+    if social_account is not None:
+        errors += integration_class.preflight_account(social_account)
+    return errors
+
+
+def preflight_account(platform: str, social_account: SocialAccount) -> List[str]:
+    """Run only the platform's checks on the account a post will be published with"""
+    integration_class = INTEGRATIONS.get((platform or '').lower())
+    return integration_class.preflight_account(social_account) if integration_class else []
 
 
 def get_platform_integration(platform: str, social_account: SocialAccount) -> Optional[BaseSocialPlatform]:
     """Factory function to get the appropriate platform integration"""
-    integrations = {
-        'twitter': TwitterIntegration,
-        'instagram': InstagramIntegration,
-        'linkedin': LinkedInIntegration,
-        'youtube': YouTubeIntegration,
-    }
-    
-    integration_class = integrations.get(platform.lower())
+    integration_class = INTEGRATIONS.get(platform.lower())
     if not integration_class:
         logger.error(f"Unknown platform: {platform}")
         return None
@@ -0,0 +1,182 @@
+"""
+Opt-in, sampled profiler for Celery tasks.
+
+A sampled task's wall time is split into exclusive phases: 'db' (SQL),
+'http:<platform>' (platform API calls), 'token_refresh', 'serialization'
+and 'other'. Optionally a cProfile dump is kept for the slowest N tasks
+per worker process. The active profile is tracked per thread of execution,
+so it also works with the threads pool.
+
+The configuration lives in the cache so it can be changed at runtime,
+without restarting workers:
+
+    python manage.py task_profiler --sample-rate 0.05 --dump-dir /tmp/task-profiles --dump-slowest 20
+    python manage.py task_profiler --off
+"""
+import contextvars
+import cProfile
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CACHE_KEY = 'task_profiler:config'
+
+_config = {'value': None, 'loaded_at': 0.0}
+_active = contextvars.ContextVar('task_profile', default=None)
+_slowest = []
+_slowest_lock = threading.Lock()
+
+
+def default_config():
+    return {
+        'sample_rate': settings.TASK_PROFILER_SAMPLE_RATE,
+        'dump_dir': settings.TASK_PROFILER_DUMP_DIR,
+        'dump_slowest': settings.TASK_PROFILER_DUMP_SLOWEST,
+    }
+
+
+def get_config():
+    """Current profiler config, re-read from the cache every few seconds"""
+    now = time.monotonic()
+    if _config['value'] is None or now - _config['loaded_at'] > settings.TASK_PROFILER_CONFIG_TTL:
+        value = default_config()
+        try:
+            value.update(cache.get(CONFIG_CACHE_KEY) or {})
+        except Exception as e:
+            logger.debug(f"Task profiler config unavailable, using defaults: {e}")
+        _config['value'] = value
+        _config['loaded_at'] = now
+    return _config['value']
+
+
+def set_config(**values):
+    """Store a runtime override picked up by all workers within TASK_PROFILER_CONFIG_TTL"""
+    config = {**(cache.get(CONFIG_CACHE_KEY) or {}), **values}
+    cache.set(CONFIG_CACHE_KEY, config, timeout=None)
+    return config
+
+
+def clear_config():
+    cache.delete(CONFIG_CACHE_KEY)
+
+
+class TaskProfile:
+    def __init__(self, task_name, task_id, profiler=None):
+        self.task_name = task_name
+        self.task_id = task_id
+        self.profiler = profiler
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.query_count = 0
+        self._stack = []
+
+    def enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, started, child_time = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - child_time
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def __call__(self, execute, sql, params, many, context):
+        self.query_count += 1
+        self.enter('db')
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.exit()
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        self.phases['other'] = max(self.total - sum(self.phases.values()), 0.0)
+
+    def summary(self):
+        parts = ' '.join(
+            f"{name}={duration * 1000:.1f}ms" for name, duration in sorted(self.phases.items())
+        )
+        return f"{self.task_name}[{self.task_id}] {self.total * 1000:.1f}ms ({self.query_count} queries): {parts}"
+
+
+@contextmanager
+def task_phase(name):
+    """Attribute the enclosed time to a phase of the active task profile, if any"""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def _keep_dump(profile, config):
+    """Write a pstats dump if this task is among the slowest seen by this process"""
+    limit = config['dump_slowest']
+    if not profile.profiler or not config['dump_dir'] or limit <= 0:
+        return
+    with _slowest_lock:
+        if len(_slowest) >= limit and profile.total <= _slowest[0][0]:
+            return
+
+        os.makedirs(config['dump_dir'], exist_ok=True)
+        path = os.path.join(
+            config['dump_dir'], f"{profile.task_name}-{profile.total * 1000:.0f}ms-{profile.task_id}.pstats"
+        )
+        profile.profiler.dump_stats(path)
+        heapq.heappush(_slowest, (profile.total, path))
+        while len(_slowest) > limit:
+            _, evicted = heapq.heappop(_slowest)
+            try:
+                os.remove(evicted)
+            except OSError:
+                pass
+
+
+@task_prerun.connect
+def start_task_profile(task_id=None, task=None, **kwargs):
+    config = get_config()
+    if not config['sample_rate'] or random.random() >= config['sample_rate']:
+        return
+
+    profiler = None
+    if config['dump_dir'] and config['dump_slowest'] > 0:
+        profiler = cProfile.Profile()
+    profile = TaskProfile(task.name.rsplit('.', 1)[-1], task_id, profiler)
+    _active.set(profile)
+    connection.execute_wrappers.append(profile)
+    if profiler:
+        profiler.enable()
+
+
+@task_postrun.connect
+def finish_task_profile(**kwargs):
+    profile = _active.get()
+    _active.set(None)
+    if profile is None:
+        return
+
+    if profile.profiler:
+        profile.profiler.disable()
+    if profile in connection.execute_wrappers:
+        connection.execute_wrappers.remove(profile)
+    profile.finish()
+    logger.info(f"Task profile {profile.summary()}")
+
+    try:
+        _keep_dump(profile, get_config())
+    except OSError as e:
+        logger.warning(f"Could not write task profile dump: {e}")
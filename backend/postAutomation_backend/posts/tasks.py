@@ -1,17 +1,217 @@
 from celery import shared_task
+from celery.signals import task_postrun, task_prerun
+from celery.exceptions import Retry
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
-from .models import Post, SocialAccount
-from .social_integrations import get_platform_integration
+from datetime import timedelta
+from .models import Post, PostTombstone, RecurrenceRule, SocialAccount, WebhookDelivery
+from .social_integrations import STAGED_PLATFORMS, ContainerProcessing, get_platform_integration, preflight_post
+from .circuit_breaker import get_breaker
+from . import analytics, engagement, events, media, metrics, recurrence, webhooks
+from .task_profiling import task_phase
+from core import tracing
+from .scheduling import (
+    PRIORITY_CATCHUP, PRIORITY_DEFERRED, PRIORITY_NORMAL, PRIORITY_ON_TIME, PRIORITY_STAGING,
+    acquire_publish_slot, fair_share_backoff, publish_queue, release_publish_slot,
+)
 import logging
+import random
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+LATENESS_POLICIES = ('publish', 'skip', 'stale')
+
+# Outcomes that are final status transitions, pushed to the user's event stream
+STATUS_OUTCOMES = ('posted', 'failed', 'cancelled', 'stale')
+
+
+def get_lateness_status(post, now=None):
+    """
+    Return the status a late post should be moved to under the configured
+    lateness policy, or None if it should still be published.
+    """
+    policy = settings.PUBLISH_LATENESS_POLICY
+    if policy not in LATENESS_POLICIES:
+        logger.warning(f"Unknown PUBLISH_LATENESS_POLICY {policy!r}, falling back to 'publish'")
+        return None
+    if policy == 'publish':
+        return None
+
+    now = now or timezone.now()
+    if now - post.scheduled_time <= timedelta(seconds=settings.PUBLISH_MAX_LATENESS):
+        return None
+    return 'cancelled' if policy == 'skip' else 'stale'
+
+
+class ClaimLost(Exception):
+    """The claim on a post expired and another worker took it over"""
+
+
+def claim_post(post_id, now=None):
+    """
+    Atomically claim a pending post for publishing so that a re-dispatched
+    task and the original ETA task can never both publish it.
+    Returns True if this worker now owns the post.
+    """
+    now = now or timezone.now()
+    lease_expired = now - timedelta(seconds=settings.PUBLISH_CLAIM_LEASE)
+    claimed = Post.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=lease_expired),
+        id=post_id,
+        status='pending',
+    ).update(claimed_at=now)
+    return claimed == 1
+
+
+def renew_claim(post_id, claimed_at):
+    """
+    Extend a claim taken at claimed_at before a long phase of publishing, so
+    the catch-up scan doesn't re-dispatch a post that is still being worked
+    on. Returns the new claim time; raises ClaimLost if the claim was taken over.
+    """
+    now = timezone.now()
+    if not Post.objects.filter(id=post_id, status='pending', claimed_at=claimed_at).update(claimed_at=now):
+        raise ClaimLost(post_id)
+    return now
+
+
+def release_claim(post_id):
+    """Give up the claim on a post so a retry can pick it up again"""
+    Post.objects.filter(id=post_id).update(claimed_at=None)
+
+
+def announce_status(posts, status=None):
+    """
+    Send posts' final status changes to their users' open event streams and
+    webhooks, and append them to the analytics outcome log
+    """
+    for post in posts:
+        events.publish_post_status(post, status)
+    webhooks.enqueue_post_events(posts, status)
+    analytics.record_outcomes(posts, status)
+
+
+def record_outcome(post, outcome, error_class='none', attempts=None):
+    """
+    Count a publish outcome and, for final attempts, how many tries it took.
+    Status transitions are also announced (see announce_status).
+    """
+    metrics.publish_outcomes.inc(platform=post.platform, outcome=outcome, error_class=error_class)
+    if attempts is not None:
+        metrics.publish_attempts.observe(attempts, platform=post.platform)
+    if outcome in STATUS_OUTCOMES:
+        announce_status([post], outcome)
+
+
+def staged_container_id(post, integration):
+    """The post's pre-staged media container if it can still be published, else None"""
+    if not integration.supports_staging or post.container_status not in ('processing', 'ready'):
+        return None
+    if not post.container_id or not post.staged_at:
+        return None
+    if (timezone.now() - post.staged_at).total_seconds() > integration.CONTAINER_TTL:
+        return None
+    return post.container_id
+
+
+def defer_processing_container(post, integration, container_id):
+    """
+    Dispatch the post again later instead of holding the worker while the
+    platform processes its media container. Returns False once the post has
+    waited MAX_PROCESSING_WAIT past the later of its scheduled and staging times.
+    """
+    now = timezone.now()
+    if container_id != post.container_id:
+        # Staged by this attempt; the next one only has to publish it
+        post.container_id, post.container_status, post.staged_at = container_id, 'processing', now
+        Post.objects.filter(id=post.id).update(container_id=container_id, container_status='processing', staged_at=now)
+    waited = (now - max(post.scheduled_time, post.staged_at)).total_seconds()
+    if waited >= integration.MAX_PROCESSING_WAIT:
+        return False
+    release_claim(post.id)
+    dispatch_publish(post, countdown=min(max(waited, settings.STAGING_POLL_INITIAL), settings.STAGING_POLL_MAX))
+    record_outcome(post, 'deferred', 'container_processing')
+    return True
+
+
+@task_postrun.connect
+def flush_metrics(**kwargs):
+    metrics.flush()
+
+
+def dispatch_publish(post, eta=None, countdown=None, priority=None):
+    """
+    Enqueue publish_post for a post on its platform's queue and remember the
+    task id so it can be revoked. Posts due now go in the on-time lane.
+    """
+    if priority is None:
+        priority = PRIORITY_NORMAL if eta or countdown else PRIORITY_ON_TIME
+
+    # Continue the post's original trace when dispatched outside a request (catch-up, deferral)
+    parent = None if tracing.current_span() else post.traceparent
+    with tracing.start_span('dispatch publish_post', parent, post_id=post.id, priority=priority) as span:
+        task = publish_post.apply_async(
+            (post.id,),
+            eta=eta,
+            countdown=countdown,
+            queue=publish_queue(post.platform),
+            priority=priority,
+            headers={'traceparent': span.traceparent} if span else None,
+        )
+    post.celery_task_id = task.id
+    post.dispatched_at = timezone.now()
+    updates = {'celery_task_id': task.id, 'dispatched_at': post.dispatched_at}
+    if span and not post.traceparent:
+        post.traceparent = updates['traceparent'] = span.traceparent
+    Post.objects.filter(id=post.id).update(**updates)
+    return task
+
+
+def dispatch_campaign(campaign):
+    """
+    Enqueue the publish tasks of all of a campaign's posts together. Each
+    goes to its own platform queue with the same ETA, so the platforms'
+    workers publish them in parallel instead of one after another.
+    """
+    posts = list(campaign.posts.filter(status='pending').only('id', 'platform', 'scheduled_time', 'traceparent'))
+    now = timezone.now()
+    for post in posts:
+        dispatch_publish(post, eta=post.scheduled_time if post.scheduled_time > now else None)
+    return posts
+
+
+_task_spans = {}
+
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, args=None, **kwargs):
+    request = task.request
+    traceparent = request.get('traceparent') or (request.get('headers') or {}).get('traceparent')
+    if not traceparent:
+        return
+    _task_spans[task_id] = tracing.begin_span(
+        task.name, traceparent, task_id=task_id, args=list(args or ()), retries=request.retries
+    )
+
+
+@task_postrun.connect
+def end_task_span(task_id=None, state=None, **kwargs):
+    span, token = _task_spans.pop(task_id, (None, None))
+    if span:
+        span.set(state=state)
+        tracing.end_span(span, token)
+
+
+# The hard time limit is shorter than the claim lease, so a publish that
+# hangs is killed before its post can be claimed by another worker
+@shared_task(bind=True, max_retries=3, default_retry_delay=60, time_limit=settings.PUBLISH_TASK_TIME_LIMIT)
 def publish_post(self, post_id):
     """
     Publish a post to the specified platform using real API integrations.
     Retries up to 3 times if it fails.
     """
+    slot = None
     try:
         post = Post.objects.get(id=post_id)
         
@@ -25,6 +225,29 @@ def publish_post(self, post_id):
             logger.info(f"Post {post_id} is already posted")
             return
         
+        # Apply the lateness policy to posts that missed their window
+        late_status = get_lateness_status(post)
+        if late_status:
+            updated = Post.objects.filter(id=post_id, status='pending').update(status=late_status, updated_at=timezone.now())
+            if updated:
+                logger.warning(f"Post {post_id} is too late to publish, marked as {late_status}")
+                record_outcome(post, late_status, 'late')
+            return
+        
+        claimed_at = timezone.now()
+        if not claim_post(post_id, claimed_at):
+            logger.info(f"Post {post_id} is already being published by another worker")
+            return
+        
+        # Hold back users that are over their share of this platform's workers
+        if not acquire_publish_slot(post.platform, post.user_id):
+            release_claim(post_id)
+            dispatch_publish(post, countdown=fair_share_backoff(post_id), priority=PRIORITY_DEFERRED)
+            logger.info(f"Post {post_id} deferred, user {post.user_id} is over its {post.platform} fair share")
+            record_outcome(post, 'deferred', 'fair_share')
+            return
+        slot = (post.platform, post.user_id)
+        
         logger.info(f"Publishing post {post_id} to {post.platform} for user {post.user.username}")
         
         # Get the user's social account for this platform
@@ -39,6 +262,17 @@ def publish_post(self, post_id):
             logger.error(error_msg)
             post.status = 'failed'
             post.save()
+            record_outcome(post, 'failed', 'validation', attempts=self.request.retries + 1)
+            return
+        
+        # Don't call a provider that is failing; come back once its breaker half-opens
+        breaker = get_breaker(post.platform)
+        if not breaker.allow_request():
+            release_claim(post_id)
+            countdown = breaker.remaining_open_seconds() + random.uniform(0, settings.CIRCUIT_BREAKER_OPEN_SECONDS / 4)
+            dispatch_publish(post, countdown=countdown, priority=PRIORITY_DEFERRED)
+            logger.warning(f"Post {post_id} deferred, {post.platform} circuit breaker is {breaker.state}")
+            record_outcome(post, 'deferred', 'circuit_open')
             return
         
         # Update last_used_at
@@ -52,21 +286,68 @@ def publish_post(self, post_id):
             logger.error(error_msg)
             post.status = 'failed'
             post.save()
+            record_outcome(post, 'failed', 'validation', attempts=self.request.retries + 1)
             return
         
+        # Posts are checked when created; this catches older posts and changed accounts
+        # before any quota or retries are spent on them
+        errors = preflight_post(post.platform, post.content, post.media_url, social_account)
+        if errors:
+            logger.error(f"Post {post_id} can't be published to {post.platform}: {' '.join(errors)}")
+            post.status = 'failed'
+            post.save()
+            record_outcome(post, 'failed', 'validation', attempts=self.request.retries + 1)
+            return
+        
+        # Media is normally prefetched ahead of time; fetch it now if that didn't happen
+        if post.media_url and post.media_status != 'ready':
+            claimed_at = renew_claim(post_id, claimed_at)
+            with task_phase('media'):
+                media.prepare_post_media(post)
+            if post.media_status == 'invalid':
+                logger.error(f"Post {post_id} media can't be published: {post.media_error}")
+                post.status = 'failed'
+                post.save()
+                record_outcome(post, 'failed', 'validation', attempts=self.request.retries + 1)
+                return
+        
         # Refresh token if needed
-        integration.refresh_token_if_needed()
+        claimed_at = renew_claim(post_id, claimed_at)
+        with task_phase('token_refresh'):
+            integration.refresh_token_if_needed()
         
-        # Post to the platform
-        success, post_id_external, error_message = integration.post(
-            content=post.content,
-            media_url=post.media_url
-        )
+        # Post to the platform; a container staged ahead of time only needs publishing
+        claimed_at = renew_claim(post_id, claimed_at)
+        container_id = staged_container_id(post, integration)
+        try:
+            if container_id:
+                success, post_id_external, error_message = integration.publish_staged(
+                    container_id, ready=post.container_status == 'ready'
+                )
+            else:
+                success, post_id_external, error_message = integration.post(
+                    content=post.content,
+                    media_url=post.media_url,
+                    media=media.local_media(post) if post.media_url else None,
+                )
+        except ContainerProcessing as e:
+            container_id = e.container_id
+            if defer_processing_container(post, integration, container_id):
+                logger.info(f"Post {post_id} deferred, {post.platform} is still processing container {container_id}")
+                return
+            success, post_id_external = False, None
+            error_message = f"{post.get_platform_display()} media still processing after {integration.MAX_PROCESSING_WAIT}s (timeout)"
+        if not success and container_id:
+            # Start from a fresh container if this one is retried
+            post.container_id, post.container_status, post.staged_at = None, '', None
         
         if success:
             post.status = 'posted'
             post.external_post_id = post_id_external
             logger.info(f"Successfully posted {post_id} to {post.platform}. External ID: {post_id_external}")
+            metrics.schedule_lag.observe(
+                max((timezone.now() - post.scheduled_time).total_seconds(), 0), platform=post.platform
+            )
         else:
             post.status = 'failed'
             error_msg = error_message or "Unknown error"
@@ -74,10 +355,24 @@ def publish_post(self, post_id):
             
             # Retry on certain errors (network issues, rate limits, etc.)
             if "network" in error_msg.lower() or "timeout" in error_msg.lower():
+                if container_id:
+                    Post.objects.filter(id=post_id).update(container_id=None, container_status='', staged_at=None)
+                release_claim(post_id)
+                record_outcome(post, 'retry', metrics.classify_error(error_msg))
                 raise self.retry(exc=Exception(error_msg))
         
         post.save()
+        # Recorded once saved, so a client reacting to the event reads the new status
+        if success:
+            record_outcome(post, 'posted', attempts=self.request.retries + 1)
+        else:
+            record_outcome(post, 'failed', metrics.classify_error(error_msg), attempts=self.request.retries + 1)
         
+    except Retry:
+        raise
+    except ClaimLost:
+        logger.warning(f"Lost the claim on post {post_id} to another worker, leaving it to publish")
+        return
     except Post.DoesNotExist:
         logger.error(f"Post with ID {post_id} does not exist")
         return
@@ -97,6 +392,293 @@ def publish_post(self, post_id):
             post = Post.objects.get(id=post_id)
             post.status = 'failed'
             post.save()
+            record_outcome(post, 'failed', 'exception', attempts=self.request.retries + 1)
         except Post.DoesNotExist:
             pass
         raise
+    finally:
+        if slot:
+            release_publish_slot(*slot)
+
+
+@shared_task
+def reconcile_overdue_posts():
+    """
+    Find pending posts whose scheduled time has passed without being published
+    (e.g. ETA tasks lost while Redis or the workers were down) and re-dispatch them.
+
+    Posts beyond the lateness threshold are handled in bulk according to
+    PUBLISH_LATENESS_POLICY. The rest are drained oldest first, at most
+    CATCHUP_RATE_PER_MINUTE per platform per minute, with their countdowns
+    spread over the scan interval so recovery doesn't burst into the APIs.
+    """
+    now = timezone.now()
+    overdue = Post.objects.filter(
+        status='pending',
+        scheduled_time__lt=now - timedelta(seconds=settings.CATCHUP_GRACE_SECONDS),
+    )
+
+    summary = {'dispatched': 0, 'cancelled': 0, 'stale': 0}
+
+    policy = settings.PUBLISH_LATENESS_POLICY
+    if policy in ('skip', 'stale'):
+        late_status = 'cancelled' if policy == 'skip' else 'stale'
+        cutoff = now - timedelta(seconds=settings.PUBLISH_MAX_LATENESS)
+        late_ids = list(overdue.filter(scheduled_time__lt=cutoff).values_list('id', flat=True))
+        summary[late_status] = Post.objects.filter(id__in=late_ids, status='pending').update(status=late_status, updated_at=now)
+        if summary[late_status]:
+            # Only the posts this update changed; any claimed in between were published instead
+            announce_status(Post.objects.filter(id__in=late_ids, status=late_status, updated_at=now), late_status)
+
+    interval = max(settings.CATCHUP_SCAN_INTERVAL, 1)
+    budget = max(settings.CATCHUP_RATE_PER_MINUTE * interval // 60, 1)
+    spacing = interval / budget
+    redispatch_cutoff = now - timedelta(seconds=settings.CATCHUP_REDISPATCH_AFTER)
+
+    candidates = overdue.filter(
+        Q(dispatched_at__isnull=True) | Q(dispatched_at__lt=redispatch_cutoff),
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timedelta(seconds=settings.PUBLISH_CLAIM_LEASE)),
+    ).order_by('scheduled_time')
+
+    for platform_code, _ in Post.PLATFORM_CHOICES:
+        posts = list(candidates.filter(platform=platform_code).only('id', 'platform', 'traceparent')[:budget])
+        for index, post in enumerate(posts):
+            dispatch_publish(post, countdown=index * spacing, priority=PRIORITY_CATCHUP)
+        summary['dispatched'] += len(posts)
+
+    if any(summary.values()):
+        logger.warning(
+            f"Catch-up: dispatched {summary['dispatched']} overdue posts, "
+            f"cancelled {summary['cancelled']}, marked {summary['stale']} stale"
+        )
+    return summary
+
+
+@shared_task
+def prefetch_media(post_id):
+    """Fetch and validate one pending post's media into the local media cache"""
+    post = Post.objects.filter(id=post_id, status='pending').exclude(media_status='ready').first()
+    if post and post.media_url:
+        media.prepare_post_media(post)
+
+
+@shared_task
+def prefetch_upcoming_media():
+    """
+    Queue media prefetches for pending posts due within
+    MEDIA_PREFETCH_LEAD_SECONDS whose media hasn't been checked yet.
+    Posts whose fetch failed transiently stay 'unchecked' and are retried
+    on the next scan.
+    """
+    horizon = timezone.now() + timedelta(seconds=settings.MEDIA_PREFETCH_LEAD_SECONDS)
+    post_ids = list(
+        Post.objects.filter(status='pending', media_status='unchecked', scheduled_time__lte=horizon)
+        .exclude(media_url__isnull=True).exclude(media_url='')
+        .order_by('scheduled_time')
+        .values_list('id', flat=True)[:settings.MEDIA_PREFETCH_BATCH]
+    )
+    for post_id in post_ids:
+        prefetch_media.apply_async((post_id,), queue=settings.MEDIA_QUEUE)
+    if post_ids:
+        logger.info(f"Queued media prefetch for {len(post_ids)} upcoming posts")
+    return len(post_ids)
+
+
+@shared_task
+def stage_upcoming_containers():
+    """
+    Create media containers for pending posts on staging platforms
+    (Instagram) due within STAGING_LEAD_SECONDS, so that container
+    processing, which can take minutes for video, is over by the time
+    publish_post runs.
+    """
+    horizon = timezone.now() + timedelta(seconds=settings.STAGING_LEAD_SECONDS)
+    due = Post.objects.filter(
+        platform__in=STAGED_PLATFORMS,
+        status='pending',
+        media_status='ready',
+        container_status='',
+        scheduled_time__lte=horizon,
+    )
+    posts = list(due.order_by('scheduled_time').values_list('id', 'platform')[:settings.MEDIA_PREFETCH_BATCH])
+    # Mark them first so the next scan doesn't queue them again
+    Post.objects.filter(id__in=[post_id for post_id, _ in posts], container_status='').update(container_status='processing')
+    for post_id, platform in posts:
+        stage_post_container.apply_async((post_id,), queue=publish_queue(platform), priority=PRIORITY_STAGING)
+    if posts:
+        logger.info(f"Queued media container staging for {len(posts)} upcoming posts")
+    return len(posts)
+
+
+def _staging_integration(post):
+    account = SocialAccount.objects.filter(user_id=post.user_id, platform=post.platform, is_active=True).first()
+    return get_platform_integration(post.platform, account) if account else None
+
+
+@shared_task
+def stage_post_container(post_id):
+    """Create one post's media container and start polling its processing status"""
+    post = Post.objects.filter(id=post_id, status='pending', container_id__isnull=True).first()
+    if post is None:
+        return
+    integration = _staging_integration(post)
+    if integration is None:
+        Post.objects.filter(id=post_id).update(container_status='failed')
+        return
+    if not integration.breaker.allow_request():
+        # Leave it to a later scan; publish_post stages inline if none succeeds
+        Post.objects.filter(id=post_id).update(container_status='')
+        return
+
+    integration.refresh_token_if_needed()
+    container_id, error = integration.stage(post.content, post.media_url, media.local_media(post))
+    if not container_id:
+        logger.warning(f"Could not stage a container for post {post_id}: {error}")
+        Post.objects.filter(id=post_id).update(container_status='failed')
+        return
+
+    Post.objects.filter(id=post_id).update(container_id=container_id, container_status='processing', staged_at=timezone.now())
+    poll_staged_container.apply_async(
+        (post_id, container_id),
+        countdown=settings.STAGING_POLL_INITIAL,
+        queue=publish_queue(post.platform),
+        priority=PRIORITY_STAGING,
+    )
+
+
+@shared_task
+def poll_staged_container(post_id, container_id, attempt=0):
+    """
+    Check a staged container's processing status, re-scheduling itself with
+    exponential backoff until it's ready, failed or out of attempts
+    """
+    post = Post.objects.filter(id=post_id, status='pending', container_id=container_id).first()
+    if post is None:
+        # Published, cancelled or edited since
+        return
+    integration = _staging_integration(post)
+    if integration is None:
+        return
+
+    state, error = integration.container_status(container_id)
+    if state == 'processing' and attempt + 1 >= settings.STAGING_POLL_ATTEMPTS:
+        state, error = 'failed', f"still processing after {attempt + 1} checks"
+    if state == 'processing':
+        poll_staged_container.apply_async(
+            (post_id, container_id, attempt + 1),
+            countdown=min(settings.STAGING_POLL_INITIAL * 2 ** (attempt + 1), settings.STAGING_POLL_MAX),
+            queue=publish_queue(post.platform),
+            priority=PRIORITY_STAGING,
+        )
+        return
+    if state == 'failed':
+        logger.warning(f"Staged container {container_id} for post {post_id} failed: {error}")
+    Post.objects.filter(id=post_id, container_id=container_id).update(container_status=state)
+
+
+@shared_task
+def materialize_recurring_posts():
+    """
+    Create the posts of recurrence rules whose next occurrence falls inside
+    RECURRENCE_HORIZON_SECONDS, RECURRENCE_BATCH rules at a time. A full
+    batch queues another run straight away instead of waiting for beat.
+    """
+    horizon = timezone.now() + timedelta(seconds=settings.RECURRENCE_HORIZON_SECONDS)
+    rules = list(
+        RecurrenceRule.objects.filter(is_active=True, next_occurrence__lte=horizon)
+        .order_by('next_occurrence')[:settings.RECURRENCE_BATCH]
+    )
+    created = 0
+    for rule in rules:
+        try:
+            created += len(recurrence.materialize(rule))
+        except recurrence.RecurrenceError as e:
+            # Only possible for rules saved before validation or with a since-removed time zone
+            logger.error(f"Recurrence rule {rule.id} can't be expanded, deactivating it: {e}")
+            RecurrenceRule.objects.filter(id=rule.id).update(is_active=False)
+    if len(rules) == settings.RECURRENCE_BATCH:
+        materialize_recurring_posts.apply_async()
+    if created:
+        logger.info(f"Materialized {created} recurring posts from {len(rules)} rules")
+    return created
+
+
+@shared_task
+def purge_media_cache():
+    """
+    Remove cached media that no post has used for MEDIA_CACHE_MAX_AGE seconds
+    and platform media IDs that have expired
+    """
+    removed = media.purge_cache(settings.MEDIA_CACHE_MAX_AGE)
+    expired = media.purge_expired_platform_media()
+    if removed or expired:
+        logger.info(f"Purged {removed} files from the media cache and {expired} expired platform media IDs")
+    return removed
+
+
+@shared_task
+def purge_post_tombstones():
+    """Forget deletions older than CHANGES_TOMBSTONE_TTL; older change tokens get a 410 anyway"""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHANGES_TOMBSTONE_TTL)
+    removed, _ = PostTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    if removed:
+        logger.info(f"Purged {removed} post tombstones")
+    return removed
+
+
+@shared_task(ignore_result=True)
+def deliver_webhook(webhook_id):
+    """Send a webhook's pending events in batches (see posts.webhooks)"""
+    return webhooks.deliver(webhook_id)
+
+
+@shared_task
+def deliver_pending_webhooks():
+    """Schedule delivery for every webhook with due events, e.g. retries or events queued while the broker was down"""
+    webhook_ids = list(
+        WebhookDelivery.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+        .values_list('webhook_id', flat=True).distinct().order_by()
+    )
+    for webhook_id in webhook_ids:
+        webhooks.schedule_delivery(webhook_id)
+    return len(webhook_ids)
+
+
+@shared_task
+def purge_webhook_deliveries():
+    """Forget delivered and failed webhook events after WEBHOOK_DELIVERY_RETENTION seconds"""
+    cutoff = timezone.now() - timedelta(seconds=settings.WEBHOOK_DELIVERY_RETENTION)
+    removed, _ = WebhookDelivery.objects.filter(status__in=('delivered', 'failed'), created_at__lt=cutoff).delete()
+    if removed:
+        logger.info(f"Purged {removed} webhook deliveries")
+    return removed
+
+
+@shared_task
+def collect_engagement():
+    """Give each account one task with its published posts whose engagement is due"""
+    planned = engagement.plan()
+    for account_id, post_ids in planned.items():
+        collect_account_engagement.delay(account_id, post_ids)
+    if planned:
+        logger.info(f"Collecting engagement of {sum(map(len, planned.values()))} posts for {len(planned)} accounts")
+    return len(planned)
+
+
+@shared_task
+def collect_account_engagement(social_account_id, post_ids):
+    """Look up engagement of an account's posts in platform batches (see posts.engagement)"""
+    social_account = SocialAccount.objects.filter(id=social_account_id, is_active=True).first()
+    if social_account is None:
+        return 0
+    return engagement.collect_account(social_account, post_ids)
+
+
+@shared_task
+def update_rollups():
+    """Fold new publish outcomes and engagement snapshots into the analytics rollups"""
+    folded = analytics.update_rollups()
+    if any(count >= settings.ROLLUP_BATCH * settings.ROLLUP_MAX_BATCHES for count in folded.values()):
+        # Still behind; continue right away instead of waiting for the next beat
+        update_rollups.apply_async()
+    return folded
@@ -1,3 +1,2086 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from celery.exceptions import Retry
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from PIL import Image
+from core import profiling, tracing
+from . import analytics, engagement, events, media, metrics, recurrence, task_profiling, uploads, views, webhooks
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, get_breaker
+from .fake_platforms import fake_platform_apis
+from .models import (
+    Campaign, EngagementSnapshot, PlatformMedia, Post, PostRollup, PostTombstone, PublishOutcome, RecurrenceRule, SocialAccount,
+    Webhook, WebhookDelivery,
+)
+from .scheduling import PRIORITY_DEFERRED, acquire_publish_slot, fair_share_backoff, release_publish_slot
+from .serializers import PostSerializer
+from .social_integrations import InstagramIntegration, TwitterIntegration, YouTubeIntegration
+from .tasks import (
+    ClaimLost, claim_post, get_lateness_status, materialize_recurring_posts, poll_staged_container, prefetch_upcoming_media,
+    publish_post, purge_post_tombstones, reconcile_overdue_posts, renew_claim, stage_post_container, stage_upcoming_containers,
+)
 
-# Create your tests here.
+User = get_user_model()
+
+# Dataset sizes every list-style endpoint is measured at; query counts must
+# not grow between them.
+DATASET_SIZES = (1, 10, 45)
+
+
+class QueryBudgetMixin:
+    """
+    Helpers for asserting that an endpoint stays within a fixed query budget
+    and that its query count doesn't depend on how much data the user has.
+    """
+
+    def make_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def count_queries(self, client, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+        return len(captured.captured_queries), captured
+
+    def assertQueryBudget(self, budget, client, method, url, **kwargs):
+        count, captured = self.count_queries(client, method, url, **kwargs)
+        queries = '\n'.join(query['sql'] for query in captured.captured_queries)
+        self.assertLessEqual(
+            count, budget,
+            f"{method.upper()} {url} ran {count} queries, budget is {budget}:\n{queries}"
+        )
+        return count
+
+
+@mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+class PostQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query budgets for every PostViewSet action"""
+
+    # auth user lookup + count + page
+    LIST_BUDGET = 3
+    # auth + object
+    RETRIEVE_BUDGET = 2
+    # auth + account check + insert + task id update
+    CREATE_BUDGET = 4
+    # auth + object + update
+    UPDATE_BUDGET = 3
+    # auth + object + engagement snapshots cascade + delete + tombstone
+    DESTROY_BUDGET = 5
+    # auth + object + update + webhook lookup + outcome log
+    CANCEL_BUDGET = 5
+    # auth + one aggregate
+    STATS_BUDGET = 2
+
+    def setUp(self):
+        self.user = User.objects.create_user('budget', 'budget@example.com', 'pw-budget-123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pw-other-123')
+        for platform in ('twitter', 'linkedin', 'instagram'):
+            SocialAccount.objects.create(user=self.user, platform=platform, access_token='token')
+        self.client = self.make_client(self.user)
+
+    def create_posts(self, count, user=None):
+        future = timezone.now() + timedelta(days=1)
+        platforms = ('twitter', 'linkedin', 'instagram', 'youtube')
+        statuses = ('pending', 'posted', 'failed', 'cancelled')
+        Post.objects.bulk_create([
+            Post(
+                user=user or self.user,
+                platform=platforms[index % len(platforms)],
+                status=statuses[index % len(statuses)],
+                content=f'launch post {index}',
+                scheduled_time=future + timedelta(minutes=index),
+            )
+            for index in range(count)
+        ])
+
+    def pending_post(self):
+        return Post.objects.create(
+            user=self.user, platform='twitter', content='pending',
+            scheduled_time=timezone.now() + timedelta(days=1),
+        )
+
+    def assertConstantAcrossSizes(self, budget, method, url):
+        counts = []
+        created = 0
+        for size in DATASET_SIZES:
+            self.create_posts(size - created)
+            created = size
+            counts.append(self.assertQueryBudget(budget, self.client, method, url))
+        self.assertEqual(len(set(counts)), 1, f"{url} query count grows with data: {dict(zip(DATASET_SIZES, counts))}")
+
+    def test_list(self, _):
+        self.create_posts(5, user=self.other)
+        self.assertConstantAcrossSizes(self.LIST_BUDGET, 'get', '/api/posts/')
+
+    def test_list_search_filter_ordering(self, _):
+        self.assertConstantAcrossSizes(
+            self.LIST_BUDGET, 'get', '/api/posts/?search=launch&platform=twitter&status=pending&ordering=created_at'
+        )
+
+    def test_list_deep_page(self, _):
+        self.create_posts(45)
+        self.assertQueryBudget(self.LIST_BUDGET, self.client, 'get', '/api/posts/?page=3')
+
+    def test_stats(self, _):
+        self.assertConstantAcrossSizes(self.STATS_BUDGET, 'get', '/api/posts/stats/')
+
+    def test_retrieve(self, _):
+        post = self.pending_post()
+        self.assertQueryBudget(self.RETRIEVE_BUDGET, self.client, 'get', f'/api/posts/{post.id}/')
+
+    def test_create(self, apply_async):
+        self.assertQueryBudget(self.CREATE_BUDGET, self.client, 'post', '/api/posts/', format='json', data={
+            'platform': 'twitter',
+            'content': 'hello',
+            'scheduled_time': (timezone.now() + timedelta(hours=1)).isoformat(),
+        })
+        self.assertEqual(apply_async.call_count, 1)
+
+    def test_create_without_account_does_not_save(self, apply_async):
+        count_before = Post.objects.count()
+        response = self.client.post('/api/posts/', format='json', data={
+            'platform': 'youtube',
+            'content': 'hello',
+            'scheduled_time': (timezone.now() + timedelta(hours=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Post.objects.count(), count_before)
+        apply_async.assert_not_called()
+
+    def test_update(self, _):
+        post = self.pending_post()
+        self.assertQueryBudget(self.UPDATE_BUDGET, self.client, 'put', f'/api/posts/{post.id}/', format='json', data={
+            'platform': 'twitter',
+            'content': 'updated',
+            'scheduled_time': (timezone.now() + timedelta(hours=2)).isoformat(),
+        })
+
+    def test_partial_update(self, _):
+        post = self.pending_post()
+        self.assertQueryBudget(
+            self.UPDATE_BUDGET, self.client, 'patch', f'/api/posts/{post.id}/', format='json', data={'content': 'patched'}
+        )
+
+    def test_destroy(self, _):
+        post = self.pending_post()
+        self.assertQueryBudget(self.DESTROY_BUDGET, self.client, 'delete', f'/api/posts/{post.id}/')
+
+    @mock.patch('celery.app.control.Control.revoke')
+    def test_cancel(self, _revoke, _):
+        post = self.pending_post()
+        self.assertQueryBudget(self.CANCEL_BUDGET, self.client, 'post', f'/api/posts/{post.id}/cancel/')
+
+
+class CalendarTests(QueryBudgetMixin, TestCase):
+    """Server-side bucketing for /api/posts/calendar/"""
+
+    # auth + bucket counts + stubs
+    BUDGET = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user('calendar', 'calendar@example.com', 'pw-calendar-123')
+        self.client = self.make_client(self.user)
+
+    def add(self, when, platform='twitter', post_status='pending', count=1):
+        Post.objects.bulk_create([
+            Post(user=self.user, platform=platform, status=post_status, content=f'post {index} ' * 20, scheduled_time=when)
+            for index in range(count)
+        ])
+
+    def test_buckets_follow_the_requested_timezone(self):
+        utc = datetime(2026, 10, 1, 23, 30, tzinfo=dt_timezone.utc)
+        self.add(utc)
+        self.add(utc - timedelta(hours=12), platform='linkedin', post_status='posted', count=2)
+        url = '/api/posts/calendar/?start=2026-10-01&end=2026-10-03'
+
+        buckets = self.client.get(url).data['buckets']
+        self.assertEqual([(b['start'], b['total']) for b in buckets], [('2026-10-01T00:00:00+00:00', 3)])
+        self.assertEqual(buckets[0]['by_platform'], {'twitter': 1, 'linkedin': 2})
+        self.assertEqual(buckets[0]['by_status'], {'pending': 1, 'posted': 2})
+
+        buckets = self.client.get(url + '&timezone=Europe/Berlin').data['buckets']
+        self.assertEqual(
+            [(b['start'], b['total']) for b in buckets],
+            [('2026-10-01T00:00:00+02:00', 2), ('2026-10-02T00:00:00+02:00', 1)],
+        )
+
+    def test_hourly_buckets_with_stubs_are_bounded(self):
+        day = datetime(2026, 10, 5, tzinfo=dt_timezone.utc)
+        url = '/api/posts/calendar/?start=2026-10-05&end=2026-10-06&granularity=hour&stubs=2'
+        counts = []
+        for count in (1, 10, 40):
+            Post.objects.all().delete()
+            for hour in (9, 17):
+                self.add(day + timedelta(hours=hour), count=count)
+            counts.append(self.assertQueryBudget(self.BUDGET, self.client, 'get', url))
+            buckets = self.client.get(url).data['buckets']
+            self.assertEqual([b['total'] for b in buckets], [count, count])
+            self.assertEqual([len(b['posts']) for b in buckets], [min(count, 2)] * 2)
+            self.assertLessEqual(len(buckets[0]['posts'][0]['preview']), 80)
+        self.assertEqual(len(set(counts)), 1)
+
+    def test_invalid_parameters(self):
+        for query in (
+            'start=2026-10-01&end=2026-09-01',
+            'start=2026-10-01&end=2026-12-01&granularity=hour',
+            'start=2026-10-01&end=2026-10-02&granularity=week',
+            'start=2026-10-01&end=2026-10-02&timezone=Nowhere/Town',
+            'start=yesterday&end=2026-10-02',
+        ):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f'/api/posts/calendar/?{query}').status_code, 400)
+
+
+@override_settings(CHANGES_SETTLE_SECONDS=0, CHANGES_PAGE_SIZE=3)
+class ChangeFeedTests(QueryBudgetMixin, TestCase):
+    """Delta sync through /api/posts/changes/"""
+
+    # auth + posts page + tombstones
+    BUDGET = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user('syncer', 'syncer@example.com', 'pw-syncer-123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pw-other-123')
+        self.client = self.make_client(self.user)
+
+    def add(self, user=None, **fields):
+        return Post.objects.create(
+            user=user or self.user, platform='twitter', content='hello', scheduled_time=timezone.now() + timedelta(hours=1),
+            **fields
+        )
+
+    def sync(self, since=None):
+        """Follow pages until has_more is false; returns (changed ids, deleted ids, token)"""
+        changed, deleted = [], []
+        while True:
+            response = self.client.get('/api/posts/changes/', {'since': since} if since else {})
+            self.assertEqual(response.status_code, 200, response.data)
+            changed += [post['id'] for post in response.data['changes']]
+            deleted += response.data['deleted']
+            since = response.data['next']
+            if not response.data['has_more']:
+                return changed, deleted, since
+
+    def test_full_sync_then_deltas(self):
+        posts = [self.add() for _ in range(5)]
+        self.add(user=self.other)
+        changed, deleted, token = self.sync()
+        self.assertEqual(sorted(changed), sorted(post.id for post in posts))
+        self.assertEqual(deleted, [])
+
+        self.assertEqual(self.sync(token)[:2], ([], []))
+
+        posts[1].content = 'edited'
+        posts[1].save()
+        Post.objects.filter(id=posts[2].id).update(status='failed', updated_at=timezone.now())
+        created = self.add()
+        self.client.delete(f'/api/posts/{posts[3].id}/')
+        changed, deleted, token = self.sync(token)
+        self.assertEqual(sorted(changed), sorted([posts[1].id, posts[2].id, created.id]))
+        self.assertEqual(deleted, [posts[3].id])
+        self.assertEqual(self.sync(token)[:2], ([], []))
+
+    def test_pages_split_within_one_timestamp(self):
+        # Rows written by one bulk update share an updated_at; the id in the token keeps pages apart
+        posts = [self.add() for _ in range(7)]
+        Post.objects.filter(user=self.user).update(updated_at=timezone.now() - timedelta(seconds=1))
+        changed, _, _ = self.sync()
+        self.assertEqual(changed, [post.id for post in posts])
+
+    def test_query_count_is_flat(self):
+        _, _, token = self.sync()
+        for count in DATASET_SIZES:
+            for _ in range(count):
+                self.add()
+            Post.objects.filter(user=self.user).first().delete()
+            self.assertQueryBudget(self.BUDGET, self.client, 'get', f'/api/posts/changes/?since={token}')
+
+    def test_settle_window_holds_back_recent_changes(self):
+        self.add()
+        with self.settings(CHANGES_SETTLE_SECONDS=60):
+            changed, _, token = self.sync()
+        self.assertEqual(changed, [])
+        self.assertEqual(len(self.sync(token)[0]), 1)
+
+    def test_old_and_invalid_tokens(self):
+        expired = timezone.now() - timedelta(days=31)
+        self.assertEqual(self.client.get(f'/api/posts/changes/?since={views.encode_change_token(expired)}').status_code, 410)
+        self.assertEqual(self.client.get('/api/posts/changes/?since=yesterday').status_code, 400)
+
+    def test_deleting_a_user_with_posts(self):
+        for _ in range(3):
+            self.add()
+        self.add().delete()
+        self.user.delete()
+        self.assertFalse(Post.objects.filter(user_id=self.user.id).exists())
+        self.assertFalse(PostTombstone.objects.filter(user_id=self.user.id).exists())
+
+        self.add(user=self.other)
+        User.objects.filter(id=self.other.id).delete()
+        self.assertFalse(PostTombstone.objects.exists())
+
+    def test_purge_tombstones(self):
+        self.add().delete()
+        PostTombstone.objects.create(user=self.user, post_id=999, deleted_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(purge_post_tombstones(), 1)
+        self.assertEqual(PostTombstone.objects.count(), 1)
+
+
+@mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+class CampaignTests(QueryBudgetMixin, TestCase):
+    """Campaign fan-out to one post per platform"""
+
+    # auth + account check + savepoint + campaign insert + posts insert + release + posts for the response
+    CREATE_BUDGET = 7
+    # auth + count + page + posts
+    LIST_BUDGET = 4
+
+    def setUp(self):
+        self.user = User.objects.create_user('campaigner', 'campaigner@example.com', 'pw-campaign-123')
+        for platform in ('twitter', 'linkedin', 'instagram'):
+            SocialAccount.objects.create(
+                user=self.user, platform=platform, access_token='token', metadata={'person_urn': 'urn:li:person:1'}
+            )
+        self.client = self.make_client(self.user)
+        self.scheduled_time = timezone.now() + timedelta(hours=1)
+
+    def campaign(self, platforms=('twitter', 'linkedin', 'instagram'), **fields):
+        return {
+            'content': 'launch day',
+            'media_url': 'https://example.com/launch.jpg',
+            'platforms': list(platforms),
+            'scheduled_time': self.scheduled_time.isoformat(),
+            **fields,
+        }
+
+    def create(self, platforms=('twitter', 'linkedin', 'instagram'), **fields):
+        return self.client.post('/api/campaigns/', self.campaign(platforms, **fields), format='json')
+
+    def test_create_fans_out_after_commit(self, apply_async):
+        with self.captureOnCommitCallbacks() as callbacks:
+            count, _ = self.count_queries(self.client, 'post', '/api/campaigns/', format='json', data=self.campaign())
+            apply_async.assert_not_called()
+        self.assertLessEqual(count, self.CREATE_BUDGET)
+        for callback in callbacks:
+            callback()
+
+        campaign = Campaign.objects.get()
+        self.assertEqual(sorted(campaign.platforms), ['instagram', 'linkedin', 'twitter'])
+        self.assertEqual(campaign.status, 'pending')
+        queues = {call.kwargs['queue'] for call in apply_async.call_args_list}
+        self.assertEqual(queues, {'publish.twitter', 'publish.linkedin', 'publish.instagram'})
+        self.assertEqual({call.kwargs['eta'] for call in apply_async.call_args_list}, {self.scheduled_time})
+        self.assertFalse(campaign.posts.filter(celery_task_id__isnull=True).exists())
+
+    def test_missing_account_rejects_the_whole_campaign(self, apply_async):
+        response = self.create(('twitter', 'youtube'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('youtube', str(response.data))
+        self.assertFalse(Campaign.objects.exists())
+        self.assertFalse(Post.objects.exists())
+
+    def test_duplicate_platforms_are_rejected(self, apply_async):
+        self.assertEqual(self.create(('twitter', 'twitter')).status_code, 400)
+
+    def test_preflight_errors_are_reported_per_platform(self, apply_async):
+        response = self.create(content='x' * 300, media_url=None)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['platforms']), {'twitter', 'instagram'})
+        SocialAccount.objects.filter(platform='linkedin').update(metadata={})
+        response = self.create(('twitter', 'linkedin'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['platforms']), {'linkedin'})
+        self.assertFalse(Campaign.objects.exists())
+
+    def test_aggregate_status(self, apply_async):
+        campaign_id = self.create().data['id']
+        cases = [
+            ({'twitter': 'posted'}, 'publishing'),
+            ({'linkedin': 'posted', 'instagram': 'posted'}, 'posted'),
+            ({'instagram': 'failed'}, 'partial'),
+            ({'twitter': 'failed', 'linkedin': 'failed'}, 'failed'),
+            ({'twitter': 'cancelled', 'linkedin': 'cancelled', 'instagram': 'cancelled'}, 'cancelled'),
+        ]
+        for updates, expected in cases:
+            for platform, post_status in updates.items():
+                Post.objects.filter(campaign_id=campaign_id, platform=platform).update(status=post_status)
+            response = self.client.get(f'/api/campaigns/{campaign_id}/')
+            self.assertEqual(response.data['status'], expected, updates)
+
+    def test_list_queries_do_not_grow_with_campaigns(self, apply_async):
+        counts = []
+        for _ in range(3):
+            self.create()
+            counts.append(self.assertQueryBudget(self.LIST_BUDGET, self.client, 'get', '/api/campaigns/'))
+        self.assertEqual(len(set(counts)), 1)
+
+    @mock.patch('celery.app.control.Control.revoke')
+    def test_cancel_only_touches_pending_posts(self, revoke, apply_async):
+        campaign_id = self.create().data['id']
+        Post.objects.filter(campaign_id=campaign_id, platform='twitter').update(status='posted')
+        response = self.client.post(f'/api/campaigns/{campaign_id}/cancel/')
+        self.assertEqual(response.data['cancelled'], 2)
+        statuses = dict(Post.objects.filter(campaign_id=campaign_id).values_list('platform', 'status'))
+        self.assertEqual(statuses, {'twitter': 'posted', 'linkedin': 'cancelled', 'instagram': 'cancelled'})
+
+    @mock.patch('posts.views.announce_status')
+    @mock.patch('celery.app.control.Control.revoke')
+    def test_cancel_announces_only_the_posts_it_cancelled(self, revoke, announce_status, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            campaign_id = self.create().data['id']
+        # A worker claims the Twitter post between the read and the update
+        revoke.side_effect = lambda *args, **kwargs: Post.objects.filter(
+            campaign_id=campaign_id, platform='twitter',
+        ).update(status='publishing')
+        response = self.client.post(f'/api/campaigns/{campaign_id}/cancel/')
+        self.assertEqual(response.data['cancelled'], 2)
+        posts, post_status = announce_status.call_args.args
+        self.assertEqual(post_status, 'cancelled')
+        self.assertEqual(sorted(post.platform for post in posts), ['instagram', 'linkedin'])
+
+    @mock.patch('celery.app.control.Control.revoke')
+    def test_delete_keeps_published_posts(self, revoke, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            campaign_id = self.create().data['id']
+        posted = Post.objects.get(campaign_id=campaign_id, platform='twitter')
+        Post.objects.filter(id=posted.id).update(status='posted')
+        response = self.client.delete(f'/api/campaigns/{campaign_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Campaign.objects.exists())
+        self.assertEqual(list(Post.objects.values_list('id', 'campaign_id')), [(posted.id, None)])
+        self.assertEqual(revoke.call_count, 2)
+
+
+@mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+class PreflightTests(QueryBudgetMixin, TestCase):
+    """Posts every platform would refuse are rejected when created"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('preflight', 'preflight@example.com', 'pw-preflight-123')
+        for platform in ('twitter', 'linkedin', 'instagram', 'youtube'):
+            SocialAccount.objects.create(user=self.user, platform=platform, access_token='token')
+        self.client = self.make_client(self.user)
+
+    def create(self, platform, content='hello', media_url=None):
+        return self.client.post('/api/posts/', format='json', data={
+            'platform': platform,
+            'content': content,
+            'media_url': media_url,
+            'scheduled_time': (timezone.now() + timedelta(hours=1)).isoformat(),
+        })
+
+    def test_rejected_at_create(self, apply_async):
+        cases = [
+            ('twitter', 'x' * 281, None, '281 characters'),
+            ('instagram', 'hello', None, 'Instagram requires media'),
+            ('youtube', 'hello', None, 'YouTube requires video'),
+            ('youtube', 'hello', 'https://example.com/cover.png', 'image/png'),
+            ('linkedin', 'hello', None, 'person URN'),
+        ]
+        for platform, content, media_url, message in cases:
+            with self.subTest(platform=platform, message=message):
+                response = self.create(platform, content, media_url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, str(response.data))
+        self.assertFalse(Post.objects.exists())
+        apply_async.assert_not_called()
+
+    def test_accepted_at_the_limit(self, apply_async):
+        self.assertEqual(self.create('twitter', 'x' * 280).status_code, 201)
+        self.assertEqual(self.create('youtube', 'hello', 'https://example.com/launch.mp4').status_code, 201)
+
+    def test_update_is_checked_against_the_saved_post(self, apply_async):
+        post_id = self.create('twitter').data['id']
+        response = self.client.patch(f'/api/posts/{post_id}/', {'content': 'x' * 281}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_publish_fails_old_posts_without_calling_the_platform(self, apply_async):
+        post = Post.objects.create(
+            user=self.user, platform='twitter', content='x' * 300, scheduled_time=timezone.now(),
+        )
+        with mock.patch('posts.social_integrations.requests.request') as request:
+            publish_post.apply(args=(post.id,))
+        request.assert_not_called()
+        post.refresh_from_db()
+        self.assertEqual(post.status, 'failed')
+
+
+@override_settings(PUBLISH_CLAIM_LEASE=300, CATCHUP_GRACE_SECONDS=0, CATCHUP_SCAN_INTERVAL=60, CATCHUP_RATE_PER_MINUTE=2)
+@mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+class PublishClaimTests(TestCase):
+    """Claims on posts being published, the lateness policy and the catch-up scan"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('claims', 'claims@example.com', 'pw-claims-123')
+        SocialAccount.objects.create(user=self.user, platform='twitter', access_token='token')
+
+    def post(self, ago=0, platform='twitter'):
+        return Post.objects.create(
+            user=self.user, platform=platform, content='hi', scheduled_time=timezone.now() - timedelta(seconds=ago),
+        )
+
+    def test_only_one_worker_claims_a_post(self, apply_async):
+        post = self.post()
+        now = timezone.now()
+        self.assertTrue(claim_post(post.id, now))
+        self.assertFalse(claim_post(post.id, now + timedelta(seconds=299)))
+        # Once the lease ran out the post can be taken over, and the first claim is lost
+        self.assertTrue(claim_post(post.id, now + timedelta(seconds=301)))
+        with self.assertRaises(ClaimLost):
+            renew_claim(post.id, now)
+
+    def test_renewed_claim_is_not_redispatched(self, apply_async):
+        post = self.post(ago=3600)
+        long_ago = timezone.now() - timedelta(seconds=400)
+        claim_post(post.id, long_ago)
+        renew_claim(post.id, long_ago)
+        with self.settings(CATCHUP_REDISPATCH_AFTER=0):
+            self.assertEqual(reconcile_overdue_posts()['dispatched'], 0)
+
+    @mock.patch('posts.social_integrations.requests.request')
+    def test_publish_stops_when_its_claim_is_taken_over(self, request, apply_async):
+        post = self.post()
+
+        def taken_over():
+            Post.objects.filter(id=post.id).update(claimed_at=timezone.now() + timedelta(seconds=1))
+
+        with mock.patch.object(TwitterIntegration, 'refresh_token_if_needed', side_effect=taken_over):
+            publish_post.apply(args=(post.id,))
+        request.assert_not_called()
+        post.refresh_from_db()
+        self.assertEqual(post.status, 'pending')
+
+    def test_lateness_policy(self, apply_async):
+        on_time, late = self.post(ago=60), self.post(ago=7200)
+        expected = {'publish': (None, None), 'skip': (None, 'cancelled'), 'stale': (None, 'stale'), 'bogus': (None, None)}
+        for policy, statuses in expected.items():
+            with self.subTest(policy), self.settings(PUBLISH_LATENESS_POLICY=policy, PUBLISH_MAX_LATENESS=3600):
+                self.assertEqual((get_lateness_status(on_time), get_lateness_status(late)), statuses)
+
+    def test_scan_dispatches_a_budget_per_platform_oldest_first(self, apply_async):
+        twitter = [self.post(ago=600 - index) for index in range(5)]
+        self.post(ago=600, platform='linkedin')
+        self.assertEqual(reconcile_overdue_posts()['dispatched'], 3)
+        dispatched = Post.objects.filter(dispatched_at__isnull=False)
+        self.assertEqual(set(dispatched.filter(platform='twitter').values_list('id', flat=True)), {twitter[0].id, twitter[1].id})
+        # Recently dispatched posts wait for CATCHUP_REDISPATCH_AFTER; the next run takes the next oldest
+        self.assertEqual(reconcile_overdue_posts()['dispatched'], 2)
+        self.assertEqual(dispatched.count(), 5)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'circuit-breaker-tests'}},
+    CIRCUIT_BREAKER_WINDOW=60, CIRCUIT_BREAKER_MIN_CALLS=4, CIRCUIT_BREAKER_ERROR_RATE=0.5,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS=10, CIRCUIT_BREAKER_SLOW_RATE=0.8,
+    CIRCUIT_BREAKER_OPEN_SECONDS=30, CIRCUIT_BREAKER_HALF_OPEN_CALLS=2,
+)
+class CircuitBreakerTests(TestCase):
+    """Breaker state transitions, on a clock the tests move"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1200.0
+        clock = mock.patch('posts.circuit_breaker.time')
+        clock.start().time.side_effect = lambda: self.now
+        self.addCleanup(clock.stop)
+        self.breaker = get_breaker('twitter')
+
+    def fail(self, times, duration=0.1):
+        for _ in range(times):
+            self.breaker.record_failure(duration)
+
+    def open_breaker(self):
+        self.fail(4)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failures_are_counted_per_window(self):
+        self.fail(3)
+        # The next window starts from zero, so three more failures still aren't enough calls
+        self.now += 60
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_opens_on_error_or_slow_call_rate(self):
+        self.fail(1)
+        for _ in range(3):
+            self.breaker.record_success(0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.now += 60
+        for _ in range(4):
+            self.breaker.record_success(12)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_open_breaker_refuses_calls_until_it_half_opens(self):
+        self.open_breaker()
+        self.assertFalse(self.breaker.allow_request())
+        self.now += 20
+        self.assertEqual(self.breaker.snapshot(), {'state': OPEN, 'retry_in_seconds': 10})
+        self.now += 10
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_successful_probes_close_the_breaker(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertEqual([self.breaker.allow_request() for _ in range(3)], [True, True, False])
+        self.breaker.record_success(0.1)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.record_success(0.1)
+        self.assertEqual(self.breaker.snapshot(), {'state': CLOSED})
+        self.assertTrue(self.breaker.allow_request())
+        # The failures that opened it are forgotten
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_or_slow_probe_reopens_the_breaker(self):
+        for probe in (self.breaker.record_failure, self.breaker.record_success):
+            with self.subTest(probe.__name__):
+                self.open_breaker()
+                self.now += 30
+                self.assertTrue(self.breaker.allow_request())
+                probe(12)
+                self.assertEqual(self.breaker.state, OPEN)
+                self.assertEqual(self.breaker.remaining_open_seconds(), 30)
+                # Reopening resets the probe allowance for the next half-open period
+                self.now += 30
+                self.assertTrue(self.breaker.allow_request())
+                cache.clear()
+
+    @mock.patch('posts.social_integrations.requests.request')
+    @mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+    def test_publish_is_deferred_while_open(self, apply_async, request):
+        user = User.objects.create_user('breaker', 'breaker@example.com', 'pw-breaker-123')
+        SocialAccount.objects.create(user=user, platform='twitter', access_token='token')
+        post = Post.objects.create(user=user, platform='twitter', content='hi', scheduled_time=timezone.now())
+        self.open_breaker()
+        self.now += 10
+
+        publish_post.apply(args=(post.id,))
+        request.assert_not_called()
+        _, options = apply_async.call_args
+        self.assertEqual(options['priority'], PRIORITY_DEFERRED)
+        # Back once the breaker half-opens, plus up to a quarter of the open period of jitter
+        self.assertTrue(20 <= options['countdown'] <= 27.5)
+        post.refresh_from_db()
+        self.assertEqual((post.status, post.claimed_at), ('pending', None))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'fair-share-tests'}},
+    FAIR_SHARE_MAX_INFLIGHT=2, PUBLISH_USER_WEIGHTS={}, PUBLISH_CLAIM_LEASE=300,
+    FAIR_SHARE_DEFER_SECONDS=5, FAIR_SHARE_MAX_DEFER_SECONDS=60,
+)
+class FairShareTests(TestCase):
+    """Per-user publish slots and the backoff of deferred posts"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_slots_are_capped_per_user(self):
+        self.assertEqual([acquire_publish_slot('twitter', 1) for _ in range(3)], [True, True, False])
+        self.assertTrue(acquire_publish_slot('twitter', 2))
+        self.assertTrue(acquire_publish_slot('linkedin', 1))
+        release_publish_slot('twitter', 1)
+        self.assertTrue(acquire_publish_slot('twitter', 1))
+
+    def test_counter_lives_while_slots_are_taken(self):
+        start = 1_000_000.0
+        with mock.patch('time.time', return_value=start):
+            acquire_publish_slot('twitter', 1)
+        with mock.patch('time.time', return_value=start + 200):
+            acquire_publish_slot('twitter', 1)
+        # Past the first slot's lease, but the second one renewed the counter
+        with mock.patch('time.time', return_value=start + 400):
+            self.assertFalse(acquire_publish_slot('twitter', 1))
+        # Once idle for a whole lease, leaked slots are dropped
+        with mock.patch('time.time', return_value=start + 800):
+            self.assertTrue(acquire_publish_slot('twitter', 1))
+
+    def test_releases_never_free_more_slots_than_the_cap(self):
+        acquire_publish_slot('twitter', 1)
+        cache.delete('publish:inflight:twitter:1')
+        acquire_publish_slot('twitter', 1)
+        # Two releases of one counted slot: the counter stops at zero
+        release_publish_slot('twitter', 1)
+        release_publish_slot('twitter', 1)
+        self.assertEqual([acquire_publish_slot('twitter', 1) for _ in range(3)], [True, True, False])
+
+    @mock.patch('posts.scheduling.random.uniform', side_effect=lambda low, high: high)
+    def test_deferrals_back_off_exponentially(self, _):
+        self.assertEqual([fair_share_backoff(1) for _ in range(6)], [5, 10, 20, 40, 60, 60])
+        self.assertEqual(fair_share_backoff(2), 5)
+
+    @mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+    def test_publish_over_the_share_is_deferred(self, apply_async):
+        user = User.objects.create_user('share', 'share@example.com', 'pw-share-123')
+        post = Post.objects.create(user=user, platform='twitter', content='hi', scheduled_time=timezone.now())
+        for _ in range(2):
+            acquire_publish_slot('twitter', user.id)
+
+        for _ in range(2):
+            publish_post.apply(args=(post.id,))
+        first, second = (options['countdown'] for _, options in apply_async.call_args_list)
+        self.assertTrue(2.5 <= first <= 5 and 5 <= second <= 10)
+        post.refresh_from_db()
+        self.assertEqual((post.status, post.claimed_at), ('pending', None))
+
+
+class TaskProfilingTests(TestCase):
+    """Sampled task profiles"""
+
+    @mock.patch.object(task_profiling, 'get_config', return_value={'sample_rate': 1, 'dump_dir': '', 'dump_slowest': 0})
+    def test_concurrent_tasks_in_threads_keep_their_own_profiles(self, _):
+        barrier = threading.Barrier(2, timeout=5)
+        profiles = {}
+
+        def run(phase):
+            task = mock.Mock()
+            task.name = f'posts.tasks.{phase}'
+            task_profiling.start_task_profile(task_id=phase, task=task)
+            barrier.wait()
+            with task_profiling.task_phase(phase):
+                barrier.wait()
+                profiles[phase] = task_profiling._active.get()
+            barrier.wait()
+            task_profiling.finish_task_profile()
+
+        threads = [threading.Thread(target=run, args=(phase,)) for phase in ('token_refresh', 'serialization')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for phase, profile in profiles.items():
+            self.assertEqual(profile.task_id, phase)
+            self.assertEqual(set(profile.phases), {phase, 'other'})
+        self.assertIsNone(task_profiling._active.get())
+
+
+class FakeMetricsRedis:
+    """Just enough of a Redis client for posts.metrics: pipelined HINCRBYFLOAT and HGETALL"""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def hincrbyfloat(self, key, field, amount):
+        values = self.hashes[key]
+        values[field.encode()] = values.get(field.encode(), 0.0) + amount
+
+    def execute(self):
+        return []
+
+    def hgetall(self, key):
+        return {field: repr(value).encode() for field, value in self.hashes[key].items()}
+
+
+class MetricsEndpointTests(TestCase):
+    """/metrics/ after observations are flushed"""
+
+    def setUp(self):
+        self.redis = FakeMetricsRedis()
+        for patcher in (
+            mock.patch.object(metrics, 'get_redis', return_value=self.redis),
+            mock.patch.object(metrics, '_pending', defaultdict(float)),
+            mock.patch.object(metrics, '_retry_at', 0.0),
+            mock.patch('core.views.redis.Redis.from_url', return_value=mock.Mock(llen=mock.Mock(return_value=4))),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def scrape(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode().splitlines()
+
+    def test_flushed_observations_are_exposed(self):
+        user = User.objects.create_user('scraped', 'scraped@example.com', 'pw-scraped-123')
+        Post.objects.create(user=user, platform='twitter', content='due', scheduled_time=timezone.now() - timedelta(minutes=1))
+        for lag in (3, 40):
+            metrics.publish_outcomes.inc(platform='twitter', outcome='posted', error_class='none')
+            metrics.schedule_lag.observe(lag, platform='twitter')
+            metrics.flush()
+        # Worker processes accumulate into the same Redis hashes
+        self.assertEqual(self.redis.hashes['metrics:autopost_publish_schedule_lag_seconds_count'], {b'platform="twitter"': 2.0})
+
+        lines = self.scrape()
+        for expected in (
+            '# TYPE autopost_publish_outcomes_total counter',
+            'autopost_publish_outcomes_total{error_class="none",outcome="posted",platform="twitter"} 2',
+            '# TYPE autopost_publish_schedule_lag_seconds histogram',
+            'autopost_publish_schedule_lag_seconds_bucket{platform="twitter",le="5"} 1',
+            'autopost_publish_schedule_lag_seconds_bucket{platform="twitter",le="60"} 2',
+            'autopost_publish_schedule_lag_seconds_bucket{platform="twitter",le="+Inf"} 2',
+            'autopost_publish_schedule_lag_seconds_sum{platform="twitter"} 43',
+            'autopost_queue_depth{priority="0",queue="publish.twitter"} 4',
+            'autopost_due_unclaimed_posts{platform="twitter"} 1',
+            'autopost_due_unclaimed_posts{platform="linkedin"} 0',
+        ):
+            self.assertIn(expected, lines)
+        self.assertNotIn('autopost_publish_schedule_lag_seconds_bucket{platform="twitter",le="1"} 1', lines)
+
+    def test_unavailable_stores_are_reported_in_comments(self):
+        metrics.get_redis.side_effect = ConnectionError('refused')
+        with mock.patch('core.views.redis.Redis.from_url', side_effect=ConnectionError('refused')):
+            lines = self.scrape()
+        self.assertIn('# metrics store unavailable: refused', lines)
+        self.assertIn('# broker unavailable: refused', lines)
+        self.assertIn('autopost_due_unclaimed_posts{platform="twitter"} 0', lines)
+
+
+@override_settings(REQUEST_PROFILER_ENABLED=True, REQUEST_PROFILER_SAMPLE_RATE=1, REQUEST_PROFILER_DUPLICATE_THRESHOLD=3)
+class RequestProfilerTests(QueryBudgetMixin, TestCase):
+    """Sampled request profiling: QueryProfilerMiddleware and ProfiledSerializerMixin"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('profiled', 'profiled@example.com', 'pw-profiled-123')
+        self.post = Post.objects.create(user=self.user, platform='twitter', content='hi', scheduled_time=timezone.now())
+
+    def profile(self, view):
+        return profiling.QueryProfilerMiddleware(view)(RequestFactory().get('/profiled/'))
+
+    def test_sampled_request_gets_server_timing(self):
+        response = self.make_client(self.user).get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    def test_serializer_time_is_added_to_the_profile(self):
+        profiles = []
+
+        def view(request):
+            PostSerializer(self.post).data
+            profiles.append(profiling._current.get())
+            return HttpResponse()
+
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.profile(view)
+        profile, = profiles
+        self.assertGreater(profile.serializer_time, 0)
+        self.assertIn('GET /profiled/ 200', logs.output[0])
+        # Outside a profiled request the mixin is a plain passthrough
+        self.assertIsNone(profiling._current.get())
+        self.assertEqual(PostSerializer(self.post).data['id'], self.post.id)
+
+    def test_repeated_queries_are_flagged(self):
+        def view(request):
+            for _ in range(3):
+                Post.objects.filter(id=self.post.id).exists()
+            return HttpResponse()
+
+        with self.assertLogs('core.profiling', 'WARNING') as logs:
+            response = self.profile(view)
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        self.assertIn('possible N+1: 3x SELECT', logs.output[0])
+
+    def test_unsampled_requests_are_left_alone(self):
+        with self.settings(REQUEST_PROFILER_SAMPLE_RATE=0):
+            response = self.profile(lambda request: HttpResponse())
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_disabled_profiler_is_left_out_of_the_stack(self):
+        with self.settings(REQUEST_PROFILER_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.QueryProfilerMiddleware(lambda request: HttpResponse())
+            response = self.make_client(self.user).get('/api/posts/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+@override_settings(TRACING_EXPORTER='stdout')
+class TracingTests(QueryBudgetMixin, TestCase):
+    """One trace from the create request through the publish task to the platform call"""
+
+    INCOMING = '00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('traced', 'traced@example.com', 'pw-traced-123')
+        SocialAccount.objects.create(user=self.user, platform='twitter', access_token='token')
+        self.spans = []
+        patcher = mock.patch.object(tracing, 'export', side_effect=self.spans.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch('posts.social_integrations.requests.request', return_value=mock.Mock(
+        status_code=201, json=mock.Mock(return_value={'data': {'id': '777'}}),
+    ))
+    @mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+    def test_traceparent_follows_the_post_to_the_platform(self, apply_async, request):
+        trace_id = tracing.parse_traceparent(self.INCOMING)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.make_client(self.user).post('/api/posts/', {
+                'platform': 'twitter', 'content': 'traced', 'scheduled_time': (timezone.now() + timedelta(minutes=1)).isoformat(),
+            }, format='json', HTTP_TRACEPARENT=self.INCOMING)
+        self.assertEqual(response.status_code, 201, response.data)
+
+        # The post keeps the trace for later dispatches; the task header carries the dispatch span
+        post = Post.objects.get()
+        header = apply_async.call_args.kwargs['headers']['traceparent']
+        self.assertEqual(tracing.parse_traceparent(post.traceparent)[0], trace_id)
+        self.assertEqual(tracing.parse_traceparent(header)[0], trace_id)
+
+        publish_post.apply(args=(post.id,), headers={'traceparent': header})
+        post.refresh_from_db()
+        self.assertEqual(post.status, 'posted')
+        outbound = request.call_args.kwargs['headers']['traceparent']
+
+        spans = {span.name: span for span in self.spans}
+        create, dispatch = spans['PostViewSet.perform_create'], spans['dispatch publish_post']
+        task, call = spans['posts.tasks.publish_post'], spans['POST twitter']
+        self.assertEqual({span.trace_id for span in self.spans}, {trace_id})
+        self.assertEqual(create.parent_id, '00f067aa0ba902b7')
+        self.assertEqual(dispatch.parent_id, create.span_id)
+        self.assertEqual(header, dispatch.traceparent)
+        self.assertEqual(task.parent_id, dispatch.span_id)
+        self.assertEqual(call.parent_id, task.span_id)
+        self.assertEqual(outbound, call.traceparent)
+        self.assertEqual(call.attributes['status_code'], 201)
+
+
+@override_settings(RECURRENCE_HORIZON_SECONDS=3 * 86400 - 60)
+@mock.patch('posts.tasks.publish_post.apply_async', return_value=mock.Mock(id='task-id'))
+class RecurrenceTests(QueryBudgetMixin, TestCase):
+    """Recurring posts only exist as rows inside the materialization horizon"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('recurring', 'recurring@example.com', 'pw-recurring-123')
+        SocialAccount.objects.create(user=self.user, platform='twitter', access_token='token')
+        self.client = self.make_client(self.user)
+        self.start = (timezone.now() + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+
+    def create(self, rrule='FREQ=DAILY', **fields):
+        return self.client.post('/api/recurrences/', format='json', data={
+            'platform': 'twitter',
+            'content': 'daily tip',
+            'rrule': rrule,
+            'dtstart': self.start.isoformat(),
+            **fields,
+        })
+
+    def test_only_occurrences_inside_the_horizon_are_created(self, apply_async):
+        response = self.create()
+        self.assertEqual(response.status_code, 201, response.data)
+        rule = RecurrenceRule.objects.get()
+        times = list(rule.posts.order_by('scheduled_time').values_list('scheduled_time', flat=True))
+        self.assertEqual(times, [self.start + timedelta(days=day) for day in range(3)])
+        self.assertEqual(apply_async.call_count, 3)
+        self.assertEqual(rule.next_occurrence, self.start + timedelta(days=3))
+        self.assertEqual(response.data['upcoming'][0], self.start.isoformat())
+
+        # Nothing new is due until the horizon moves on
+        self.assertEqual(materialize_recurring_posts(), 0)
+        with override_settings(RECURRENCE_HORIZON_SECONDS=5 * 86400 - 60):
+            self.assertEqual(materialize_recurring_posts(), 2)
+            self.assertEqual(materialize_recurring_posts(), 0)
+        self.assertEqual(rule.posts.count(), 5)
+
+    @override_settings(RECURRENCE_MAX_PER_RULE=5)
+    def test_posts_per_rule_are_capped_per_run(self, apply_async):
+        self.create('FREQ=HOURLY')
+        rule = RecurrenceRule.objects.get()
+        self.assertEqual(rule.posts.count(), 5)
+        self.assertEqual(rule.next_occurrence, self.start + timedelta(hours=5))
+        self.assertEqual(materialize_recurring_posts(), 5)
+
+    @mock.patch('celery.app.control.Control.revoke')
+    def test_edit_replaces_pending_posts_and_keeps_history(self, revoke, apply_async):
+        rule_id = self.create().data['id']
+        first = Post.objects.filter(recurrence_id=rule_id).earliest('scheduled_time')
+        Post.objects.filter(id=first.id).update(status='posted')
+
+        response = self.client.patch(f'/api/recurrences/{rule_id}/', {'content': 'better tip'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        contents = list(Post.objects.filter(recurrence_id=rule_id).order_by('scheduled_time').values_list('content', 'status'))
+        self.assertEqual(contents, [('daily tip', 'posted'), ('better tip', 'pending'), ('better tip', 'pending')])
+
+        self.client.patch(f'/api/recurrences/{rule_id}/', {'is_active': False}, format='json')
+        self.assertEqual(Post.objects.filter(recurrence_id=rule_id).count(), 1)
+        self.assertIsNone(RecurrenceRule.objects.get().next_occurrence)
+
+        self.client.delete(f'/api/recurrences/{rule_id}/')
+        self.assertEqual(list(Post.objects.values_list('recurrence', 'status')), [(None, 'posted')])
+        self.assertEqual(revoke.call_count, 4)
+
+    def test_invalid_rules_are_rejected(self, apply_async):
+        cases = [
+            {'rrule': 'FREQ=MINUTELY'},
+            {'rrule': 'FREQ=SOMETIMES'},
+            {'rrule': 'FREQ=DAILY', 'timezone': 'Mars/Olympus'},
+            {'rrule': 'FREQ=DAILY', 'content': 'x' * 281},
+        ]
+        for fields in cases:
+            with self.subTest(**fields):
+                self.assertEqual(self.create(**fields).status_code, 400)
+        self.assertFalse(RecurrenceRule.objects.exists())
+
+    def test_wall_clock_time_survives_dst(self, apply_async):
+        berlin = recurrence.ZoneInfo('Europe/Berlin')
+        rule = RecurrenceRule(
+            rrule='FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0;BYSECOND=0', timezone='Europe/Berlin',
+            dtstart=datetime(2027, 3, 1, tzinfo=berlin),
+        )
+        mondays = recurrence.upcoming(rule, after=datetime(2027, 3, 20, tzinfo=berlin), count=2)
+        self.assertEqual([monday.utcoffset() for monday in mondays], [timedelta(hours=1), timedelta(hours=2)])
+        self.assertEqual({monday.hour for monday in mondays}, {9})
+
+
+class EventStreamTests(TestCase):
+    """Post status changes pushed over /api/events/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('watcher', 'watcher@example.com', 'pw-watcher-123')
+        SocialAccount.objects.create(user=self.user, platform='twitter', access_token='token')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    @mock.patch('posts.events.publish')
+    def test_publish_post_sends_the_final_status(self, publish):
+        post = Post.objects.create(user=self.user, platform='twitter', content='x' * 300, scheduled_time=timezone.now())
+        publish_post.apply(args=(post.id,))
+        (user_id, event_type, data), _ = publish.call_args
+        self.assertEqual((user_id, event_type), (self.user.id, 'post.status'))
+        self.assertEqual((data['id'], data['status']), (post.id, 'failed'))
+
+    @mock.patch.object(events.EventHub, '_listen', mock.AsyncMock())
+    async def test_stream_delivers_the_users_events(self):
+        response = await AsyncClient().get(f'/api/events/?token={self.token}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = response.streaming_content
+        self.assertTrue((await anext(frames)).startswith(b'retry:'))
+        self.assertIn(b'event: ready', await anext(frames))
+
+        hub = events.get_hub()
+        hub.dispatch(self.user.id + 1, '{"type": "post.status", "data": {"id": 99}}')
+        hub.dispatch(self.user.id, '{"type": "post.status", "data": {"id": 1, "status": "posted"}}')
+        self.assertEqual(await anext(frames), b'event: post.status\ndata: {"id": 1, "status": "posted"}\n\n')
+
+        # A client disconnect cancels the stream while it waits for the next event
+        waiting = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(dict(hub.subscribers), {})
+
+    @mock.patch.object(events.EventHub, '_listen', mock.AsyncMock())
+    async def test_slow_client_is_told_to_resync(self):
+        hub = events.get_hub()
+        with override_settings(EVENTS_QUEUE_SIZE=2):
+            queue = hub.subscribe(self.user.id)
+        for index in range(3):
+            hub.dispatch(self.user.id, f'{{"type": "post.status", "data": {{"id": {index}}}}}')
+        self.assertIs(await queue.get(), events.OVERFLOW)
+        hub.unsubscribe(self.user.id, queue)
+
+    @mock.patch('posts.events.aioredis.Redis.from_url')
+    async def test_lost_subscription_closes_its_client(self, from_url):
+        clients = [mock.Mock(aclose=mock.AsyncMock()) for _ in range(2)]
+        for client in clients:
+            client.pubsub.return_value = mock.Mock(
+                psubscribe=mock.AsyncMock(side_effect=ConnectionError('gone')), aclose=mock.AsyncMock(),
+            )
+        from_url.side_effect = clients
+        hub = events.EventHub()
+        hub.subscribers[self.user.id].add(asyncio.Queue())
+
+        async def sleep(seconds):
+            # Give up after the second connection attempt
+            if from_url.call_count == len(clients):
+                hub.subscribers.clear()
+
+        with mock.patch('posts.events.asyncio.sleep', sleep):
+            await hub._listen()
+        for client in clients:
+            client.pubsub.return_value.aclose.assert_awaited_once()
+            client.aclose.assert_awaited_once()
+
+    async def test_requires_a_valid_token(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get('/api/events/')).status_code, 401)
+        self.assertEqual((await client.get('/api/events/?token=not-a-jwt')).status_code, 401)
+
+
+def tweets_lookup(method, url, params=None, **kwargs):
+    """Fake GET /2/tweets answering for every requested id but the ones ending in 9"""
+    data = [
+        {'id': tweet_id, 'public_metrics': {'like_count': 5, 'reply_count': 2, 'retweet_count': 1, 'quote_count': 1, 'impression_count': 100}}
+        for tweet_id in params['ids'].split(',') if not tweet_id.endswith('9')
+    ]
+    return mock.Mock(status_code=200, json=mock.Mock(return_value={'data': data}))
+
+
+@override_settings(ENGAGEMENT_QUOTA={'twitter': 10})
+class EngagementTests(QueryBudgetMixin, TestCase):
+    """Batched engagement ingestion for published posts"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('analyst', 'analyst@example.com', 'pw-analyst-123')
+        self.account = SocialAccount.objects.create(user=self.user, platform='twitter', access_token='token')
+        self.client = self.make_client(self.user)
+
+    def publish(self, count, **fields):
+        fields.setdefault('scheduled_time', timezone.now() - timedelta(hours=1))
+        Post.objects.bulk_create([
+            Post(user=self.user, platform='twitter', content='hi', status='posted', external_post_id=f'1{index:04d}', **fields)
+            for index in range(count)
+        ])
+        return list(Post.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+
+    def test_plan_groups_due_posts_by_account(self):
+        post_ids = self.publish(3)
+        self.publish(2, scheduled_time=timezone.now() - timedelta(days=30))
+        Post.objects.create(user=self.user, platform='twitter', content='hi', scheduled_time=timezone.now() + timedelta(hours=1))
+        Post.objects.filter(id=post_ids[0]).update(engagement_updated_at=timezone.now())
+        with self.assertNumQueries(2):
+            planned = engagement.plan()
+        self.assertEqual(planned, {self.account.id: post_ids[1:3]})
+
+    @mock.patch('posts.social_integrations.requests.request', side_effect=tweets_lookup)
+    def test_cost_grows_with_batches_not_posts(self, request):
+        post_ids = self.publish(230)
+        # posts lookup, then a snapshot insert and a post update per batch of 100
+        with self.assertNumQueries(1 + 2 * 3):
+            stored = engagement.collect_account(self.account, post_ids)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(stored, 230 - 23)
+        snapshot = EngagementSnapshot.objects.first()
+        self.assertEqual(
+            (snapshot.likes, snapshot.comments, snapshot.shares, snapshot.impressions), (5, 2, 2, 100)
+        )
+        self.assertFalse(Post.objects.filter(engagement_updated_at__isnull=True).exists())
+        self.assertEqual(engagement.plan(), {})
+
+    @mock.patch('posts.social_integrations.requests.request', side_effect=tweets_lookup)
+    def test_changed_counts_show_up_in_the_changes_feed(self, request):
+        changed, missing = self.publish(2)
+        Post.objects.filter(id=missing).update(external_post_id='19')
+        Post.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        before = dict(Post.objects.values_list('id', 'updated_at'))
+
+        engagement.collect_account(self.account, [changed, missing])
+        after = dict(Post.objects.values_list('id', 'updated_at'))
+        self.assertGreater(after[changed], before[changed])
+        self.assertEqual(after[missing], before[missing])
+
+        # Collecting the same counts again isn't a change
+        engagement.collect_account(self.account, [changed])
+        self.assertEqual(Post.objects.get(id=changed).updated_at, after[changed])
+
+    @override_settings(ENGAGEMENT_QUOTA={'twitter': 2})
+    @mock.patch('posts.social_integrations.requests.request', side_effect=tweets_lookup)
+    def test_quota_carries_posts_over(self, request):
+        post_ids = self.publish(250)
+        engagement.collect_account(self.account, post_ids)
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(len(engagement.plan()[self.account.id]), 50)
+
+    @mock.patch('posts.social_integrations.requests.request')
+    def test_rate_limit_stops_the_account(self, request):
+        request.return_value = mock.Mock(status_code=429, text='Too Many Requests')
+        post_ids = self.publish(150)
+        self.assertEqual(engagement.collect_account(self.account, post_ids), 0)
+        self.assertEqual(request.call_count, 1)
+        self.assertFalse(engagement.take_quota(self.account))
+
+    @mock.patch('posts.social_integrations.requests.request', side_effect=tweets_lookup)
+    def test_series_endpoint(self, request):
+        post_ids = self.publish(1)
+        engagement.collect_account(self.account, post_ids)
+        Post.objects.update(engagement_updated_at=None)
+        engagement.collect_account(self.account, post_ids)
+        response = self.client.get(f'/api/posts/{post_ids[0]}/engagement/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 2)
+        self.assertEqual(response.data['engagement']['likes'], 5)
+
+
+@override_settings(ROLLUP_SETTLE_SECONDS=0, ROLLUP_BATCH=4)
+class AnalyticsTests(QueryBudgetMixin, TestCase):
+    """Incremental rollups and /api/posts/analytics/"""
+
+    # auth + rollup rows
+    BUDGET = 2
+
+    def setUp(self):
+        self.user = User.objects.create_user('analytics', 'analytics@example.com', 'pw-analytics-123')
+        self.client = self.make_client(self.user)
+        self.day = datetime(2026, 3, 10, 9, 30, tzinfo=dt_timezone.utc)
+
+    def post(self, platform='twitter', **fields):
+        fields.setdefault('scheduled_time', self.day)
+        return Post.objects.create(user=self.user, platform=platform, content='hi', **fields)
+
+    def outcome(self, status, at, lag=None, platform='twitter'):
+        post = self.post(platform=platform, scheduled_time=at - timedelta(seconds=lag or 0))
+        analytics.record_outcomes([post], status, now=at)
+        return post
+
+    def rollup(self, granularity, start, platform='twitter'):
+        return PostRollup.objects.get(user=self.user, platform=platform, granularity=granularity, bucket_start=start)
+
+    def test_rollups_advance_from_the_high_water_mark(self):
+        for minutes in range(6):
+            self.outcome('posted', self.day + timedelta(minutes=minutes), lag=10)
+        self.outcome('failed', self.day + timedelta(hours=2))
+        self.assertEqual(analytics.update_rollups(), {'outcomes': 7, 'engagement': 0})
+        self.assertEqual(analytics.update_rollups(), {'outcomes': 0, 'engagement': 0})
+
+        hour = self.rollup('hour', self.day.replace(minute=0))
+        self.assertEqual((hour.posted, hour.failed, hour.lag_sum), (6, 0, 60))
+        day = self.rollup('day', self.day.replace(hour=0, minute=0))
+        self.assertEqual((day.posted, day.failed), (6, 1))
+
+        # Only the new row is read and added
+        self.outcome('posted', self.day + timedelta(minutes=20), lag=4000)
+        analytics.update_rollups()
+        hour.refresh_from_db()
+        self.assertEqual(hour.posted, 7)
+        self.assertEqual(hour.lag_histogram[-1], 1)
+        self.assertEqual(PublishOutcome.objects.count(), 8)
+
+    def test_young_rows_wait_for_the_settle_window(self):
+        self.outcome('posted', timezone.now())
+        with self.settings(ROLLUP_SETTLE_SECONDS=60):
+            self.assertEqual(analytics.update_rollups()['outcomes'], 0)
+        self.assertEqual(analytics.update_rollups()['outcomes'], 1)
+
+    def test_engagement_is_rolled_up_as_gains(self):
+        post = self.post(status='posted')
+        EngagementSnapshot.objects.create(post=post, collected_at=self.day, likes=10, comments=1)
+        analytics.update_rollups()
+        EngagementSnapshot.objects.create(post=post, collected_at=self.day + timedelta(hours=1), likes=15, comments=None)
+        analytics.update_rollups()
+        first, second = (self.rollup('hour', self.day.replace(minute=0) + timedelta(hours=h)) for h in (0, 1))
+        self.assertEqual((first.likes, first.comments, second.likes, second.comments), (10, 1, 5, 0))
+        self.assertEqual(self.rollup('day', self.day.replace(hour=0, minute=0)).likes, 15)
+
+    def test_both_sources_add_to_the_same_rollup(self):
+        post = self.outcome('posted', self.day, lag=10)
+        EngagementSnapshot.objects.create(post=post, collected_at=self.day, likes=7)
+        self.outcome('failed', self.day + timedelta(minutes=1))
+        analytics.update_rollups()
+        EngagementSnapshot.objects.create(post=post, collected_at=self.day + timedelta(minutes=2), likes=9)
+        self.outcome('posted', self.day + timedelta(minutes=3), lag=10)
+        analytics.update_rollups()
+        hour = self.rollup('hour', self.day.replace(minute=0))
+        self.assertEqual((hour.posted, hour.failed, hour.likes, hour.lag_sum), (2, 1, 9, 20))
+
+    def test_overlapping_runs_do_not_lose_increments(self):
+        for minutes in range(3):
+            self.outcome('posted', self.day + timedelta(minutes=minutes), lag=10)
+        EngagementSnapshot.objects.create(post=Post.objects.first(), collected_at=self.day, likes=5)
+        apply_deltas = analytics.apply_deltas
+        overlapping = []
+
+        def apply_then_overlap(deltas):
+            # A second run starting while the first is mid-fold
+            apply_deltas(deltas)
+            overlapping.append(analytics.update_rollups())
+
+        with mock.patch.object(analytics, 'apply_deltas', side_effect=apply_then_overlap):
+            self.assertEqual(analytics.update_rollups(), {'outcomes': 3, 'engagement': 1})
+        self.assertEqual(overlapping, [{}, {}])
+        hour = self.rollup('hour', self.day.replace(minute=0))
+        self.assertEqual((hour.posted, hour.likes, hour.lag_sum), (3, 5, 30))
+        # The lock is released once the run is done
+        self.assertEqual(analytics.update_rollups(), {'outcomes': 0, 'engagement': 0})
+
+    def test_cancel_is_recorded(self):
+        post = self.post(scheduled_time=timezone.now() + timedelta(hours=1))
+        with mock.patch('celery.app.control.Control.revoke'):
+            self.client.post(f'/api/posts/{post.id}/cancel/')
+        self.assertEqual(PublishOutcome.objects.get().status, 'cancelled')
+
+    @override_settings(PUBLISH_LATENESS_POLICY='stale')
+    def test_late_posts_marked_in_bulk_are_recorded(self):
+        late = self.post(scheduled_time=timezone.now() - timedelta(days=2))
+        self.assertEqual(reconcile_overdue_posts()['stale'], 1)
+        outcome = PublishOutcome.objects.get()
+        self.assertEqual((outcome.post_id, outcome.status), (late.id, 'stale'))
+
+    def test_year_long_range_reads_only_rollups(self):
+        url = '/api/posts/analytics/?start=2025-10-01&end=2026-10-01&granularity=day'
+        counts = []
+        for count in DATASET_SIZES:
+            for index in range(count):
+                at = self.day + timedelta(days=index % 30, minutes=index)
+                self.outcome('posted', at, lag=index, platform=('twitter', 'linkedin')[index % 2])
+            with self.settings(ROLLUP_BATCH=1000):
+                analytics.update_rollups()
+            counts.append(self.assertQueryBudget(self.BUDGET, self.client, 'get', url))
+        self.assertEqual(len(set(counts)), 1)
+
+        data = self.client.get(url).data
+        total = sum(DATASET_SIZES)
+        self.assertEqual(data['totals']['posted'], total)
+        self.assertEqual(sum(platform['posted'] for platform in data['by_platform'].values()), total)
+        self.assertEqual(sum(bucket['posted'] for bucket in data['buckets']), total)
+        lag = data['totals']['publish_lag']
+        self.assertEqual(lag['count'], total)
+        self.assertLessEqual(lag['p50'], lag['p90'])
+        self.assertLessEqual(lag['p90'], 60)
+
+    def test_lag_percentile_interpolates_within_buckets(self):
+        histogram = [0] * (len(analytics.LAG_BUCKETS) + 1)
+        histogram[analytics.lag_bucket(3)] = 10
+        self.assertEqual(analytics.lag_percentile(histogram, 50), 3.0)
+        self.assertIsNone(analytics.lag_percentile([0] * len(histogram), 50))
+
+    def test_invalid_parameters(self):
+        for query in (
+            'start=2026-10-01&end=2026-09-01',
+            'start=2025-01-01&end=2026-10-01',
+            'start=2026-09-01&end=2026-10-15&granularity=hour',
+            'start=2026-09-01&end=2026-10-01&granularity=week',
+        ):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f'/api/posts/analytics/?{query}').status_code, 400)
+
+
+@override_settings(WEBHOOK_BATCH_SIZE=50, WEBHOOK_MAX_CONCURRENCY=2, OUTBOUND_ALLOWED_HOSTS=['hooks.example.com', 'example.com'])
+@mock.patch('posts.tasks.deliver_webhook.apply_async')
+class WebhookTests(QueryBudgetMixin, TestCase):
+    """Batched outbound webhook delivery"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('integrator', 'integrator@example.com', 'pw-integrator-123')
+        SocialAccount.objects.create(user=self.user, platform='twitter', access_token='token')
+        self.webhook = Webhook.objects.create(user=self.user, url='https://hooks.example.com/posts', secret='s3cret')
+        self.client = self.make_client(self.user)
+
+    def add_post(self, **fields):
+        fields.setdefault('scheduled_time', timezone.now() + timedelta(hours=1))
+        return Post.objects.create(user=self.user, platform='twitter', content='hello', **fields)
+
+    def session(self, status_code=200):
+        session = mock.Mock()
+        session.post.return_value = mock.Mock(status_code=status_code, text='')
+        return mock.patch.object(webhooks, 'get_session', return_value=session), session
+
+    def test_status_changes_queue_one_task_per_endpoint(self, deliver):
+        Webhook.objects.create(user=self.user, url='https://other.example.com/', secret='x', events=['post.failed'])
+        posts = [self.add_post() for _ in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in posts:
+                webhooks.enqueue_post_events([post], 'posted')
+        self.assertEqual(WebhookDelivery.objects.count(), 3)
+        self.assertEqual(set(WebhookDelivery.objects.values_list('webhook_id', flat=True)), {self.webhook.id})
+        # A burst of events is one task, not one per event
+        self.assertEqual(deliver.call_count, 1)
+        self.assertEqual(deliver.call_args.kwargs['queue'], 'webhooks')
+
+    def test_cancel_queues_an_event(self, deliver):
+        post = self.add_post()
+        with mock.patch('celery.app.control.Control.revoke'), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{post.id}/cancel/')
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual((delivery.event, delivery.payload['id']), ('post.cancelled', post.id))
+
+    def test_events_are_sent_in_signed_batches(self, deliver):
+        post = self.add_post()
+        for _ in range(120):
+            webhooks.enqueue_post_events([post], 'posted')
+        patcher, session = self.session()
+        with patcher:
+            self.assertEqual(webhooks.deliver(self.webhook.id), 120)
+        self.assertEqual(session.post.call_count, 3)
+        sizes = []
+        for call in session.post.call_args_list:
+            body, headers = call.kwargs['data'], call.kwargs['headers']
+            sizes.append(len(json.loads(body)['events']))
+            self.assertEqual(headers['X-Webhook-Signature'], webhooks.sign('s3cret', headers['X-Webhook-Timestamp'], body))
+        self.assertEqual(sizes, [50, 50, 20])
+        self.assertFalse(WebhookDelivery.objects.exclude(status='delivered').exists())
+
+    def test_failed_batches_back_off(self, deliver):
+        webhooks.enqueue_post_events([self.add_post()], 'failed')
+        patcher, session = self.session(status_code=503)
+        with patcher:
+            self.assertEqual(webhooks.deliver(self.webhook.id), 0)
+            # Not due yet, so nothing is sent again
+            webhooks.deliver(self.webhook.id)
+        self.assertEqual(session.post.call_count, 1)
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), ('pending', 1))
+        self.assertGreater(delivery.next_attempt_at, timezone.now())
+        self.assertIn('HTTP 503', delivery.last_error)
+        self.assertGreater(deliver.call_args.kwargs['countdown'], 0)
+
+        WebhookDelivery.objects.update(attempts=9, next_attempt_at=timezone.now())
+        with patcher:
+            webhooks.deliver(self.webhook.id)
+        self.assertEqual(WebhookDelivery.objects.get().status, 'failed')
+
+    def test_events_wait_behind_a_failed_batch(self, deliver):
+        webhooks.enqueue_post_events([self.add_post()], 'failed')
+        failing, _ = self.session(status_code=503)
+        with failing:
+            webhooks.deliver(self.webhook.id)
+        webhooks.enqueue_post_events([self.add_post()], 'posted')
+        patcher, session = self.session()
+        with patcher:
+            self.assertEqual(webhooks.deliver(self.webhook.id), 0)
+            session.post.assert_not_called()
+
+            WebhookDelivery.objects.filter(status='pending', attempts=1).update(next_attempt_at=timezone.now())
+            self.assertEqual(webhooks.deliver(self.webhook.id), 2)
+        events = json.loads(session.post.call_args.kwargs['data'])['events']
+        self.assertEqual([event['type'] for event in events], ['post.failed', 'post.posted'])
+
+    def test_busy_destination_is_retried_later(self, deliver):
+        webhooks.enqueue_post_events([self.add_post()], 'posted')
+        self.assertTrue(webhooks.acquire_host_slot('https://hooks.example.com/a'))
+        self.assertTrue(webhooks.acquire_host_slot('https://hooks.example.com/b'))
+        patcher, session = self.session()
+        with patcher:
+            self.assertEqual(webhooks.deliver(self.webhook.id), 0)
+        session.post.assert_not_called()
+        self.assertEqual(deliver.call_args.kwargs['countdown'], 2)
+
+    def test_create_generates_a_secret(self, deliver):
+        response = self.client.post('/api/webhooks/', {'url': 'https://example.com/hook', 'events': ['post.posted']}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['secret']), 64)
+        for payload in ({'url': 'http://example.com/hook'}, {'url': 'https://example.com/hook', 'events': ['post.liked']}):
+            self.assertEqual(self.client.post('/api/webhooks/', payload, format='json').status_code, 400)
+
+    def test_private_addresses_are_refused(self, deliver):
+        for url in ('https://localhost/hook', 'https://10.1.2.3/hook', 'https://169.254.169.254/latest/', 'https://[::1]/hook'):
+            with self.subTest(url):
+                response = self.client.post('/api/webhooks/', {'url': url}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('public address', str(response.data['url']))
+
+        # An endpoint that resolves to a private address by now isn't called
+        Webhook.objects.filter(id=self.webhook.id).update(url='https://127.0.0.1/posts')
+        webhooks.enqueue_post_events([self.add_post()], 'posted')
+        patcher, session = self.session()
+        with patcher:
+            webhooks.deliver(self.webhook.id)
+        session.post.assert_not_called()
+        self.assertIn('non-public address', WebhookDelivery.objects.get().last_error)
+
+    def test_redirects_are_not_followed(self, deliver):
+        webhooks.enqueue_post_events([self.add_post()], 'posted')
+        patcher, session = self.session(status_code=302)
+        with patcher:
+            self.assertEqual(webhooks.deliver(self.webhook.id), 0)
+        self.assertIs(session.post.call_args.kwargs['allow_redirects'], False)
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.status, 'pending')
+        self.assertIn('HTTP 302', delivery.last_error)
+
+
+class SocialAccountQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query budgets for every SocialAccountViewSet action"""
+
+    # auth + count + page
+    LIST_BUDGET = 3
+    # auth + object
+    RETRIEVE_BUDGET = 2
+    # auth + update_or_create (lookup and insert, each wrapped in a savepoint)
+    CREATE_BUDGET = 7
+    # auth + object + update
+    UPDATE_BUDGET = 3
+    # auth + object + uploaded media cascade + delete
+    DESTROY_BUDGET = 4
+    # auth + object + update
+    DISCONNECT_BUDGET = 3
+    # auth + all accounts in one query
+    STATUS_BUDGET = 2
+
+    def setUp(self):
+        self.user = User.objects.create_user('budget', 'budget@example.com', 'pw-budget-123')
+        self.client = self.make_client(self.user)
+
+    def connect(self, *platforms):
+        return [
+            SocialAccount.objects.create(user=self.user, platform=platform, access_token='token')
+            for platform in platforms
+        ]
+
+    def test_list_and_status_constant(self):
+        platforms = [code for code, _ in SocialAccount.PLATFORM_CHOICES]
+        list_counts, status_counts = [], []
+        for platform in platforms:
+            self.connect(platform)
+            list_counts.append(self.assertQueryBudget(self.LIST_BUDGET, self.client, 'get', '/api/social-accounts/'))
+            status_counts.append(
+                self.assertQueryBudget(self.STATUS_BUDGET, self.client, 'get', '/api/social-accounts/status/')
+            )
+        self.assertEqual(len(set(list_counts)), 1, list_counts)
+        self.assertEqual(len(set(status_counts)), 1, status_counts)
+
+    def test_retrieve(self):
+        account, = self.connect('twitter')
+        self.assertQueryBudget(self.RETRIEVE_BUDGET, self.client, 'get', f'/api/social-accounts/{account.id}/')
+
+    def test_create(self):
+        self.assertQueryBudget(self.CREATE_BUDGET, self.client, 'post', '/api/social-accounts/', format='json', data={
+            'platform': 'twitter',
+            'access_token': 'token',
+        })
+
+    def test_update(self):
+        account, = self.connect('twitter')
+        self.assertQueryBudget(
+            self.UPDATE_BUDGET, self.client, 'put', f'/api/social-accounts/{account.id}/', format='json',
+            data={'platform': 'twitter', 'access_token': 'new-token'},
+        )
+
+    def test_partial_update(self):
+        account, = self.connect('twitter')
+        self.assertQueryBudget(
+            self.UPDATE_BUDGET, self.client, 'patch', f'/api/social-accounts/{account.id}/', format='json',
+            data={'platform_username': 'renamed'},
+        )
+
+    def test_destroy(self):
+        account, = self.connect('twitter')
+        self.assertQueryBudget(self.DESTROY_BUDGET, self.client, 'delete', f'/api/social-accounts/{account.id}/')
+
+    def test_disconnect(self):
+        account, = self.connect('twitter')
+        self.assertQueryBudget(
+            self.DISCONNECT_BUDGET, self.client, 'post', f'/api/social-accounts/{account.id}/disconnect/'
+        )
+
+
+def make_image(size, format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class MediaPrefetchTests(TestCase):
+    """Ahead-of-time media fetch and validation against a local media host"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(MEDIA_CACHE_DIR=self.cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        self.server = self.enterContext(fake_platform_apis())
+        self.user = User.objects.create_user('media', 'media@example.com', 'pw-media-123')
+
+    def post(self, url, platform='instagram', minutes=30):
+        return Post.objects.create(
+            user=self.user, platform=platform, content='with media', media_url=url,
+            scheduled_time=timezone.now() + timedelta(minutes=minutes),
+        )
+
+    def test_valid_image_is_cached_by_content_hash(self):
+        body = make_image((1080, 1080))
+        first = self.post(self.server.add_media('square.jpg', body))
+        second = self.post(self.server.add_media('copy.jpg', body), platform='twitter')
+
+        self.assertTrue(media.prepare_post_media(first))
+        self.assertTrue(media.prepare_post_media(second))
+        first.refresh_from_db()
+        self.assertEqual(first.media_status, 'ready')
+        self.assertEqual(first.media_info, {'content_type': 'image/jpeg', 'size': len(body), 'width': 1080, 'height': 1080})
+        self.assertEqual(first.media_hash, second.media_hash)
+        with open(media.cached_path(first.media_hash), 'rb') as fh:
+            self.assertEqual(fh.read(), body)
+        self.assertEqual(os.listdir(self.cache_dir.name), [first.media_hash[:2]])
+
+    def test_repeated_url_is_fetched_once(self):
+        url = self.server.add_media('shared.jpg', make_image((1080, 1350)))
+        for _ in range(3):
+            self.assertTrue(media.prepare_post_media(self.post(url)))
+        self.assertEqual(self.server.stats['media:ok'], 1)
+
+    def test_invalid_media_is_reported_on_the_post(self):
+        cases = {
+            'missing.jpg': None,
+            'page.html': (b'<html>login</html>', 'text/html'),
+            'tiny.jpg': (make_image((100, 100)), 'image/jpeg'),
+            'banner.jpg': (make_image((1400, 400)), 'image/jpeg'),
+            'image.png': (make_image((1080, 1080), 'PNG'), 'image/png'),
+            'fake.jpg': (b'not really a jpeg', 'image/jpeg'),
+        }
+        for name, hosted in cases.items():
+            with self.subTest(name):
+                if hosted:
+                    self.server.add_media(name, hosted[0], hosted[1])
+                post = self.post(f"{self.server.base_url}/media/{name}")
+                self.assertFalse(media.prepare_post_media(post))
+                post.refresh_from_db()
+                self.assertEqual(post.media_status, 'invalid')
+                self.assertTrue(post.media_error)
+
+    def test_unreachable_host_is_retried_later(self):
+        post = self.post('http://127.0.0.1:9/media/photo.jpg')
+        self.assertFalse(media.prepare_post_media(post))
+        post.refresh_from_db()
+        self.assertEqual(post.media_status, 'unchecked')
+        self.assertIn('unreachable', post.media_error)
+
+    def test_private_addresses_are_refused(self):
+        urls = [
+            self.server.add_media('photo.jpg', make_image((1080, 1080))),
+            'http://169.254.169.254/latest/meta-data/',
+            'http://10.0.0.5/photo.jpg',
+            'http://[::ffff:127.0.0.1]/photo.jpg',
+            'file:///etc/passwd',
+        ]
+        with override_settings(OUTBOUND_ALLOWED_HOSTS=[]), mock.patch('core.outbound.requests.request') as get:
+            for url in urls:
+                with self.subTest(url):
+                    post = self.post(url)
+                    self.assertFalse(media.prepare_post_media(post))
+                    post.refresh_from_db()
+                    self.assertEqual(post.media_status, 'invalid')
+                    self.assertIn('not allowed', post.media_error)
+        get.assert_not_called()
+
+    @mock.patch('core.outbound.socket.getaddrinfo', side_effect=lambda host, port, **kwargs: [
+        (None, None, None, '', ('93.184.216.34' if host == 'media.example.com' else host, port)),
+    ])
+    @mock.patch('core.outbound.requests.request', return_value=mock.Mock(
+        is_redirect=True, headers={'Location': 'http://169.254.169.254/latest/meta-data/'},
+    ))
+    def test_redirects_to_private_addresses_are_refused(self, get, _):
+        post = self.post('https://media.example.com/photo.jpg')
+        self.assertFalse(media.prepare_post_media(post))
+        get.assert_called_once()
+        post.refresh_from_db()
+        self.assertEqual(post.media_status, 'invalid')
+        self.assertIn('169.254.169.254', post.media_error)
+
+    @mock.patch('posts.tasks.prefetch_media.apply_async')
+    def test_scan_only_queues_posts_inside_the_lead_time(self, apply_async):
+        url = self.server.add_media('photo.jpg', make_image((1080, 1080)))
+        due_soon = self.post(url, minutes=10)
+        self.post(url, minutes=60 * 24)
+        self.post(None, minutes=10)
+        Post.objects.filter(id=self.post(url, minutes=5).id).update(media_status='ready')
+
+        self.assertEqual(prefetch_upcoming_media(), 1)
+        apply_async.assert_called_once_with((due_soon.id,), queue='media')
+
+    def test_changing_media_url_resets_the_check(self):
+        post = self.post(self.server.add_media('photo.jpg', make_image((1080, 1080))))
+        media.prepare_post_media(post)
+        SocialAccount.objects.create(user=self.user, platform='instagram', access_token='token')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch(f'/api/posts/{post.id}/', {'media_url': 'https://example.com/other.jpg'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['media_status'], 'unchecked')
+        self.assertIsNone(response.data['media_hash'])
+
+    def test_oversized_image_is_normalized_once_per_platform(self):
+        # Noise doesn't compress: ~6.7MB as PNG, over Twitter's 5MB image limit
+        noisy = Image.frombytes('RGB', (1500, 1500), os.urandom(1500 * 1500 * 3))
+        buffer = io.BytesIO()
+        noisy.save(buffer, format='PNG')
+        url = self.server.add_media('noise.png', buffer.getvalue(), 'image/png')
+        first, second = self.post(url, platform='twitter'), self.post(url, platform='twitter')
+
+        with mock.patch('posts.media.run_transform', wraps=media.run_transform) as transform:
+            self.assertTrue(media.prepare_post_media(first))
+            self.assertTrue(media.prepare_post_media(second))
+        # Encoded in the process pool once, then served from the variant cache
+        self.assertEqual(transform.call_count, 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.media_hash, second.media_hash)
+        self.assertEqual(first.media_info['content_type'], 'image/jpeg')
+        self.assertLessEqual(first.media_info['size'], 5 * media.MB)
+        self.assertNotEqual(first.media_info['source_sha256'], first.media_hash)
+        self.assertEqual(media.local_media(first)['path'], media.cached_path(first.media_hash))
+
+    @mock.patch('posts.media.run_transform')
+    def test_instagram_crop_needs_a_public_media_url(self, run_transform):
+        # Inline rather than in the pool, which the test above covers
+        run_transform.side_effect = lambda path, profile: media.normalize_image(path, self.cache_dir.name, profile)
+        post = self.post(self.server.add_media('banner.jpg', make_image((1400, 400))))
+        self.assertFalse(media.prepare_post_media(post))
+
+        post = self.post(self.server.add_media('banner2.jpg', make_image((1400, 401))))
+        with override_settings(MEDIA_PUBLIC_BASE_URL='https://cdn.example.com/media/'):
+            self.assertTrue(media.prepare_post_media(post))
+            post.refresh_from_db()
+            self.assertEqual((post.media_info['width'], post.media_info['height']), (765, 401))
+            self.assertEqual(
+                media.local_media(post)['public_url'],
+                f"https://cdn.example.com/media/{post.media_hash[:2]}/{post.media_hash}",
+            )
+
+
+@mock.patch.object(TwitterIntegration, 'UPLOAD_CHUNK_SIZE', 4096)
+class TwitterChunkedUploadTests(TestCase):
+    """Chunked INIT/APPEND/FINALIZE uploads against the fake Twitter API"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = self.enterContext(fake_platform_apis())
+        user = User.objects.create_user('tweeter', 'tweeter@example.com', 'pw-tweeter-123')
+        self.account = SocialAccount.objects.create(user=user, platform='twitter', access_token='token')
+        self.integration = TwitterIntegration(self.account)
+
+    def test_image_from_media_cache(self):
+        body = make_image((1200, 675))
+        with tempfile.NamedTemporaryFile() as fh:
+            fh.write(body)
+            fh.flush()
+            local = {'path': fh.name, 'sha256': 'a' * 64, 'content_type': 'image/jpeg', 'size': len(body)}
+            success, tweet_id, error = self.integration.post('with a picture', 'https://example.com/p.jpg', local)
+
+        self.assertTrue(success, error)
+        (media_id, upload), = self.server.uploads.items()
+        self.assertEqual(self.server.tweets[-1]['media'], {'media_ids': [media_id]})
+        self.assertEqual(sum(upload['segments'].values()), len(body))
+        self.assertEqual(len(upload['segments']), -(-len(body) // 4096))
+        self.assertNotIn('media:ok', self.server.stats)
+
+    def test_video_streamed_from_media_url(self):
+        body = os.urandom(10000)
+        url = self.server.add_media('clip.mp4', body, 'video/mp4')
+        media_id, error = self.integration.upload_media(url)
+
+        self.assertIsNone(error)
+        upload = self.server.uploads[media_id]
+        self.assertEqual(upload['segments'], {0: 4096, 1: 4096, 2: 1808})
+        self.assertEqual(upload['state'], 'succeeded')
+
+    @mock.patch('posts.social_integrations.time.sleep')
+    def test_interrupted_upload_resumes_from_last_segment(self, _sleep):
+        url = self.server.add_media('long.mp4', os.urandom(5 * 4096), 'video/mp4')
+        self.server.failing_segments[3] = TwitterIntegration.APPEND_ATTEMPTS
+
+        media_id, error = self.integration.upload_media(url)
+        self.assertIsNone(media_id)
+        self.assertIn('network', error)
+
+        media_id, error = self.integration.upload_media(url)
+        self.assertIsNone(error)
+        self.assertEqual(len(self.server.uploads), 1)
+        upload = self.server.uploads[media_id]
+        self.assertEqual(sorted(upload['segments']), [0, 1, 2, 3, 4])
+        # Segments 0-2 were acknowledged before the failure and not sent again
+        self.assertEqual(upload['appends'], 5)
+
+    def local_copy(self, body, content_type='video/mp4'):
+        """A prefetched copy of `body`, as media.local_media describes it"""
+        fh = self.enterContext(tempfile.NamedTemporaryFile())
+        fh.write(body)
+        fh.flush()
+        return {'path': fh.name, 'sha256': hashlib.sha256(body).hexdigest(), 'content_type': content_type, 'size': len(body)}
+
+    def test_repeated_media_reuses_the_uploaded_media_id(self):
+        body = os.urandom(9000)
+        url = self.server.add_media('promo.mp4', body, 'video/mp4')
+        # Streamed from its URL; hashed on the way so prefetched copies can reuse it
+        first_id, _ = self.integration.upload_media(url)
+
+        local = self.local_copy(body)
+        for _ in range(2):
+            success, _, error = self.integration.post('again', url, local)
+            self.assertTrue(success, error)
+
+        self.assertEqual(len(self.server.uploads), 1)
+        self.assertEqual([tweet['media']['media_ids'] for tweet in self.server.tweets], [[first_id], [first_id]])
+        self.assertEqual(PlatformMedia.objects.get(social_account=self.account).use_count, 3)
+
+    def test_media_id_close_to_expiry_is_uploaded_again(self):
+        body = os.urandom(5000)
+        local = self.local_copy(body)
+        self.integration.upload_media('https://example.com/promo.mp4', local)
+        PlatformMedia.objects.update(expires_at=timezone.now() + timedelta(minutes=5))
+
+        media_id, error = self.integration.upload_media('https://example.com/promo.mp4', local)
+        self.assertIsNone(error)
+        self.assertEqual(len(self.server.uploads), 2)
+        self.assertEqual(PlatformMedia.objects.get().media_id, media_id)
+
+
+@mock.patch.object(YouTubeIntegration, 'UPLOAD_CHUNK_SIZE', 4096)
+class YouTubeResumableUploadTests(TestCase):
+    """Resumable video uploads against the fake YouTube upload endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = self.enterContext(fake_platform_apis())
+        user = User.objects.create_user('creator', 'creator@example.com', 'pw-creator-123')
+        self.account = SocialAccount.objects.create(user=user, platform='youtube', access_token='token')
+        self.video = os.urandom(6 * 4096 + 100)
+        self.url = self.server.add_media('launch.mp4', self.video, 'video/mp4')
+
+    def test_video_is_uploaded_in_chunks(self):
+        success, video_id, error = YouTubeIntegration(self.account).post('Launch day\nAll the details', self.url)
+
+        self.assertTrue(success, error)
+        (session,) = self.server.video_sessions.values()
+        self.assertEqual(session['video_id'], video_id)
+        self.assertEqual(session['received'], len(self.video))
+        self.assertEqual(session['metadata']['snippet']['title'], 'Launch day')
+
+    def test_restarted_worker_resumes_from_acknowledged_offset(self):
+        self.server.failing_video_offsets[3 * 4096] = 1
+        video_id, error = YouTubeIntegration(self.account).upload_video('Launch', self.url)
+        self.assertIsNone(video_id)
+        self.assertIn('network error', error)
+
+        # A fresh integration, as in a new worker process, finds the session and continues
+        video_id, error = YouTubeIntegration(self.account).upload_video('Launch', self.url)
+        self.assertIsNone(error)
+        (session,) = self.server.video_sessions.values()
+        self.assertEqual(session['video_id'], video_id)
+        self.assertEqual(session['bytes_sent'], len(self.video))
+
+    def test_expired_session_starts_over(self):
+        source = uploads.open_source(self.url)
+        uploads.save_session(
+            f'youtube:{self.account.id}:{source.key}',
+            {'upload_url': f'{self.server.base_url}/youtube-upload/sessions/999'},
+            timeout=60,
+        )
+        video_id, error = YouTubeIntegration(self.account).upload_video('Launch', self.url)
+        self.assertIsNone(error)
+        self.assertEqual(len(self.server.video_sessions), 1)
+
+    @mock.patch('core.outbound.socket.getaddrinfo', side_effect=lambda host, port, **kwargs: [
+        (None, None, None, '', ('93.184.216.34' if host == 'media.example.com' else host, port)),
+    ])
+    @mock.patch('core.outbound.requests.request', return_value=mock.Mock(
+        is_redirect=True, headers={'Location': 'http://169.254.169.254/latest/meta-data/'},
+    ))
+    def test_media_redirecting_to_private_address_is_not_streamed(self, request, _):
+        url = 'https://media.example.com/launch.mp4'
+        video_id, error = YouTubeIntegration(self.account).upload_video('Launch', url)
+        self.assertIsNone(video_id)
+        self.assertIn('not allowed', error)
+        request.assert_called_once()
+
+        request.reset_mock()
+        source = uploads.MediaSource(len(self.video), 'video/mp4', url=url)
+        with self.assertRaises(media.MediaError):
+            list(source.chunks(4096))
+        request.assert_called_once()
+        self.assertFalse(self.server.video_sessions)
+
+    def test_non_video_media_is_rejected(self):
+        url = self.server.add_media('cover.jpg', make_image((1280, 720)))
+        success, _, error = YouTubeIntegration(self.account).post('Launch', url)
+        self.assertFalse(success)
+        self.assertIn('requires a video', error)
+
+
+class InstagramStagingTests(TestCase):
+    """Media containers created and processed ahead of the scheduled time"""
+
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.enterContext(override_settings(MEDIA_CACHE_DIR=self.cache_dir.name))
+        self.server = self.enterContext(fake_platform_apis())
+        self.user = User.objects.create_user('gram', 'gram@example.com', 'pw-gram-123')
+        SocialAccount.objects.create(
+            user=self.user, platform='instagram', access_token='token',
+            metadata={'instagram_account_id': 'ig-1'},
+        )
+
+    def post(self, content_type='video/mp4', minutes=10, **fields):
+        body = os.urandom(2048)
+        digest = hashlib.sha256(body).hexdigest()
+        os.makedirs(os.path.dirname(media.cache_path(digest)), exist_ok=True)
+        with open(media.cache_path(digest), 'wb') as fh:
+            fh.write(body)
+        defaults = dict(
+            user=self.user, platform='instagram', content='Reel', media_url='https://example.com/reel.mp4',
+            scheduled_time=timezone.now() + timedelta(minutes=minutes),
+            media_status='ready', media_hash=digest, media_info={'content_type': content_type, 'size': len(body)},
+        )
+        return Post.objects.create(**{**defaults, **fields})
+
+    @mock.patch('posts.tasks.stage_post_container.apply_async')
+    def test_scan_stages_ready_media_inside_the_lead_time(self, apply_async):
+        due = self.post()
+        self.post(minutes=60 * 24)
+        self.post(media_status='unchecked')
+        self.post(platform='twitter')
+
+        self.assertEqual(stage_upcoming_containers(), 1)
+        apply_async.assert_called_once_with((due.id,), queue='publish.instagram', priority=6)
+        due.refresh_from_db()
+        self.assertEqual(due.container_status, 'processing')
+        self.assertEqual(stage_upcoming_containers(), 0)
+
+    @mock.patch('posts.tasks.poll_staged_container.apply_async')
+    def test_video_container_is_polled_with_backoff(self, apply_async):
+        post = self.post()
+        Post.objects.filter(id=post.id).update(container_status='processing')
+        stage_post_container(post.id)
+        post.refresh_from_db()
+        container = self.server.containers[post.container_id]
+        self.assertIn('video_url', container['form'])
+        self.assertEqual(post.container_status, 'processing')
+
+        countdowns = []
+        while apply_async.call_args:
+            args, kwargs = apply_async.call_args
+            apply_async.reset_mock()
+            countdowns.append(kwargs['countdown'])
+            poll_staged_container(*args[0])
+        post.refresh_from_db()
+        self.assertEqual(post.container_status, 'ready')
+        self.assertEqual(countdowns, [5, 10, 20])
+
+    @mock.patch('posts.tasks.poll_staged_container.apply_async')
+    def test_publish_only_calls_media_publish_for_a_ready_container(self, _poll):
+        post = self.post()
+        stage_post_container(post.id)
+        post.refresh_from_db()
+        self.server.containers[post.container_id]['status_code'] = 'FINISHED'
+        Post.objects.filter(id=post.id).update(container_status='ready')
+        calls_before = self.server.stats['instagram:ok']
+
+        publish_post.apply(args=(post.id,))
+        post.refresh_from_db()
+        self.assertEqual(post.status, 'posted')
+        self.assertEqual(self.server.stats['instagram:ok'] - calls_before, 1)
+        self.assertEqual(self.server.containers[post.container_id]['status_code'], 'PUBLISHED')
+
+    @mock.patch.object(publish_post, 'retry', side_effect=Retry())
+    @mock.patch.object(InstagramIntegration, 'publish_staged', return_value=(False, None, 'Network error: timeout'))
+    def test_retry_after_a_failed_container_stages_a_fresh_one(self, publish_staged, retry):
+        post = self.post(minutes=0, container_id='123', container_status='ready', staged_at=timezone.now())
+        publish_post.apply(args=(post.id,))
+        publish_staged.assert_called_once_with('123', ready=True)
+        retry.assert_called_once()
+        post.refresh_from_db()
+        self.assertEqual((post.status, post.claimed_at), ('pending', None))
+        self.assertEqual((post.container_id, post.container_status, post.staged_at), (None, '', None))
+
+    @mock.patch('posts.social_integrations.time.sleep')
+    @mock.patch.object(publish_post, 'apply_async', return_value=mock.Mock(id='task-id'))
+    def test_processing_container_is_published_by_a_later_attempt(self, apply_async, sleep):
+        post = self.post()
+        for _ in range(self.server.video_processing_checks):
+            apply_async.reset_mock()
+            publish_post.apply(args=(post.id,))
+            post.refresh_from_db()
+            self.assertEqual((post.status, post.claimed_at, post.container_status), ('pending', None, 'processing'))
+            self.assertEqual(apply_async.call_args.kwargs['countdown'], 5)
+
+        publish_post.apply(args=(post.id,))
+        post.refresh_from_db()
+        self.assertEqual(post.status, 'posted')
+        self.assertEqual(len(self.server.containers), 1)
+        self.assertEqual(self.server.containers[post.container_id]['status_code'], 'PUBLISHED')
+        sleep.assert_not_called()
+
+    @mock.patch.object(InstagramIntegration, 'MAX_PROCESSING_WAIT', 0)
+    @mock.patch.object(publish_post, 'retry', side_effect=Retry())
+    def test_container_processing_too_long_is_retried_fresh(self, retry):
+        post = self.post(minutes=0)
+        publish_post.apply(args=(post.id,))
+        retry.assert_called_once()
+        self.assertIn('still processing', str(retry.call_args.kwargs['exc']))
+        post.refresh_from_db()
+        self.assertEqual((post.status, post.claimed_at), ('pending', None))
+        self.assertEqual((post.container_id, post.container_status, post.staged_at), (None, '', None))
+
+    def test_editing_content_drops_the_staged_container(self):
+        post = self.post(minutes=120, container_id='123', container_status='ready', staged_at=timezone.now())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch(f'/api/posts/{post.id}/', {'content': 'New caption'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['container_id'], response.data['container_status']), (None, ''))
+
+
+class BenchmarkPublishCommandTests(TransactionTestCase):
+    """A tiny benchmark_publish run; its worker threads need committed data"""
+
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.enterContext(override_settings(MEDIA_CACHE_DIR=self.cache_dir.name))
+
+    def test_reports_json_and_cleans_up(self):
+        out = io.StringIO()
+        call_command(
+            'benchmark_publish', posts=3, workers=1, users=1, platforms='twitter', spread=0,
+            latency_ms=0, jitter_ms=0, eta_tasks=5, timeout=30, stdout=out,
+        )
+        record = json.loads(out.getvalue())
+        self.assertEqual(set(record), {'benchmark', 'timestamp', 'revision', 'config', 'results'})
+        self.assertEqual(record['benchmark'], 'publish')
+        self.assertEqual((record['config']['posts'], record['config']['platforms']), (3, ['twitter']))
+        results = record['results']
+        self.assertEqual((results['completed'], results['outcomes']), (3, {'posted': 3}))
+        self.assertEqual(results['schedule_lag_s']['count'], 3)
+        self.assertEqual(results['eta_memory']['tasks'], 5)
+        self.assertFalse(User.objects.filter(username__startswith='bench-publish-').exists())
+        self.assertFalse(Post.objects.exists())
+
+
+class BenchmarkApiCommandTests(TestCase):
+    """seed_benchmark_data and benchmark_api at tiny counts"""
+
+    def call(self, *args, **options):
+        out = io.StringIO()
+        call_command(*args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_seed_benchmark_and_clear(self):
+        with self.assertRaises(CommandError):
+            self.call('benchmark_api')
+
+        self.call('seed_benchmark_data', users=3, posts=20, batch_size=8)
+        seeded = User.objects.filter(username__startswith='bench-api-')
+        self.assertEqual(seeded.count(), 3)
+        self.assertEqual(Post.objects.filter(user__in=seeded).count(), 20)
+        self.assertFalse(SocialAccount.objects.exclude(user__in=seeded).exists())
+
+        record = json.loads(self.call('benchmark_api', requests=2, warmup=0))
+        self.assertEqual(set(record), {'benchmark', 'timestamp', 'revision', 'config', 'results'})
+        self.assertEqual((record['benchmark'], record['config']['seeded_users']), ('api', 3))
+        for label in ('heavy_user', 'typical_user'):
+            scenarios = record['results'][label]
+            self.assertIn('posts', scenarios)
+            for name in ('list', 'search', 'filter', 'ordering', 'deep_page', 'mid_page', 'stats', 'social_status', 'create'):
+                with self.subTest(label=label, scenario=name):
+                    result = scenarios[name]
+                    self.assertEqual((result['latency_ms']['count'], result['queries']['count']), (2, 2))
+                    if name != 'create':
+                        self.assertEqual(result['status_codes'], {'200': 2})
+        # Posts made by the create scenario are removed again
+        self.assertEqual(Post.objects.count(), 20)
+
+        self.call('seed_benchmark_data', users=0, posts=0, clear=True)
+        self.assertFalse(User.objects.filter(username__startswith='bench-api-').exists())
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,173 @@
+"""
+Streaming building blocks for chunked, resumable media uploads.
+
+Media is read in fixed-size chunks, either from the local media cache or
+straight from media_url, so a worker only ever holds a few chunks of a large
+video in memory. Chunks are read ahead on a background thread while the
+previous one is being uploaded, and upload progress is kept in the cache so
+a retried task continues from the last acknowledged chunk. Requests to
+media_url, and every redirect they follow, only go to public addresses
+(core.outbound).
+"""
+import hashlib
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.core.cache import cache
+import requests
+from core.outbound import UnsafeURL, public_request
+from . import media
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class MediaSource:
+    """A media file of known size and type that can be read in chunks from any offset"""
+
+    def __init__(self, size, content_type, path=None, url=None, sha256=None):
+        self.size = size
+        self.content_type = content_type
+        self.path = path
+        self.url = url
+        self.sha256 = sha256
+
+    @property
+    def key(self) -> str:
+        """Stable identity of the content, used to key upload sessions"""
+        return self.sha256 or hashlib.sha1(self.url.encode()).hexdigest()
+
+    def chunks(self, chunk_size: int, offset: int = 0):
+        if self.path:
+            with open(self.path, 'rb') as fh:
+                fh.seek(offset)
+                while True:
+                    chunk = fh.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+        else:
+            yield from self._remote_chunks(chunk_size, offset)
+
+    def _remote_chunks(self, chunk_size, offset):
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            response = public_request(
+                'get', self.url, settings.MEDIA_MAX_REDIRECTS, headers=headers, stream=True, timeout=settings.MEDIA_FETCH_TIMEOUT,
+            )
+        except UnsafeURL as e:
+            raise media.MediaError(f"Media URL is not allowed: {e}")
+        with response:
+            response.raise_for_status()
+            # A server that ignores Range sends everything again; skip what was already uploaded
+            skip = offset if offset and response.status_code == 200 else 0
+            buffer = bytearray()
+            for data in response.iter_content(chunk_size):
+                if skip:
+                    dropped = min(skip, len(data))
+                    data, skip = data[dropped:], skip - dropped
+                buffer += data
+                while len(buffer) >= chunk_size:
+                    yield bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+            if buffer:
+                yield bytes(buffer)
+
+
+def open_source(media_url: str, local=None, platform: str = '') -> MediaSource:
+    """
+    Upload source for a post's media: the prefetched file when there is one
+    (see media.local_media), otherwise media_url itself if the server reports
+    its size. Anything else is downloaded into the media cache first.
+    """
+    if local:
+        return MediaSource(local['size'], local['content_type'], path=local['path'], sha256=local['sha256'])
+
+    try:
+        response = public_request('head', media_url, settings.MEDIA_MAX_REDIRECTS, timeout=settings.MEDIA_FETCH_TIMEOUT)
+        size = int(response.headers.get('Content-Length') or 0)
+        content_type = (response.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        if response.status_code == 200 and size and content_type.startswith(('image/', 'video/')):
+            return MediaSource(size, content_type, url=response.url)
+    except UnsafeURL as e:
+        raise media.MediaError(f"Media URL is not allowed: {e}")
+    except requests.RequestException as e:
+        logger.info(f"HEAD {media_url} failed, downloading it into the media cache instead: {e}")
+
+    info = media.fetch_and_inspect(media_url, platform)
+    return MediaSource(info['size'], info['content_type'], path=media.cache_path(info['sha256']), sha256=info['sha256'])
+
+
+def read_ahead(chunks, depth: int = 2):
+    """
+    Iterate over `chunks` while a background thread reads up to `depth`
+    chunks ahead, so reading the next chunk overlaps uploading this one.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer has gone away instead of blocking forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+
+    reader = threading.Thread(target=produce, daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join(timeout=1)
+
+
+def _session_key(name: str) -> str:
+    return f"upload:session:{name}"
+
+
+def load_session(name: str):
+    """Progress of an interrupted upload, or None"""
+    try:
+        return cache.get(_session_key(name))
+    except Exception as e:
+        logger.warning(f"Upload session store unavailable, starting {name} from scratch: {e}")
+        return None
+
+
+def save_session(name: str, state: dict, timeout: int):
+    try:
+        cache.set(_session_key(name), state, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Could not save upload session {name}: {e}")
+
+
+def clear_session(name: str):
+    try:
+        cache.delete(_session_key(name))
+    except Exception as e:
+        logger.debug(f"Could not clear upload session {name}: {e}")
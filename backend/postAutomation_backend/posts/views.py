@@ -1,12 +1,93 @@
-from rest_framework import viewsets, status, filters, serializers
+from rest_framework import mixins, viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Left, RowNumber, TruncDay, TruncHour
 from django.utils import timezone
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Post, SocialAccount
-from .serializers import PostSerializer, SocialAccountSerializer, SocialAccountCreateSerializer
-from .tasks import publish_post
+from .models import Campaign, Post, PostRollup, PostTombstone, RecurrenceRule, SocialAccount, Webhook
+from .serializers import (
+    CampaignSerializer, PostSerializer, RecurrenceRuleSerializer, SocialAccountSerializer, SocialAccountCreateSerializer,
+    WebhookDeliverySerializer, WebhookSerializer,
+)
+from . import analytics, events, recurrence
+from .social_integrations import preflight_account
+from .tasks import announce_status, dispatch_campaign, dispatch_publish
+from core.tracing import start_span
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# Longest range the calendar serves per granularity, which bounds its payload
+CALENDAR_GRANULARITIES = {
+    'day': (TruncDay, timedelta(days=366)),
+    'hour': (TruncHour, timedelta(days=31)),
+}
+CALENDAR_MAX_STUBS = 10
+STUB_CONTENT_LENGTH = 80
+# Longest range the analytics endpoint serves per rollup granularity
+ANALYTICS_MAX_RANGE = {
+    'day': timedelta(days=366),
+    'hour': timedelta(days=31),
+}
+# Hourly snapshots for a week are 168 points
+ENGAGEMENT_SERIES_LIMIT = 500
+
+
+def parse_calendar_bound(value, tz):
+    """A date or datetime query parameter as an aware datetime; dates mean midnight in tz"""
+    parsed = parse_datetime(value or '')
+    if parsed is None:
+        day = parse_date(value or '')
+        if day is None:
+            return None
+        parsed = datetime.combine(day, time.min)
+    return parsed if timezone.is_aware(parsed) else parsed.replace(tzinfo=tz)
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_change_token(moment, post_id=None) -> str:
+    """
+    Changes feed position: microseconds since the epoch, plus the id of the
+    last post handed out when a page ended part-way through that microsecond
+    """
+    micros = (moment - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{post_id}" if post_id is not None else str(micros)
+
+
+def parse_change_token(token):
+    """(moment, post_id or None) from encode_change_token; raises ValueError"""
+    micros, _, post_id = token.partition('.')
+    return EPOCH + timedelta(microseconds=int(micros)), int(post_id) if post_id else None
+
+
+def revoke_publish_tasks(posts):
+    """Best-effort revoke of the publish tasks of posts that are being cancelled"""
+    from celery import current_app
+
+    for post in posts:
+        if not post.celery_task_id:
+            continue
+        try:
+            current_app.control.revoke(post.celery_task_id, terminate=True)
+        except Exception as e:
+            # Log error but continue with cancellation
+            logger.warning(f"Failed to revoke Celery task {post.celery_task_id}: {e}")
 
 class PostViewSet(viewsets.ModelViewSet):
     """
@@ -22,38 +103,54 @@ class PostViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return posts for the authenticated user only"""
-        return Post.objects.filter(user=self.request.user)
+        return Post.objects.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
         """Create a post and schedule it"""
-        post = serializer.save(user=self.request.user)
+        with start_span(
+            'PostViewSet.perform_create',
+            self.request.META.get('HTTP_TRACEPARENT'),
+            user_id=self.request.user.id,
+        ) as span:
+            post = self._create_and_schedule(serializer)
+            if span:
+                span.set(post_id=post.id, platform=post.platform, scheduled_time=post.scheduled_time.isoformat())
+        return post
+
+    def _create_and_schedule(self, serializer):
+        """Check the platform account, save the post and dispatch its publish task"""
+        platform = serializer.validated_data['platform']
         
         # Check if user has connected account for this platform
-        has_account = SocialAccount.objects.filter(
+        account = SocialAccount.objects.filter(
             user=self.request.user,
-            platform=post.platform,
+            platform=platform,
             is_active=True
-        ).exists()
+        ).first()
         
-        if not has_account:
+        if not account:
             raise serializers.ValidationError(
-                f"You need to connect your {post.platform} account before scheduling posts."
+                f"You need to connect your {platform} account before scheduling posts."
             )
         
-        # Schedule the post at its scheduled_time
+        # The content was checked by the serializer; check the account it'll be published with
+        errors = preflight_account(platform, account)
+        if errors:
+            raise serializers.ValidationError(errors)
+        
+        post = serializer.save(user=self.request.user)
+        
+        # Schedule the post at its scheduled_time on the platform's queue;
+        # the task ID is stored for potential cancellation
         if post.scheduled_time > timezone.now():
-            task = publish_post.apply_async((post.id,), eta=post.scheduled_time)
+            dispatch_publish(post, eta=post.scheduled_time)
         else:
-            task = publish_post.delay(post.id)
-        
-        # Store task ID for potential cancellation
-        post.celery_task_id = task.id
-        post.save(update_fields=['celery_task_id'])
+            dispatch_publish(post)
         return post
 
     def perform_update(self, serializer):
         """Update post only if it's pending and not yet scheduled"""
-        post = self.get_object()
+        post = serializer.instance
         if post.status != 'pending':
             raise serializers.ValidationError("Only pending posts can be updated.")
         if post.scheduled_time <= timezone.now():
@@ -63,8 +160,6 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel a scheduled post"""
-        from celery import current_app
-        
         post = self.get_object()
         if post.status != 'pending':
             return Response(
@@ -78,38 +173,405 @@ class PostViewSet(viewsets.ModelViewSet):
             )
         
         # Revoke the Celery task if it exists
-        if post.celery_task_id:
-            try:
-                current_app.control.revoke(post.celery_task_id, terminate=True)
-            except Exception as e:
-                # Log error but continue with cancellation
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to revoke Celery task {post.celery_task_id}: {e}")
+        revoke_publish_tasks([post])
         
         post.status = 'cancelled'
         post.save()
+        announce_status([post])
         return Response({'message': 'Post cancelled successfully.'})
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics for user's posts"""
-        posts = self.get_queryset()
+        # One aggregate query instead of a COUNT per status and platform
+        aggregates = {'total': Count('id')}
+        for status_code, _ in Post.STATUS_CHOICES:
+            aggregates[status_code] = Count('id', filter=Q(status=status_code))
+        for platform_code, _ in Post.PLATFORM_CHOICES:
+            aggregates[f'platform_{platform_code}'] = Count('id', filter=Q(platform=platform_code))
+        counts = Post.objects.filter(user=request.user).aggregate(**aggregates)
+        
         stats = {
-            'total': posts.count(),
-            'pending': posts.filter(status='pending').count(),
-            'posted': posts.filter(status='posted').count(),
-            'failed': posts.filter(status='failed').count(),
-            'cancelled': posts.filter(status='cancelled').count(),
+            'total': counts['total'],
+            'pending': counts['pending'],
+            'posted': counts['posted'],
+            'failed': counts['failed'],
+            'cancelled': counts['cancelled'],
+            'stale': counts['stale'],
             'by_platform': {}
         }
         
         for platform_code, platform_name in Post.PLATFORM_CHOICES:
-            stats['by_platform'][platform_name] = posts.filter(platform=platform_code).count()
+            stats['by_platform'][platform_name] = counts[f'platform_{platform_code}']
         
         return Response(stats)
 
 
+    @action(detail=True, methods=['get'])
+    def engagement(self, request, pk=None):
+        """
+        The post's engagement over time, oldest first, optionally from
+        `since` (a datetime); at most ENGAGEMENT_SERIES_LIMIT points
+        """
+        post = self.get_object()
+        snapshots = post.engagement_snapshots.order_by('collected_at')
+        if request.query_params.get('since'):
+            since = parse_datetime(request.query_params['since'])
+            if since is None:
+                return Response({'error': 'since must be a datetime.'}, status=status.HTTP_400_BAD_REQUEST)
+            snapshots = snapshots.filter(collected_at__gte=since if timezone.is_aware(since) else timezone.make_aware(since))
+        points = snapshots.values('collected_at', 'likes', 'comments', 'shares', 'impressions')[:ENGAGEMENT_SERIES_LIMIT]
+        return Response({
+            'id': post.id,
+            'engagement': post.engagement,
+            'engagement_updated_at': post.engagement_updated_at,
+            'series': list(points),
+        })
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Posts created or updated, and ids of posts deleted, since the `since`
+        token of an earlier call. Without `since` every post is returned; keep
+        calling with `next` until has_more is false, then poll with it:
+
+            /api/posts/changes/?since=1760868000000000
+        """
+        now = timezone.now()
+        # Rows younger than the settle window may belong to transactions that
+        # haven't committed yet; leave them for the next call rather than skip them
+        upper = now - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+        try:
+            limit = min(max(int(request.query_params.get('limit', settings.CHANGES_PAGE_SIZE)), 1), settings.CHANGES_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        posts = self.get_queryset().filter(updated_at__lte=upper)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since_time, since_id = parse_change_token(since)
+            except (ValueError, OverflowError):
+                return Response({'error': 'Invalid since token.'}, status=status.HTTP_400_BAD_REQUEST)
+            if since_time < now - timedelta(seconds=settings.CHANGES_TOMBSTONE_TTL):
+                # Deletions that old have been forgotten; only a full resync is correct
+                return Response(
+                    {'error': 'The since token has expired; resync by calling without since.'},
+                    status=status.HTTP_410_GONE
+                )
+            if since_id is None:
+                posts = posts.filter(updated_at__gt=since_time)
+            else:
+                posts = posts.filter(Q(updated_at__gt=since_time) | Q(updated_at=since_time, id__gt=since_id))
+
+        page = list(posts.order_by('updated_at', 'id')[:limit + 1])
+        has_more = len(page) > limit
+        if has_more:
+            page = page[:limit]
+            page_end = page[-1].updated_at
+            next_token = encode_change_token(page_end, page[-1].id)
+        else:
+            page_end = upper
+            next_token = encode_change_token(upper)
+
+        deleted = []
+        if since:
+            # A full resync has nothing to delete; afterwards each page carries
+            # the deletions up to its own end, so none are reported twice
+            deleted = list(
+                PostTombstone.objects.filter(
+                    user=request.user, deleted_at__gt=since_time, deleted_at__lte=page_end,
+                ).order_by('deleted_at').values_list('post_id', flat=True)
+            )
+
+        return Response({
+            'changes': self.get_serializer(page, many=True).data,
+            'deleted': deleted,
+            'next': next_token,
+            'has_more': has_more,
+        })
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Publish outcomes, publish lag percentiles and engagement gained in
+        the day or hour rollups starting between `start` and `end`
+        (exclusive, UTC), in total, per platform and per bucket:
+
+            /api/posts/analytics/?start=2025-10-01&end=2026-10-01&granularity=day
+        """
+        params = request.query_params
+        granularity = params.get('granularity', 'day')
+        if granularity not in ANALYTICS_MAX_RANGE:
+            return Response(
+                {'error': f"granularity must be one of: {', '.join(ANALYTICS_MAX_RANGE)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start = parse_calendar_bound(params.get('start'), dt_timezone.utc)
+        end = parse_calendar_bound(params.get('end'), dt_timezone.utc)
+        if not start or not end or end <= start:
+            return Response({'error': 'start and end must be dates or datetimes with start before end.'}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start > ANALYTICS_MAX_RANGE[granularity]:
+            return Response(
+                {'error': f'The range can span at most {ANALYTICS_MAX_RANGE[granularity].days} days for {granularity} buckets.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = PostRollup.objects.filter(
+            user=request.user, granularity=granularity, bucket_start__gte=start, bucket_start__lt=end,
+        )
+        if params.get('platform'):
+            rollups = rollups.filter(platform=params['platform'])
+        rows = list(rollups.order_by('bucket_start').values(
+            'platform', 'bucket_start', *analytics.OUTCOME_STATUSES, 'lag_sum', 'lag_histogram', *analytics.ENGAGEMENT_FIELDS,
+        ))
+
+        by_platform, by_bucket = {}, {}
+        for row in rows:
+            by_platform.setdefault(row['platform'], []).append(row)
+            by_bucket.setdefault(row['bucket_start'], []).append(row)
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'granularity': granularity,
+            'totals': analytics.summarize(rows),
+            'by_platform': {platform: analytics.summarize(platform_rows) for platform, platform_rows in by_platform.items()},
+            'buckets': [
+                {'start': bucket_start.isoformat(), **analytics.summarize(bucket_rows)}
+                for bucket_start, bucket_rows in by_bucket.items()
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Post counts per day or hour between `start` and `end` (exclusive) in
+        `timezone`, broken down by platform and status, optionally with up
+        to `stubs` lightweight posts per bucket:
+
+            /api/posts/calendar/?start=2026-10-01&end=2026-11-01&timezone=Europe/Berlin&granularity=day&stubs=3
+        """
+        params = request.query_params
+        try:
+            tz = ZoneInfo(params.get('timezone') or 'UTC')
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response({'error': 'Unknown timezone.'}, status=status.HTTP_400_BAD_REQUEST)
+        granularity = params.get('granularity', 'day')
+        if granularity not in CALENDAR_GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of: {', '.join(CALENDAR_GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        trunc, max_range = CALENDAR_GRANULARITIES[granularity]
+        start = parse_calendar_bound(params.get('start'), tz)
+        end = parse_calendar_bound(params.get('end'), tz)
+        if not start or not end or end <= start:
+            return Response({'error': 'start and end must be dates or datetimes with start before end.'}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start > max_range:
+            return Response(
+                {'error': f'The range can span at most {max_range.days} days for {granularity} buckets.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            stubs = min(max(int(params.get('stubs', 0)), 0), CALENDAR_MAX_STUBS)
+        except ValueError:
+            return Response({'error': 'stubs must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Filter on scheduled_time first so the (user, scheduled_time) range is all that's scanned
+        posts = Post.objects.filter(user=request.user, scheduled_time__gte=start, scheduled_time__lt=end)
+        for field in ('platform', 'status'):
+            if params.get(field):
+                posts = posts.filter(**{field: params[field]})
+        bucket = trunc('scheduled_time', tzinfo=tz)
+
+        buckets = {}
+        rows = posts.annotate(bucket=bucket).values('bucket', 'platform', 'status').annotate(count=Count('id')).order_by()
+        for row in rows:
+            entry = buckets.setdefault(row['bucket'], {'total': 0, 'by_platform': {}, 'by_status': {}})
+            entry['total'] += row['count']
+            entry['by_platform'][row['platform']] = entry['by_platform'].get(row['platform'], 0) + row['count']
+            entry['by_status'][row['status']] = entry['by_status'].get(row['status'], 0) + row['count']
+
+        if stubs:
+            ranked = posts.annotate(
+                bucket=bucket,
+                rank=Window(RowNumber(), partition_by=[bucket], order_by=[F('scheduled_time').asc(), F('id').asc()]),
+                preview=Left('content', STUB_CONTENT_LENGTH),
+            ).filter(rank__lte=stubs).values('id', 'bucket', 'platform', 'status', 'scheduled_time', 'preview')
+            for stub in ranked:
+                stub['scheduled_time'] = stub['scheduled_time'].astimezone(tz).isoformat()
+                buckets[stub.pop('bucket')].setdefault('posts', []).append(stub)
+
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'timezone': str(tz),
+            'granularity': granularity,
+            'buckets': [
+                {'start': bucket_start.astimezone(tz).isoformat(), **buckets[bucket_start]}
+                for bucket_start in sorted(buckets)
+            ],
+        })
+
+
+class CampaignViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    One piece of content scheduled to several platforms at once. The child
+    posts are created together and published in parallel; edit or cancel
+    them individually through /api/posts/, or all at once here. Deleting a
+    campaign deletes its pending posts and keeps the others.
+    """
+    serializer_class = CampaignSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['content']
+    ordering_fields = ['scheduled_time', 'created_at']
+    ordering = ['-scheduled_time']
+
+    def get_queryset(self):
+        """Return campaigns for the authenticated user only, with their posts"""
+        return Campaign.objects.filter(user=self.request.user).prefetch_related('posts')
+
+    def perform_create(self, serializer):
+        """Create the campaign and its posts in one transaction and dispatch them together"""
+        with start_span(
+            'CampaignViewSet.perform_create',
+            self.request.META.get('HTTP_TRACEPARENT'),
+            user_id=self.request.user.id,
+        ) as span:
+            platforms = serializer.validated_data['platforms']
+            accounts = {
+                account.platform: account
+                for account in SocialAccount.objects.filter(user=self.request.user, platform__in=platforms, is_active=True)
+            }
+            missing = [platform for platform in platforms if platform not in accounts]
+            if missing:
+                raise serializers.ValidationError(
+                    f"You need to connect your {', '.join(missing)} account before scheduling posts."
+                )
+            errors = {}
+            for platform, account in accounts.items():
+                platform_errors = preflight_account(platform, account)
+                if platform_errors:
+                    errors[platform] = platform_errors
+            if errors:
+                raise serializers.ValidationError({'platforms': errors})
+
+            with transaction.atomic():
+                campaign = serializer.save(user=self.request.user)
+                # Only once every post is committed, so none is published alone
+                transaction.on_commit(lambda: dispatch_campaign(campaign))
+            if span:
+                span.set(campaign_id=campaign.id, platforms=platforms, scheduled_time=campaign.scheduled_time.isoformat())
+        return campaign
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel every post of the campaign that hasn't been published yet"""
+        campaign = self.get_object()
+        if campaign.scheduled_time <= timezone.now():
+            return Response(
+                {'error': 'Cannot cancel campaigns that are already scheduled.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        pending = [post for post in campaign.posts.all() if post.status == 'pending']
+        revoke_publish_tasks(pending)
+        pending_ids = [post.id for post in pending]
+        now = timezone.now()
+        cancelled = Post.objects.filter(id__in=pending_ids, status='pending').update(status='cancelled', updated_at=now)
+        # Only the posts this update cancelled, not ones a worker claimed meanwhile
+        announce_status(Post.objects.filter(id__in=pending_ids, status='cancelled', updated_at=now), 'cancelled')
+        return Response({'message': f'Cancelled {cancelled} posts.', 'cancelled': cancelled})
+
+    def perform_destroy(self, instance):
+        """Delete the campaign and its pending posts; published ones are kept"""
+        pending = list(instance.posts.filter(status='pending', claimed_at__isnull=True).only('id', 'celery_task_id'))
+        revoke_publish_tasks(pending)
+        Post.objects.filter(id__in=[post.id for post in pending], status='pending', claimed_at__isnull=True).delete()
+        instance.delete()
+
+
+class RecurrenceRuleViewSet(viewsets.ModelViewSet):
+    """
+    Recurring posts. Posts are only created for occurrences inside the
+    materialization horizon; edits replace the pending ones and apply to
+    all later occurrences.
+    """
+    serializer_class = RecurrenceRuleSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['platform', 'is_active']
+    ordering_fields = ['created_at', 'next_occurrence']
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        """Return recurrence rules for the authenticated user only"""
+        return RecurrenceRule.objects.filter(user=self.request.user)
+
+    def check_account(self, platform):
+        account = SocialAccount.objects.filter(user=self.request.user, platform=platform, is_active=True).first()
+        if not account:
+            raise serializers.ValidationError(
+                f"You need to connect your {platform} account before scheduling posts."
+            )
+        errors = preflight_account(platform, account)
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    def perform_create(self, serializer):
+        """Save the rule and materialize its first occurrences"""
+        self.check_account(serializer.validated_data['platform'])
+        rule = serializer.save(user=self.request.user)
+        recurrence.reset(rule)
+        recurrence.materialize(rule)
+
+    def perform_update(self, serializer):
+        """Replace the rule's pending posts with ones from the edited rule"""
+        if 'platform' in serializer.validated_data:
+            self.check_account(serializer.validated_data['platform'])
+        rule = serializer.save()
+        revoke_publish_tasks(recurrence.reset(rule))
+        recurrence.materialize(rule)
+
+    def perform_destroy(self, instance):
+        """Delete the rule and its pending posts; published ones are kept"""
+        instance.is_active = False
+        revoke_publish_tasks(recurrence.reset(instance))
+        instance.delete()
+
+
+class WebhookViewSet(viewsets.ModelViewSet):
+    """
+    Endpoints notified of post status changes. The signing secret is
+    generated on creation; see posts.webhooks for the delivery format.
+    """
+    serializer_class = WebhookSerializer
+    permission_classes = [IsAuthenticated]
+
+    # Most recent deliveries shown per webhook
+    DELIVERIES_SHOWN = 50
+
+    def get_queryset(self):
+        """Return webhooks for the authenticated user only"""
+        return Webhook.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, secret=secrets.token_hex(32))
+
+    @action(detail=True, methods=['get'])
+    def deliveries(self, request, pk=None):
+        """The webhook's most recent deliveries, for debugging a receiver"""
+        webhook = self.get_object()
+        deliveries = webhook.deliveries.order_by('-id')[:self.DELIVERIES_SHOWN]
+        return Response(WebhookDeliverySerializer(deliveries, many=True).data)
+
+
 class SocialAccountViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing social media account connections
@@ -142,11 +604,11 @@ class SocialAccountViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def status(self, request):
         """Get connection status for all platforms"""
-        accounts = self.get_queryset()
+        accounts = {account.platform: account for account in self.get_queryset()}
         status_dict = {}
         
         for platform_code, platform_name in Post.PLATFORM_CHOICES:
-            account = accounts.filter(platform=platform_code).first()
+            account = accounts.get(platform_code)
             status_dict[platform_code] = {
                 'platform': platform_name,
                 'is_connected': bool(account and account.access_token and account.is_active) if account else False,
@@ -156,3 +618,33 @@ class SocialAccountViewSet(viewsets.ModelViewSet):
             }
         
         return Response(status_dict)
+
+
+async def authenticate_stream(request):
+    """
+    The user of a JWT access token from the Authorization header or, since
+    EventSource can't send headers, the `token` query parameter
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else request.GET.get('token', '').encode()
+    if not raw_token:
+        return None
+    try:
+        validated = authenticator.get_validated_token(raw_token)
+        return await sync_to_async(authenticator.get_user)(validated)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+@require_GET
+async def post_events(request):
+    """Server-Sent Events stream of the user's post status changes (see posts.events)"""
+    user = await authenticate_stream(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+    response = StreamingHttpResponse(events.stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,267 @@
+"""
+Outbound webhooks for post status changes.
+
+A status change is queued as one WebhookDelivery row per interested
+endpoint (one lookup, one bulk insert), and a deliver_webhook task on the
+WEBHOOK_QUEUE is scheduled for each endpoint, so publishing never waits on a
+receiver. That task POSTs the endpoint's pending events in order, up to
+WEBHOOK_BATCH_SIZE per request, over a pooled keep-alive session:
+
+    POST <url>
+    X-Webhook-Timestamp: 1760868000
+    X-Webhook-Signature: sha256=<HMAC-SHA256 of "<timestamp>.<body>" keyed with the webhook's secret>
+    {"events": [{"id": 41, "type": "post.posted", "created_at": "...", "data": {...}}, ...]}
+
+Failed batches are retried with exponential backoff, and events queued in
+the meantime wait behind them so they still arrive in order. Each
+destination host gets at most WEBHOOK_MAX_CONCURRENCY requests at a time
+across all workers; a task that finds its host at the cap reschedules itself
+instead of waiting, so a slow receiver holds up neither workers nor other
+tenants' deliveries.
+Endpoints must resolve to public addresses (core.outbound), when they are
+registered and again before every request.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import requests
+from requests.adapters import HTTPAdapter
+from core.outbound import UnsafeURL, check_public_url
+from .models import Webhook, WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+_session = None
+
+
+def get_session() -> requests.Session:
+    """Process-wide session, so consecutive batches to a host reuse its connections"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=settings.WEBHOOK_MAX_CONCURRENCY)
+        _session.mount('https://', adapter)
+        _session.mount('http://', adapter)
+    return _session
+
+
+def post_event_data(post, status=None) -> dict:
+    return {
+        'id': post.id,
+        'platform': post.platform,
+        'status': status or post.status,
+        'external_post_id': post.external_post_id,
+        'campaign': post.campaign_id,
+        'scheduled_time': post.scheduled_time.isoformat() if post.scheduled_time else None,
+    }
+
+
+def enqueue_post_events(posts, status=None) -> int:
+    """
+    Queue a status event for each post to the webhooks of its owner that
+    want it. Never raises: a webhook problem must not fail the status change.
+    """
+    posts = list(posts)
+    if not posts:
+        return 0
+    try:
+        webhooks = list(Webhook.objects.filter(user_id__in={post.user_id for post in posts}, is_active=True))
+        if not webhooks:
+            return 0
+        now = timezone.now()
+        deliveries = []
+        for post in posts:
+            event_type = f"post.{status or post.status}"
+            data = post_event_data(post, status)
+            for webhook in webhooks:
+                if webhook.user_id == post.user_id and webhook.wants(event_type):
+                    deliveries.append(WebhookDelivery(webhook=webhook, event=event_type, payload=data, next_attempt_at=now))
+        WebhookDelivery.objects.bulk_create(deliveries)
+    except Exception as e:
+        logger.exception(f"Could not queue webhook events for {len(posts)} posts: {e}")
+        return 0
+
+    webhook_ids = {delivery.webhook_id for delivery in deliveries}
+    transaction.on_commit(lambda: [schedule_delivery(webhook_id) for webhook_id in webhook_ids])
+    return len(deliveries)
+
+
+def _scheduled_key(webhook_id: int) -> str:
+    return f"webhook:scheduled:{webhook_id}"
+
+
+def schedule_delivery(webhook_id: int, countdown=None) -> None:
+    """
+    Enqueue deliver_webhook for an endpoint unless one is already waiting,
+    so a burst of events becomes one task and a few batches
+    """
+    from .tasks import deliver_webhook
+
+    try:
+        if countdown is None and not cache.add(_scheduled_key(webhook_id), 1, timeout=settings.WEBHOOK_LOCK_TIMEOUT):
+            return
+    except Exception as e:
+        logger.warning(f"Webhook schedule tracking unavailable: {e}")
+    try:
+        deliver_webhook.apply_async((webhook_id,), countdown=countdown, queue=settings.WEBHOOK_QUEUE)
+    except Exception as e:
+        # The periodic sweep picks the events up once the broker is back
+        logger.warning(f"Could not schedule delivery for webhook {webhook_id}: {e}")
+
+
+def _host_key(url: str) -> str:
+    return f"webhook:inflight:{urlsplit(url).netloc.lower()}"
+
+
+def acquire_host_slot(url: str) -> bool:
+    """Take one of the destination host's concurrent delivery slots"""
+    key = _host_key(url)
+    try:
+        cache.add(key, 0, timeout=settings.WEBHOOK_LOCK_TIMEOUT)
+        inflight = cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=settings.WEBHOOK_LOCK_TIMEOUT)
+        return True
+    except Exception as e:
+        logger.warning(f"Webhook slot tracking unavailable: {e}")
+        return True
+
+    if inflight > settings.WEBHOOK_MAX_CONCURRENCY:
+        release_host_slot(url)
+        return False
+    return True
+
+
+def release_host_slot(url: str) -> None:
+    try:
+        cache.decr(_host_key(url))
+    except ValueError:
+        pass
+    except Exception as e:
+        logger.warning(f"Webhook slot tracking unavailable: {e}")
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def send_batch(webhook, batch):
+    """POST a batch of deliveries; returns (success, error)"""
+    body = json.dumps({
+        'events': [
+            {'id': delivery.id, 'type': delivery.event, 'created_at': delivery.created_at.isoformat(), 'data': delivery.payload}
+            for delivery in batch
+        ]
+    }, default=str).encode()
+    timestamp = str(int(time.time()))
+    try:
+        # The host may resolve somewhere else than when the webhook was registered
+        check_public_url(webhook.url)
+    except UnsafeURL as e:
+        return False, str(e)
+    try:
+        response = get_session().post(
+            webhook.url,
+            data=body,
+            headers={
+                'Content-Type': 'application/json',
+                'X-Webhook-Timestamp': timestamp,
+                'X-Webhook-Signature': sign(webhook.secret, timestamp, body),
+            },
+            timeout=(settings.WEBHOOK_CONNECT_TIMEOUT, settings.WEBHOOK_TIMEOUT),
+            allow_redirects=False,
+        )
+    except requests.RequestException as e:
+        return False, f"{type(e).__name__}: {e}"
+    if 200 <= response.status_code < 300:
+        return True, None
+    return False, f"HTTP {response.status_code}: {response.text[:200]}"
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Delay before retry number `attempt`, with jitter so endpoints don't retry in lockstep"""
+    delay = min(settings.WEBHOOK_RETRY_BASE * 2 ** (attempt - 1), settings.WEBHOOK_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def record_failure(batch, error) -> float:
+    """Push a failed batch back by the backoff; returns the delay in seconds"""
+    attempt = max(delivery.attempts for delivery in batch) + 1
+    delay = backoff_seconds(attempt)
+    ids = [delivery.id for delivery in batch]
+    WebhookDelivery.objects.filter(id__in=ids).update(
+        attempts=F('attempts') + 1,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        last_error=error,
+    )
+    WebhookDelivery.objects.filter(id__in=ids, attempts__gte=settings.WEBHOOK_MAX_ATTEMPTS).update(status='failed')
+    return delay
+
+
+def deliver(webhook_id: int) -> int:
+    """
+    Send an endpoint's pending events in order, batch after batch, until
+    none are left, the oldest is backing off, a batch fails, or
+    WEBHOOK_MAX_BATCHES_PER_RUN is reached. Returns the number of events
+    delivered.
+    """
+    try:
+        cache.delete(_scheduled_key(webhook_id))
+    except Exception:
+        pass
+    webhook = Webhook.objects.filter(id=webhook_id, is_active=True).first()
+    if webhook is None:
+        return 0
+
+    # One task per endpoint at a time keeps its events in order
+    lock_key = f"webhook:lock:{webhook_id}"
+    try:
+        locked = cache.add(lock_key, 1, timeout=settings.WEBHOOK_LOCK_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Webhook lock unavailable: {e}")
+        locked = True
+    if not locked:
+        schedule_delivery(webhook_id, countdown=settings.WEBHOOK_BUSY_RETRY)
+        return 0
+    if not acquire_host_slot(webhook.url):
+        cache.delete(lock_key)
+        schedule_delivery(webhook_id, countdown=settings.WEBHOOK_BUSY_RETRY)
+        return 0
+
+    delivered = 0
+    try:
+        for _ in range(settings.WEBHOOK_MAX_BATCHES_PER_RUN):
+            batch = list(webhook.deliveries.filter(status='pending').order_by('id')[:settings.WEBHOOK_BATCH_SIZE])
+            # Newer events wait until the failed batch ahead of them is retried
+            if not batch or batch[0].next_attempt_at > timezone.now():
+                return delivered
+            ok, error = send_batch(webhook, batch)
+            if not ok:
+                delay = record_failure(batch, error)
+                logger.info(f"Webhook {webhook_id} batch of {len(batch)} failed, retrying in {delay:.0f}s: {error}")
+                schedule_delivery(webhook_id, countdown=delay)
+                return delivered
+            WebhookDelivery.objects.filter(id__in=[delivery.id for delivery in batch]).update(
+                status='delivered', delivered_at=timezone.now(), attempts=F('attempts') + 1, last_error=None
+            )
+            delivered += len(batch)
+        # Still more to send; hand the worker back and continue in a fresh task
+        schedule_delivery(webhook_id, countdown=0)
+        return delivered
+    finally:
+        release_host_slot(webhook.url)
+        try:
+            cache.delete(lock_key)
+        except Exception:
+            pass
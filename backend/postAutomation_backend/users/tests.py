@@ -1,3 +1,54 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from posts.tests import QueryBudgetMixin
 
-# Create your tests here.
+User = get_user_model()
+
+
+class AuthQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query budgets for the authentication endpoints"""
+
+    # username + email uniqueness checks + insert
+    REGISTER_BUDGET = 3
+    # user lookup (last_login updates are off)
+    LOGIN_BUDGET = 1
+    # refresh tokens are stateless while the blacklist app isn't installed
+    REFRESH_BUDGET = 0
+    # auth user lookup
+    PROFILE_BUDGET = 1
+    # auth + email uniqueness check + update
+    PROFILE_UPDATE_BUDGET = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user('budget', 'budget@example.com', 'pw-budget-123')
+
+    def test_register(self):
+        self.assertQueryBudget(self.REGISTER_BUDGET, APIClient(), 'post', '/api/auth/register/', format='json', data={
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password': 'a-long-Passphrase-42',
+            'password2': 'a-long-Passphrase-42',
+        })
+
+    def test_login(self):
+        self.assertQueryBudget(self.LOGIN_BUDGET, APIClient(), 'post', '/api/auth/login/', format='json', data={
+            'username': 'budget',
+            'password': 'pw-budget-123',
+        })
+
+    def test_token_refresh(self):
+        self.assertQueryBudget(
+            self.REFRESH_BUDGET, APIClient(), 'post', '/api/auth/token/refresh/', format='json',
+            data={'refresh': str(RefreshToken.for_user(self.user))},
+        )
+
+    def test_profile(self):
+        self.assertQueryBudget(self.PROFILE_BUDGET, self.make_client(self.user), 'get', '/api/auth/profile/')
+
+    def test_profile_update(self):
+        self.assertQueryBudget(
+            self.PROFILE_UPDATE_BUDGET, self.make_client(self.user), 'patch', '/api/auth/profile/', format='json',
+            data={'first_name': 'Budget', 'email': 'budget2@example.com'},
+        )
@@ -64,6 +64,8 @@ export const Posts = () => {
         return 'bg-red-100 text-red-800 border-red-200';
       case 'cancelled':
         return 'bg-gray-100 text-gray-800 border-gray-200';
+      case 'stale':
+        return 'bg-orange-100 text-orange-800 border-orange-200';
       default:
         return 'bg-gray-100 text-gray-800 border-gray-200';
     }
@@ -128,6 +130,7 @@ export const Posts = () => {
             <option value="posted">Posted</option>
             <option value="failed">Failed</option>
             <option value="cancelled">Cancelled</option>
+            <option value="stale">Stale</option>
           </select>
 
           {(platformFilter || statusFilter || search) && (